@@ -204,3 +204,70 @@ SIMPLE_JWT = {
 
 # Custom user model
 AUTH_USER_MODEL = 'api.User'
+
+# FreshBytes performance tuning
+# Seconds a seller's unchanged catalog arrays are reused by the promo pricing simulation
+PROMO_SIMULATION_CACHE_SECONDS = 60
+# Bayesian rating prior weight and top_rated cut-offs used by recompute_product_ratings
+RATING_PRIOR_WEIGHT = 5
+RATING_TOP_PERCENTILE = 0.9
+RATING_MIN_REVIEWS = 3
+# Values each process reserves per round trip to a sequence counter (see sequence_services)
+SEQUENCE_BLOCK_SIZE = 20
+# Idempotency-Key handling for checkout and payment creation (see idempotency_services)
+IDEMPOTENCY_KEY_TTL_HOURS = 24
+IDEMPOTENCY_LEASE_SECONDS = 60
+IDEMPOTENCY_WAIT_SECONDS = 10
+IDEMPOTENCY_POLL_INTERVAL = 0.1
+# Inventory holds (see inventory_services); holds always start at POST /cart/reserve/
+INVENTORY_HOLD_TTL_SECONDS = 600
+INVENTORY_HOLD_ON_ADD_TO_CART = False
+# Background job queue (see job_services); run workers with `manage.py run_workers`
+JOB_WORKERS = 2
+JOB_BATCH_SIZE = 10
+JOB_POLL_INTERVAL = 1.0
+JOB_LEASE_SECONDS = 300
+JOB_MAX_ATTEMPTS = 5
+JOB_RETRY_BASE_SECONDS = 5
+JOB_RETRY_MAX_SECONDS = 3600
+# Run jobs in-process right after commit instead of queueing them (handy without workers)
+JOB_QUEUE_INLINE = False
+# Asynchronous checkout (Prefer: respond-async); tickets run on `run_workers --queue checkout`
+CHECKOUT_ASYNC = False
+CHECKOUT_QUEUE_LIMIT = 10000
+CHECKOUT_LONG_POLL_SECONDS = 25
+CHECKOUT_POLL_INTERVAL = 0.25
+# Delivered/cancelled orders untouched for this many days move to cold storage (`manage.py archive_orders`)
+ORDER_ARCHIVE_AFTER_DAYS = 365
+# Admin KPI snapshots (see kpi_services); schedule `manage.py snapshot_kpis` or rely on refresh-on-read
+KPI_SNAPSHOT_MAX_AGE_SECONDS = 900
+KPI_REFRESH_MIN_SECONDS = 60
+KPI_SNAPSHOT_RETENTION_DAYS = 90
+# Best-seller rankings (see ranking_services): entries served, entries kept per scope, per-process cache lifetime
+RANKING_TOP_K = 20
+RANKING_CAPACITY = 50
+RANKING_CACHE_SECONDS = 60
+# Trending rail (see trending_services): per-process count-min sketch shards merged on read
+TRENDING_ENABLED = True
+TRENDING_SKETCH_WIDTH = 2048
+TRENDING_SKETCH_DEPTH = 4
+TRENDING_CANDIDATES = 200
+TRENDING_HALF_LIFE_SECONDS = 1800
+TRENDING_FLUSH_SECONDS = 30
+TRENDING_CACHE_SECONDS = 30
+TRENDING_EVENT_WEIGHTS = {'view': 1, 'cart': 3, 'order': 5}
+# Buffered view/like/follow counters (see counter_services); replay crashed journals with `manage.py flush_counters`
+COUNTER_FLUSH_SECONDS = 10
+COUNTER_FLUSH_THRESHOLD = 500
+COUNTER_JOURNAL_DIR = BASE_DIR / 'counter_journal'
+COUNTER_JOURNAL_FSYNC = False
+COUNTER_FLUSH_RETENTION_DAYS = 7
+# Guest carts (see cart_services): signed-token carts for anonymous visitors, merged into the account cart on login
+GUEST_CART_COOKIE = 'guest_cart'
+GUEST_CART_MAX_AGE_SECONDS = 30 * 24 * 3600
+GUEST_CART_MAX_LINES = 50
+# Largest batch accepted by POST /carts/batch/
+CART_BATCH_MAX_OPERATIONS = 100
+# Settlement reconciliation (see settlement_services): rows per lookup/update batch; column and status
+# mappings can be overridden with SETTLEMENT_CSV_COLUMNS and SETTLEMENT_STATUS_MAP
+SETTLEMENT_BATCH_SIZE = 2000
@@ -0,0 +1,26 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from ...services.archive_services import archive_orders
+
+class Command(BaseCommand):
+    help = 'Move delivered and cancelled orders older than a given age into the cold archive tables'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days',
+            type=int,
+            default=getattr(settings, 'ORDER_ARCHIVE_AFTER_DAYS', 365),
+            help='Archive orders not updated for this many days (default: ORDER_ARCHIVE_AFTER_DAYS)'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=500,
+            help='Number of orders moved per transaction (default: 500)'
+        )
+
+    def handle(self, *args, **options):
+        if options['days'] < 0 or options['batch_size'] < 1:
+            raise CommandError('--days must be 0 or more and --batch-size positive')
+        archived = archive_orders(older_than_days=options['days'], batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Archived {archived} orders'))
@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand, CommandError
+from ...models import Seller
+from ...services.rollup_services import rebuild_daily_sales
+
+class Command(BaseCommand):
+    help = 'Rebuild the per-seller daily sales rollups that back the store dashboard from seller order history'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--seller-id',
+            help='Only rebuild this seller (default: every seller)'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Rollup rows inserted per query (default: 1000)'
+        )
+
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size must be positive')
+        seller = None
+        if options['seller_id']:
+            seller = Seller.objects.filter(pk=options['seller_id']).first()
+            if seller is None:
+                raise CommandError(f"Seller {options['seller_id']} does not exist")
+        written = rebuild_daily_sales(seller=seller, batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Wrote {written} daily sales rows'))
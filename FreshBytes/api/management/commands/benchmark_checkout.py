@@ -0,0 +1,79 @@
+import time
+import uuid
+from decimal import Decimal
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from ...models import User, Seller, Category, SubCategory, Product, Cart, CartItem
+from ...services.order_services import create_order_from_cart
+
+class Command(BaseCommand):
+    help = 'Measure queries and time per checkout for several cart sizes (all data is rolled back)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--sizes',
+            type=int,
+            nargs='+',
+            default=[1, 10, 50, 100],
+            help='Cart sizes (number of distinct products) to check out (default: 1 10 50 100)'
+        )
+
+    def handle(self, *args, **options):
+        sizes = options['sizes']
+        self.stdout.write(f'{"cart lines":>10}  {"queries":>7}  {"ms":>8}')
+        with transaction.atomic():
+            seller = self._seller()
+            sub_category = self._sub_category()
+            products = [self._product(seller, sub_category) for _ in range(max(sizes))]
+
+            for size in sizes:
+                customer = self._user('customer')
+                cart = Cart.objects.create(user=customer)
+                CartItem.objects.bulk_create([
+                    CartItem(cart=cart, product=product, quantity=1, unit_price=product.product_price)
+                    for product in products[:size]
+                ])
+                start = time.perf_counter()
+                with CaptureQueriesContext(connection) as queries:
+                    create_order_from_cart(customer, payment_method='COD')
+                elapsed = (time.perf_counter() - start) * 1000
+                self.stdout.write(f'{size:>10}  {len(queries):>7}  {elapsed:>8.1f}')
+
+            transaction.set_rollback(True)
+        self.stdout.write(self.style.SUCCESS('Benchmark finished, all data rolled back'))
+
+    def _user(self, role):
+        return User.objects.create_user(
+            user_email=f'checkout-bench-{uuid.uuid4().hex[:12]}@example.com',
+            password=uuid.uuid4().hex,
+            user_name='checkout-bench',
+            first_name='Checkout',
+            last_name='Bench',
+            user_phone='0',
+            role=role,
+            email_verified=True,
+        )
+
+    def _seller(self):
+        return Seller.objects.create(user_id=self._user('seller'), business_name='Checkout Bench', business_phone=0)
+
+    def _sub_category(self):
+        category = Category.objects.create(category_name=f'checkout-bench-{uuid.uuid4().hex[:12]}')
+        return SubCategory.objects.create(
+            category_id=category,
+            sub_category_name=f'checkout-bench-{uuid.uuid4().hex[:12]}',
+            sub_category_description='Checkout benchmark'
+        )
+
+    def _product(self, seller, sub_category):
+        return Product.objects.create(
+            seller_id=seller,
+            sub_category_id=sub_category,
+            product_name='Checkout Bench Item',
+            product_price=Decimal('100.00'),
+            product_brief_description='Checkout benchmark',
+            product_full_description='Checkout benchmark',
+            quantity=1000,
+            weight=1,
+        )
@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+from ...services.promo_services import delete_expired_promos
+
+class Command(BaseCommand):
+    help = 'Delete all expired promos in bulk and reprice the affected products once'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=500,
+            help='Number of promos/products handled per statement (default: 500)'
+        )
+
+    def handle(self, *args, **options):
+        deleted = delete_expired_promos(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Deleted {deleted} expired promos'))
@@ -0,0 +1,9 @@
+from django.core.management.base import BaseCommand
+from ...services.counter_services import replay_orphaned_journals
+
+class Command(BaseCommand):
+    help = 'Apply view/like/follow counter journals left behind by processes that exited without flushing'
+
+    def handle(self, *args, **options):
+        replayed, skipped = replay_orphaned_journals()
+        self.stdout.write(self.style.SUCCESS(f'Replayed {replayed} counter journals ({skipped} were already applied)'))
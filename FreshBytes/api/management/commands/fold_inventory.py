@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+from ...services.inventory_services import fold_movements
+
+class Command(BaseCommand):
+    help = 'Apply pending inventory ledger movements (releases, cancellations, refunds) to product stock'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Number of movements folded per transaction (default: 1000)'
+        )
+
+    def handle(self, *args, **options):
+        folded = fold_movements(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Folded {folded} inventory movements'))
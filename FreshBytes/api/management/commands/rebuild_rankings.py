@@ -0,0 +1,9 @@
+from django.core.management.base import BaseCommand
+from ...services.ranking_services import rebuild_all_rankings
+
+class Command(BaseCommand):
+    help = 'Rebuild every best-seller ranking (platform, categories, subcategories, sellers) from the sales counters'
+
+    def handle(self, *args, **options):
+        scopes = rebuild_all_rankings()
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt {scopes} rankings'))
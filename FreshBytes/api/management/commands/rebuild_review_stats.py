@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+from ...services.review_services import rebuild_review_stats
+
+class Command(BaseCommand):
+    help = 'Recompute product and seller review aggregates (count, rating sum, histogram) from scratch'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=500,
+            help='Number of rows written per bulk update (default: 500)'
+        )
+
+    def handle(self, *args, **options):
+        products, sellers = rebuild_review_stats(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt review stats for {products} products and {sellers} sellers'))
@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+from ...services.review_services import recompute_product_ratings
+
+class Command(BaseCommand):
+    help = 'Recompute product rating scores, subcategory percentile ranks and top_rated flags'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--full',
+            action='store_true',
+            help='Rescore every product instead of only subcategories with changed reviews'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=500,
+            help='Number of products written per bulk update (default: 500)'
+        )
+
+    def handle(self, *args, **options):
+        updated = recompute_product_ratings(full=options['full'], batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Updated rating score or top_rated for {updated} products'))
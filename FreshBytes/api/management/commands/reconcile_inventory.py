@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+from ...services.inventory_services import reconcile_inventory
+
+class Command(BaseCommand):
+    help = 'Verify product stock against the inventory ledger and report drift'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--fix',
+            action='store_true',
+            help='Rewrite drifted stock counters from the ledger'
+        )
+
+    def handle(self, *args, **options):
+        report = reconcile_inventory(fix=options['fix'])
+        if not report:
+            self.stdout.write(self.style.SUCCESS('Stock matches the inventory ledger for every product'))
+            return
+        self.stdout.write(f'{"product":<36}  {"ledger":>8}  {"stock":>8}  {"drift":>8}  {"pending":>8}')
+        for product_id, expected, actual, pending in report:
+            self.stdout.write(f'{product_id:<36}  {expected:>8}  {actual:>8}  {actual - expected:>+8}  {pending:>8}')
+        if options['fix']:
+            self.stdout.write(self.style.SUCCESS(f'Rewrote stock for {len(report)} products from the ledger'))
+        else:
+            self.stdout.write(self.style.WARNING(f'{len(report)} products drifted from the ledger (run with --fix to repair)'))
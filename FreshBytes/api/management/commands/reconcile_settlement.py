@@ -0,0 +1,79 @@
+import sys
+from pathlib import Path
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from ...services.settlement_services import reconcile_settlement
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+class Command(BaseCommand):
+    help = 'Match a GCash/PayMaya settlement CSV against payments, update their status, tax and revenue, and report mismatches'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Settlement CSV file')
+        parser.add_argument(
+            '--provider',
+            choices=['GCASH', 'PAYMAYA'],
+            help='Gateway that issued the file; payments made another way are reported as mismatches'
+        )
+        parser.add_argument(
+            '--report',
+            help='Where to write the mismatch report (default: <path>.mismatches.csv)'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=getattr(settings, 'SETTLEMENT_BATCH_SIZE', 2000),
+            help='Rows looked up and updated together (default: SETTLEMENT_BATCH_SIZE)'
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Match and report without updating any payment'
+        )
+
+    def handle(self, *args, **options):
+        path = Path(options['path'])
+        if not path.is_file():
+            raise CommandError(f'{path} does not exist')
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size must be positive')
+        report_path = Path(options['report'] or f'{path}.mismatches.csv')
+
+        def progress(stats):
+            self.stderr.write(
+                f"\r{stats['lines']:>12,} lines  {stats['lines_per_second']:>10,.0f} lines/s  "
+                f"{stats['updated']:>10,} updated  {stats['mismatched']:>10,} mismatched",
+                ending=''
+            )
+
+        try:
+            with path.open(newline='', encoding='utf-8-sig') as lines, report_path.open('w', newline='', encoding='utf-8') as report:
+                stats = reconcile_settlement(
+                    lines,
+                    provider=options['provider'],
+                    report=report,
+                    batch_size=options['batch_size'],
+                    dry_run=options['dry_run'],
+                    progress=progress
+                )
+        except ValueError as e:
+            raise CommandError(str(e))
+        self.stderr.write('')
+
+        for reason, count in sorted(stats['reasons'].items()):
+            self.stdout.write(f'  {reason:<22} {count:>10,}')
+        if resource is not None:
+            peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+            # ru_maxrss is in kilobytes on Linux and bytes on macOS
+            peak_mb = peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+            self.stdout.write(f'  Peak memory {peak_mb:,.0f} MB')
+        summary = (
+            f"{stats['lines']:,} lines in {stats['seconds']:.1f}s ({stats['lines_per_second']:,.0f} lines/s): "
+            f"{stats['matched']:,} matched, {stats['updated']:,} {'would be ' if options['dry_run'] else ''}updated, "
+            f"{stats['mismatched']:,} mismatched (see {report_path})"
+        )
+        self.stdout.write(self.style.SUCCESS(summary))
@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+from ...services.inventory_services import release_expired_holds
+
+class Command(BaseCommand):
+    help = 'Release expired inventory holds back to stock and refresh sharded product quantities'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=500,
+            help='Number of holds released per transaction (default: 500)'
+        )
+
+    def handle(self, *args, **options):
+        released = release_expired_holds(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Released {released} expired holds'))
@@ -0,0 +1,83 @@
+import multiprocessing
+import signal
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from ...services.job_services import run_pending_jobs, work
+
+def _worker(stop_event, batch_size, poll_interval, queue):
+    import django
+    django.setup()
+    # Shutdown is driven by the parent through stop_event, so a Ctrl+C never
+    # interrupts a job halfway
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGTERM, signal.SIG_IGN)
+    work(stop_event, batch_size=batch_size, poll_interval=poll_interval, queue=queue)
+
+class Command(BaseCommand):
+    help = 'Run background job worker processes until interrupted (or drain due jobs once with --once)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=getattr(settings, 'JOB_WORKERS', 2),
+            help='Number of worker processes (default: JOB_WORKERS)'
+        )
+        parser.add_argument(
+            '--queue',
+            default='default',
+            help="Job queue to serve, e.g. 'checkout' (default: default)"
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=getattr(settings, 'JOB_BATCH_SIZE', 10),
+            help='Jobs claimed per round trip (default: JOB_BATCH_SIZE)'
+        )
+        parser.add_argument(
+            '--poll-interval',
+            type=float,
+            default=getattr(settings, 'JOB_POLL_INTERVAL', 1.0),
+            help='Seconds an idle worker waits before polling again (default: JOB_POLL_INTERVAL)'
+        )
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Run every job that is due in this process, then exit (for cron)'
+        )
+
+    def handle(self, *args, **options):
+        if options['workers'] < 1 or options['batch_size'] < 1:
+            raise CommandError('--workers and --batch-size must be positive')
+
+        if options['once']:
+            succeeded, failed = run_pending_jobs(batch_size=options['batch_size'], queue=options['queue'])
+            self.stdout.write(self.style.SUCCESS(f'Ran {succeeded} jobs ({failed} failed)'))
+            return
+
+        stop_event = multiprocessing.Event()
+        worker_args = (stop_event, options['batch_size'], options['poll_interval'], options['queue'])
+        # Children must not inherit the parent's open database connections
+        connections.close_all()
+        processes = [multiprocessing.Process(target=_worker, args=worker_args, daemon=True) for _ in range(options['workers'])]
+        for process in processes:
+            process.start()
+        self.stdout.write(f"Started {len(processes)} workers on the '{options['queue']}' queue, press Ctrl+C to stop")
+
+        # Treat SIGTERM like Ctrl+C; setting the event from inside a signal handler could deadlock
+        signal.signal(signal.SIGTERM, signal.default_int_handler)
+        try:
+            while not stop_event.wait(1):
+                for index, process in enumerate(processes):
+                    if not process.is_alive():
+                        self.stderr.write(f'Worker {process.pid} exited with code {process.exitcode}, restarting')
+                        processes[index] = multiprocessing.Process(target=_worker, args=worker_args, daemon=True)
+                        processes[index].start()
+        except KeyboardInterrupt:
+            stop_event.set()
+
+        self.stdout.write('Stopping workers after their current jobs...')
+        for process in processes:
+            process.join()
+        self.stdout.write(self.style.SUCCESS('All job workers stopped'))
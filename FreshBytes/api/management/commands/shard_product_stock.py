@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand, CommandError
+from ...models import Product
+from ...services.inventory_services import reshard_product_stock
+
+class Command(BaseCommand):
+    help = 'Split a hot product\'s stock across several counter rows (use --shards 0 to merge it back)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'product_id',
+            type=str,
+            help='Product to (re)shard'
+        )
+        parser.add_argument(
+            '--shards',
+            type=int,
+            default=8,
+            help='Number of stock shards, 0 to unshard (default: 8)'
+        )
+
+    def handle(self, *args, **options):
+        if options['shards'] < 0:
+            raise CommandError('--shards must be 0 or more')
+        try:
+            total = reshard_product_stock(options['product_id'], options['shards'])
+        except Product.DoesNotExist:
+            raise CommandError(f'Product {options["product_id"]} not found')
+        self.stdout.write(self.style.SUCCESS(
+            f'Product {options["product_id"]} now has {total} units across {options["shards"]} shards'
+        ))
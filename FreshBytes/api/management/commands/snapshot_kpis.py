@@ -0,0 +1,9 @@
+from django.core.management.base import BaseCommand
+from ...services.kpi_services import take_snapshot
+
+class Command(BaseCommand):
+    help = 'Compute the platform KPIs and store them as a new snapshot for the admin dashboard'
+
+    def handle(self, *args, **options):
+        snapshot = take_snapshot()
+        self.stdout.write(self.style.SUCCESS(f'Stored KPI snapshot {snapshot.pk} ({snapshot.duration_ms}ms)'))
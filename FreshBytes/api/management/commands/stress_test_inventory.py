@@ -0,0 +1,140 @@
+import threading
+import time
+import uuid
+from decimal import Decimal
+from django.core.management.base import BaseCommand, CommandError
+from django.db import OperationalError, connection
+from django.db.models import Sum
+from django.utils import timezone
+from ...models import User, Seller, Category, SubCategory, Product, StockShard, InventoryHold
+from ...services.inventory_services import hold_stock, release_expired_holds, reshard_product_stock
+
+class Command(BaseCommand):
+    help = 'Hammer one product with concurrent holds until it sells out, verify nothing was oversold and report throughput'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--stock',
+            type=int,
+            default=500,
+            help='Units of stock on the test product (default: 500)'
+        )
+        parser.add_argument(
+            '--shards',
+            type=int,
+            default=8,
+            help='Stock shards for the test product, 0 for a single counter row (default: 8)'
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=16,
+            help='Concurrent buyers (default: 16)'
+        )
+        parser.add_argument(
+            '--quantity',
+            type=int,
+            default=1,
+            help='Units per hold (default: 1)'
+        )
+
+    def handle(self, *args, **options):
+        stock, shards, workers, quantity = options['stock'], options['shards'], options['workers'], options['quantity']
+        if min(stock, workers, quantity) < 1 or shards < 0:
+            raise CommandError('--stock, --workers and --quantity must be positive and --shards 0 or more')
+
+        seller_user = self._user('seller')
+        buyers = [self._user('customer') for _ in range(workers)]
+        product = self._product(Seller.objects.create(user_id=seller_user, business_name='Stress Test', business_phone=0), stock)
+        if shards:
+            reshard_product_stock(product.pk, shards)
+            product.refresh_from_db()
+
+        held = [0] * workers
+        retries = [0] * workers
+
+        def buyer(index):
+            try:
+                while True:
+                    try:
+                        hold_stock(buyers[index], product, quantity)
+                    except ValueError:
+                        return  # sold out
+                    except OperationalError:
+                        retries[index] += 1  # SQLite "database is locked": back off and retry
+                        time.sleep(0.001)
+                        continue
+                    held[index] += quantity
+            finally:
+                connection.close()
+
+        self.stdout.write(f'{workers} buyers x {quantity} unit(s) against {stock} units in {shards or "no"} shards...')
+        threads = [threading.Thread(target=buyer, args=(index,)) for index in range(workers)]
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - start
+
+        try:
+            sold = sum(held)
+            holds = InventoryHold.objects.filter(product=product, status='ACTIVE')
+            recorded = holds.aggregate(total=Sum('quantity'))['total'] or 0
+            remaining = self._remaining(product)
+            negative = StockShard.objects.filter(product=product, quantity__lt=0).exists() or remaining < 0
+
+            self.stdout.write(f'  held units:      {sold} (recorded on holds: {recorded})')
+            self.stdout.write(f'  remaining stock: {remaining}')
+            self.stdout.write(f'  throughput:      {holds.count() / elapsed:.0f} holds/s over {elapsed:.2f}s ({sum(retries)} lock retries)')
+
+            # Expire every hold and make sure the sweeper gives all of it back
+            holds.update(expires_at=timezone.now())
+            release_expired_holds()
+            restored = self._remaining(product)
+            self.stdout.write(f'  after sweeping:  {restored} units back in stock')
+
+            ok = sold == recorded and sold + remaining == stock and not negative and restored == stock
+            if ok:
+                self.stdout.write(self.style.SUCCESS('No oversell: every unit was held exactly once and returned on expiry'))
+            else:
+                self.stdout.write(self.style.ERROR('Stock mismatch detected'))
+        finally:
+            Product.all_objects.filter(pk=product.pk).delete()
+            User.objects.filter(pk__in=[seller_user.pk] + [buyer.pk for buyer in buyers]).delete()
+
+    def _remaining(self, product):
+        product.refresh_from_db(fields=['quantity', 'stock_shards'])
+        if product.stock_shards:
+            return StockShard.objects.filter(product=product).aggregate(total=Sum('quantity'))['total'] or 0
+        return product.quantity
+
+    def _user(self, role):
+        return User.objects.create_user(
+            user_email=f'stress-{uuid.uuid4().hex[:12]}@example.com',
+            password=uuid.uuid4().hex,
+            user_name='stress-test',
+            first_name='Stress',
+            last_name='Test',
+            user_phone='0',
+            role=role,
+            email_verified=True,
+        )
+
+    def _product(self, seller, stock):
+        category = Category.objects.create(category_name=f'stress-{uuid.uuid4().hex[:12]}')
+        sub_category = SubCategory.objects.create(
+            category_id=category,
+            sub_category_name=f'stress-{uuid.uuid4().hex[:12]}',
+            sub_category_description='Inventory stress test'
+        )
+        return Product.objects.create(
+            seller_id=seller,
+            sub_category_id=sub_category,
+            product_name='Stress Test Item',
+            product_price=Decimal('100.00'),
+            product_brief_description='Inventory stress test',
+            product_full_description='Inventory stress test',
+            quantity=stock,
+            weight=1,
+        )
@@ -0,0 +1,100 @@
+# Generated by Django 5.2.18 on 2026-10-19 05:40
+
+from django.db import migrations, models
+from django.db.models import Count, Q, Sum
+
+
+def backfill_review_aggregates(apps, schema_editor):
+    Product = apps.get_model("api", "Product")
+    Reviews = apps.get_model("api", "Reviews")
+    Seller = apps.get_model("api", "Seller")
+
+    aggregates = {"count": Count("review_id"), "rating_sum": Sum("review_rating")}
+    for rating in range(1, 6):
+        aggregates[f"rating_{rating}"] = Count("review_id", filter=Q(review_rating=rating))
+
+    for row in Reviews.objects.exclude(product_id=None).values("product_id").annotate(**aggregates).order_by():
+        Product.objects.filter(pk=row["product_id"]).update(
+            review_count=row["count"],
+            review_rating_sum=row["rating_sum"] or 0,
+            **{f"review_rating_{rating}": row[f"rating_{rating}"] for rating in range(1, 6)},
+        )
+
+    for row in Reviews.objects.exclude(product_id__seller_id=None).values("product_id__seller_id").annotate(**aggregates).order_by():
+        Seller.objects.filter(pk=row["product_id__seller_id"]).update(
+            total_reviews=row["count"],
+            review_rating_sum=row["rating_sum"] or 0,
+            average_rating=round((row["rating_sum"] or 0) / row["count"], 2),
+            **{f"review_rating_{rating}": row[f"rating_{rating}"] for rating in range(1, 6)},
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("api", "0010_payment_gateway_response_payment_payment_date"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="product",
+            name="review_rating_1",
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="product",
+            name="review_rating_2",
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="product",
+            name="review_rating_3",
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="product",
+            name="review_rating_4",
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="product",
+            name="review_rating_5",
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="product",
+            name="review_rating_sum",
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="seller",
+            name="review_rating_1",
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="seller",
+            name="review_rating_2",
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="seller",
+            name="review_rating_3",
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="seller",
+            name="review_rating_4",
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="seller",
+            name="review_rating_5",
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="seller",
+            name="review_rating_sum",
+            field=models.IntegerField(default=0),
+        ),
+        migrations.RunPython(backfill_review_aggregates, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.2.18 on 2026-10-19 05:41
+
+from django.db import migrations, models
+
+
+def flag_reviewed_products(apps, schema_editor):
+    Product = apps.get_model("api", "Product")
+    Product.objects.filter(review_count__gt=0).update(rating_dirty=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("api", "0011_review_rating_aggregates"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="product",
+            name="rating_dirty",
+            field=models.BooleanField(db_index=True, default=False),
+        ),
+        migrations.AddField(
+            model_name="product",
+            name="rating_score",
+            field=models.DecimalField(
+                db_index=True, decimal_places=3, default=0, max_digits=4
+            ),
+        ),
+        migrations.RunPython(flag_reviewed_products, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,75 @@
+# Generated by Django 5.2.18 on 2026-10-19 05:43
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("api", "0012_product_rating_score"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="Sequence",
+            fields=[
+                (
+                    "name",
+                    models.CharField(max_length=100, primary_key=True, serialize=False),
+                ),
+                ("value", models.BigIntegerField(default=0)),
+            ],
+            options={
+                "db_table": "Sequences",
+            },
+        ),
+        migrations.AlterField(
+            model_name="order",
+            name="order_number",
+            field=models.CharField(editable=False, max_length=32, unique=True),
+        ),
+        migrations.AlterField(
+            model_name="orderitem",
+            name="order_item_id",
+            field=models.CharField(
+                editable=False,
+                max_length=24,
+                primary_key=True,
+                serialize=False,
+                unique=True,
+            ),
+        ),
+        migrations.AlterField(
+            model_name="payment",
+            name="payment_id",
+            field=models.CharField(
+                editable=False,
+                max_length=24,
+                primary_key=True,
+                serialize=False,
+                unique=True,
+            ),
+        ),
+        migrations.AlterField(
+            model_name="reviews",
+            name="review_id",
+            field=models.CharField(
+                editable=False,
+                max_length=24,
+                primary_key=True,
+                serialize=False,
+                unique=True,
+            ),
+        ),
+        migrations.AlterField(
+            model_name="subcategory",
+            name="sub_category_id",
+            field=models.CharField(
+                editable=False,
+                max_length=32,
+                primary_key=True,
+                serialize=False,
+                unique=True,
+            ),
+        ),
+    ]
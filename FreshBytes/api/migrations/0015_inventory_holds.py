@@ -0,0 +1,119 @@
+# Generated by Django 5.2.18 on 2026-10-19 05:53
+
+import django.db.models.deletion
+import uuid
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("api", "0014_idempotency_keys"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="product",
+            name="stock_shards",
+            field=models.PositiveSmallIntegerField(default=0),
+        ),
+        migrations.CreateModel(
+            name="InventoryHold",
+            fields=[
+                (
+                    "hold_id",
+                    models.UUIDField(
+                        default=uuid.uuid4,
+                        editable=False,
+                        primary_key=True,
+                        serialize=False,
+                    ),
+                ),
+                ("quantity", models.PositiveIntegerField()),
+                ("allocations", models.JSONField(blank=True, default=dict)),
+                (
+                    "status",
+                    models.CharField(
+                        choices=[
+                            ("ACTIVE", "Active"),
+                            ("CONVERTED", "Converted"),
+                            ("RELEASED", "Released"),
+                            ("EXPIRED", "Expired"),
+                        ],
+                        default="ACTIVE",
+                        max_length=20,
+                    ),
+                ),
+                ("expires_at", models.DateTimeField()),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+                (
+                    "order",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        related_name="inventory_holds",
+                        to="api.order",
+                    ),
+                ),
+                (
+                    "product",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="holds",
+                        to="api.product",
+                    ),
+                ),
+                (
+                    "user",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="inventory_holds",
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+            ],
+            options={
+                "db_table": "InventoryHolds",
+                "indexes": [
+                    models.Index(
+                        fields=["status", "expires_at"],
+                        name="InventoryHo_status_7f1a7b_idx",
+                    ),
+                    models.Index(
+                        fields=["user", "status"], name="InventoryHo_user_id_4ba350_idx"
+                    ),
+                ],
+            },
+        ),
+        migrations.CreateModel(
+            name="StockShard",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("shard_no", models.PositiveSmallIntegerField()),
+                ("quantity", models.IntegerField(default=0)),
+                (
+                    "product",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="shards",
+                        to="api.product",
+                    ),
+                ),
+            ],
+            options={
+                "db_table": "StockShards",
+                "unique_together": {("product", "shard_no")},
+            },
+        ),
+    ]
@@ -0,0 +1,101 @@
+# Generated by Django 5.2.18 on 2026-10-19 05:57
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Sum
+
+
+def record_opening_balances(apps, schema_editor):
+    InventoryMovement = apps.get_model("api", "InventoryMovement")
+    Product = apps.get_model("api", "Product")
+    StockShard = apps.get_model("api", "StockShard")
+
+    shard_totals = dict(
+        StockShard.objects.order_by().values("product_id").annotate(total=Sum("quantity")).values_list("product_id", "total")
+    )
+    batch = []
+    for product_id, quantity, stock_shards in Product.objects.values_list("product_id", "quantity", "stock_shards").iterator():
+        level = shard_totals.get(product_id, 0) if stock_shards else quantity
+        if level:
+            batch.append(
+                InventoryMovement(product_id=product_id, kind="ADJUSTMENT", quantity=level, applied=True, note="Opening balance")
+            )
+        if len(batch) >= 1000:
+            InventoryMovement.objects.bulk_create(batch)
+            batch = []
+    InventoryMovement.objects.bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("api", "0015_inventory_holds"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="InventoryMovement",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "kind",
+                    models.CharField(
+                        choices=[
+                            ("RECEIPT", "Receipt"),
+                            ("SALE", "Sale"),
+                            ("CANCEL", "Cancel"),
+                            ("REFUND", "Refund"),
+                            ("ADJUSTMENT", "Adjustment"),
+                            ("HOLD", "Hold"),
+                            ("RELEASE", "Release"),
+                        ],
+                        max_length=20,
+                    ),
+                ),
+                ("quantity", models.IntegerField()),
+                ("applied", models.BooleanField(default=False)),
+                ("note", models.CharField(blank=True, default="", max_length=255)),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                (
+                    "order",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        related_name="inventory_movements",
+                        to="api.order",
+                    ),
+                ),
+                (
+                    "product",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="movements",
+                        to="api.product",
+                    ),
+                ),
+            ],
+            options={
+                "db_table": "InventoryMovements",
+                "indexes": [
+                    models.Index(
+                        fields=["product", "id"], name="InventoryMo_product_3ccc9b_idx"
+                    ),
+                    models.Index(
+                        condition=models.Q(("applied", False)),
+                        fields=["id"],
+                        name="inventory_movement_pending",
+                    ),
+                ],
+            },
+        ),
+        migrations.RunPython(record_opening_balances, migrations.RunPython.noop),
+    ]
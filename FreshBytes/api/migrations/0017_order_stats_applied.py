@@ -0,0 +1,25 @@
+# Generated by Django 5.2.18 on 2026-10-19 05:59
+
+from django.db import migrations, models
+
+
+def mark_delivered_orders(apps, schema_editor):
+    # Seller and product stats were recomputed from every delivered order, so those are already counted
+    Order = apps.get_model("api", "Order")
+    Order.objects.filter(order_status="DELIVERED").update(stats_applied=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("api", "0016_inventory_ledger"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="order",
+            name="stats_applied",
+            field=models.BooleanField(default=False, editable=False),
+        ),
+        migrations.RunPython(mark_delivered_orders, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,92 @@
+# Generated by Django 5.2.18 on 2026-10-19 06:06
+
+import django.db.models.deletion
+import uuid
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("api", "0018_job_queue"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="CheckoutTicket",
+            fields=[
+                (
+                    "ticket_id",
+                    models.UUIDField(
+                        default=uuid.uuid4,
+                        editable=False,
+                        primary_key=True,
+                        serialize=False,
+                    ),
+                ),
+                ("cart_item_ids", models.JSONField(blank=True, null=True)),
+                ("payment_method", models.CharField(max_length=20)),
+                (
+                    "status",
+                    models.CharField(
+                        choices=[
+                            ("QUEUED", "Queued"),
+                            ("PROCESSING", "Processing"),
+                            ("COMPLETED", "Completed"),
+                            ("FAILED", "Failed"),
+                        ],
+                        default="QUEUED",
+                        max_length=20,
+                    ),
+                ),
+                ("error", models.CharField(blank=True, default="", max_length=255)),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                "db_table": "CheckoutTickets",
+            },
+        ),
+        migrations.RemoveIndex(
+            model_name="job",
+            name="Jobs_status_3b92df_idx",
+        ),
+        migrations.AddField(
+            model_name="job",
+            name="queue",
+            field=models.CharField(default="default", max_length=50),
+        ),
+        migrations.AddIndex(
+            model_name="job",
+            index=models.Index(
+                fields=["queue", "status", "run_after"], name="Jobs_queue_6480d5_idx"
+            ),
+        ),
+        migrations.AddField(
+            model_name="checkoutticket",
+            name="order",
+            field=models.ForeignKey(
+                blank=True,
+                null=True,
+                on_delete=django.db.models.deletion.SET_NULL,
+                related_name="+",
+                to="api.order",
+            ),
+        ),
+        migrations.AddField(
+            model_name="checkoutticket",
+            name="user",
+            field=models.ForeignKey(
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="checkout_tickets",
+                to=settings.AUTH_USER_MODEL,
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="checkoutticket",
+            index=models.Index(
+                fields=["status", "created_at"], name="CheckoutTic_status_9cabd7_idx"
+            ),
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 5.2.18 on 2026-10-19 06:08
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("api", "0019_checkout_tickets"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="order",
+            index=models.Index(
+                fields=["user_id", "-order_date"], name="Orders_user_id_2ca779_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="order",
+            index=models.Index(
+                fields=["user_id", "order_status", "-order_date"],
+                name="Orders_user_id_53c5a2_idx",
+            ),
+        ),
+    ]
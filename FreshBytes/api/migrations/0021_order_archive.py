@@ -0,0 +1,140 @@
+# Generated by Django 5.2.18 on 2026-10-19 06:10
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("api", "0020_order_listing_indexes"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ArchivedOrder",
+            fields=[
+                (
+                    "order_id",
+                    models.UUIDField(editable=False, primary_key=True, serialize=False),
+                ),
+                (
+                    "order_number",
+                    models.CharField(editable=False, max_length=32, unique=True),
+                ),
+                ("order_date", models.DateTimeField()),
+                (
+                    "order_total",
+                    models.DecimalField(decimal_places=2, default=0, max_digits=10),
+                ),
+                ("order_status", models.CharField(max_length=255)),
+                ("is_archived", models.BooleanField(default=False)),
+                ("stats_applied", models.BooleanField(default=False)),
+                ("created_at", models.DateTimeField()),
+                ("updated_at", models.DateTimeField()),
+                ("archived_at", models.DateTimeField(auto_now_add=True)),
+                (
+                    "user_id",
+                    models.ForeignKey(
+                        db_column="user_id",
+                        null=True,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="archived_orders",
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+            ],
+            options={
+                "db_table": "ArchivedOrders",
+            },
+        ),
+        migrations.CreateModel(
+            name="ArchivedOrderItem",
+            fields=[
+                (
+                    "order_item_id",
+                    models.CharField(
+                        editable=False, max_length=24, primary_key=True, serialize=False
+                    ),
+                ),
+                ("quantity", models.IntegerField(default=1)),
+                (
+                    "total_item_price",
+                    models.DecimalField(decimal_places=2, default=0, max_digits=10),
+                ),
+                ("created_at", models.DateTimeField()),
+                ("updated_at", models.DateTimeField()),
+                (
+                    "order_id",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="order_items",
+                        to="api.archivedorder",
+                    ),
+                ),
+                (
+                    "product_id",
+                    models.ForeignKey(
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        related_name="archived_order_items",
+                        to="api.product",
+                    ),
+                ),
+            ],
+            options={
+                "db_table": "ArchivedOrderItems",
+            },
+        ),
+        migrations.CreateModel(
+            name="ArchivedPayment",
+            fields=[
+                (
+                    "payment_id",
+                    models.CharField(
+                        editable=False, max_length=24, primary_key=True, serialize=False
+                    ),
+                ),
+                ("payment_method", models.CharField(max_length=20)),
+                ("payment_status", models.CharField(max_length=20)),
+                ("amount", models.DecimalField(decimal_places=2, max_digits=10)),
+                (
+                    "tax",
+                    models.DecimalField(decimal_places=2, default=0, max_digits=10),
+                ),
+                (
+                    "revenue",
+                    models.DecimalField(decimal_places=2, default=0, max_digits=10),
+                ),
+                ("payment_date", models.DateTimeField(blank=True, null=True)),
+                (
+                    "transaction_id",
+                    models.CharField(blank=True, max_length=255, null=True),
+                ),
+                (
+                    "gateway_response",
+                    models.CharField(blank=True, max_length=255, null=True),
+                ),
+                ("created_at", models.DateTimeField()),
+                ("updated_at", models.DateTimeField()),
+                (
+                    "order_id",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="payments",
+                        to="api.archivedorder",
+                    ),
+                ),
+            ],
+            options={
+                "db_table": "ArchivedPayments",
+            },
+        ),
+        migrations.AddIndex(
+            model_name="archivedorder",
+            index=models.Index(
+                fields=["user_id", "-order_date"], name="ArchivedOrd_user_id_3369d8_idx"
+            ),
+        ),
+    ]
@@ -0,0 +1,111 @@
+# Generated by Django 5.2.18 on 2026-10-19 06:12
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Sum
+
+
+def backfill_seller_orders(apps, schema_editor):
+    SellerOrder = apps.get_model("api", "SellerOrder")
+    for item_model in ("OrderItem", "ArchivedOrderItem"):
+        OrderItem = apps.get_model("api", item_model)
+        shares = (
+            OrderItem.objects.exclude(product_id__seller_id=None)
+            .values(
+                "order_id", "order_id__order_number", "order_id__user_id", "order_id__order_status",
+                "order_id__order_date", "product_id__seller_id",
+            )
+            .annotate(item_count=Count("pk"), units=Sum("quantity"), total=Sum("total_item_price"))
+            .order_by()
+        )
+        batch = []
+        for share in shares.iterator(chunk_size=2000):
+            batch.append(
+                SellerOrder(
+                    seller_id=share["product_id__seller_id"],
+                    order_id=share["order_id"],
+                    order_number=share["order_id__order_number"],
+                    customer_id=share["order_id__user_id"],
+                    order_status=share["order_id__order_status"],
+                    order_date=share["order_id__order_date"],
+                    item_count=share["item_count"],
+                    units=share["units"] or 0,
+                    total=share["total"] or 0,
+                )
+            )
+            if len(batch) >= 1000:
+                SellerOrder.objects.bulk_create(batch)
+                batch = []
+        SellerOrder.objects.bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("api", "0021_order_archive"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="SellerOrder",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("order_id", models.UUIDField()),
+                ("order_number", models.CharField(max_length=32)),
+                ("order_status", models.CharField(max_length=255)),
+                ("order_date", models.DateTimeField()),
+                ("item_count", models.PositiveIntegerField(default=0)),
+                ("units", models.PositiveIntegerField(default=0)),
+                (
+                    "total",
+                    models.DecimalField(decimal_places=2, default=0, max_digits=10),
+                ),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+                (
+                    "customer",
+                    models.ForeignKey(
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        related_name="+",
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+                (
+                    "seller",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="seller_orders",
+                        to="api.seller",
+                    ),
+                ),
+            ],
+            options={
+                "db_table": "SellerOrders",
+                "indexes": [
+                    models.Index(
+                        fields=["seller", "-order_date"],
+                        name="SellerOrder_seller__b3c578_idx",
+                    ),
+                    models.Index(
+                        fields=["seller", "order_status", "-order_date"],
+                        name="SellerOrder_seller__79417b_idx",
+                    ),
+                    models.Index(
+                        fields=["order_id"], name="SellerOrder_order_i_61dab3_idx"
+                    ),
+                ],
+                "unique_together": {("seller", "order_id")},
+            },
+        ),
+        migrations.RunPython(backfill_seller_orders, migrations.RunPython.noop),
+    ]
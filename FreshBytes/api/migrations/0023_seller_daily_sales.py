@@ -0,0 +1,94 @@
+# Generated by Django 5.2.18 on 2026-10-19 06:14
+
+import django.db.models.deletion
+from decimal import Decimal
+from django.db import migrations, models
+from django.db.models import Count, F, Q, Sum, Value
+from django.db.models.functions import Coalesce, TruncDate
+
+
+def backfill_daily_sales(apps, schema_editor):
+    SellerOrder = apps.get_model("api", "SellerOrder")
+    SellerDailySales = apps.get_model("api", "SellerDailySales")
+    zero = Value(Decimal("0"))
+    cancelled = Q(order_status="CANCELLED")
+    refunded = Q(order_status="REFUNDED")
+    rows = (
+        SellerOrder.objects.annotate(day=TruncDate("order_date"))
+        .values("seller_id", "day")
+        .annotate(
+            orders=Count("id"),
+            units=Sum("units"),
+            gross=Sum(F("total") + F("discount")),
+            discounts=Sum("discount"),
+            cancellations=Count("id", filter=cancelled),
+            cancelled_amount=Coalesce(Sum("total", filter=cancelled), zero),
+            refunds=Count("id", filter=refunded),
+            refunded_amount=Coalesce(Sum("total", filter=refunded), zero),
+        )
+        .order_by()
+    )
+    SellerDailySales.objects.bulk_create([SellerDailySales(**row) for row in rows], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("api", "0022_seller_orders"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="sellerorder",
+            name="discount",
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=10),
+        ),
+        migrations.CreateModel(
+            name="SellerDailySales",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("day", models.DateField()),
+                ("orders", models.PositiveIntegerField(default=0)),
+                ("units", models.PositiveIntegerField(default=0)),
+                (
+                    "gross",
+                    models.DecimalField(decimal_places=2, default=0, max_digits=12),
+                ),
+                (
+                    "discounts",
+                    models.DecimalField(decimal_places=2, default=0, max_digits=12),
+                ),
+                ("cancellations", models.PositiveIntegerField(default=0)),
+                (
+                    "cancelled_amount",
+                    models.DecimalField(decimal_places=2, default=0, max_digits=12),
+                ),
+                ("refunds", models.PositiveIntegerField(default=0)),
+                (
+                    "refunded_amount",
+                    models.DecimalField(decimal_places=2, default=0, max_digits=12),
+                ),
+                (
+                    "seller",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="daily_sales",
+                        to="api.seller",
+                    ),
+                ),
+            ],
+            options={
+                "db_table": "SellerDailySales",
+                "unique_together": {("seller", "day")},
+            },
+        ),
+        migrations.RunPython(backfill_daily_sales, migrations.RunPython.noop),
+    ]
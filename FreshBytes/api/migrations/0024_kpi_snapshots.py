@@ -0,0 +1,40 @@
+# Generated by Django 5.2.18 on 2026-10-19 06:16
+
+import django.core.serializers.json
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("api", "0023_seller_daily_sales"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="KpiSnapshot",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "metrics",
+                    models.JSONField(
+                        encoder=django.core.serializers.json.DjangoJSONEncoder
+                    ),
+                ),
+                ("duration_ms", models.PositiveIntegerField(default=0)),
+                ("created_at", models.DateTimeField(auto_now_add=True, db_index=True)),
+            ],
+            options={
+                "db_table": "KpiSnapshots",
+                "get_latest_by": "created_at",
+            },
+        ),
+    ]
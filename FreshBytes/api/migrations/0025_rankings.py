@@ -0,0 +1,34 @@
+# Generated by Django 5.2.18 on 2026-10-19 06:18
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("api", "0024_kpi_snapshots"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="Ranking",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("scope", models.CharField(max_length=100, unique=True)),
+                ("entries", models.JSONField(default=dict)),
+                ("floor", models.FloatField(default=0)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                "db_table": "Rankings",
+            },
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 5.2.18 on 2026-10-19 06:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("api", "0025_rankings"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="TrendingShard",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("shard", models.CharField(max_length=100, unique=True)),
+                ("landmark", models.FloatField()),
+                ("cells", models.BinaryField()),
+                ("candidates", models.JSONField(default=list)),
+                ("updated_at", models.DateTimeField(auto_now=True, db_index=True)),
+            ],
+            options={
+                "db_table": "TrendingShards",
+            },
+        ),
+    ]
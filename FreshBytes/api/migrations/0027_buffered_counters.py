@@ -0,0 +1,80 @@
+# Generated by Django 5.2.18 on 2026-10-19 06:22
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("api", "0026_trending_shards"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="CounterFlush",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("batch", models.CharField(max_length=255, unique=True)),
+                ("applied_at", models.DateTimeField(auto_now_add=True, db_index=True)),
+            ],
+            options={
+                "db_table": "CounterFlushes",
+            },
+        ),
+        migrations.AddField(
+            model_name="product",
+            name="view_count",
+            field=models.IntegerField(default=0),
+        ),
+        migrations.CreateModel(
+            name="SellerReaction",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "kind",
+                    models.CharField(
+                        choices=[("LIKE", "Like"), ("FOLLOW", "Follow")], max_length=10
+                    ),
+                ),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                (
+                    "seller",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="reactions",
+                        to="api.seller",
+                    ),
+                ),
+                (
+                    "user",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="seller_reactions",
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+            ],
+            options={
+                "db_table": "SellerReactions",
+                "unique_together": {("seller", "user", "kind")},
+            },
+        ),
+    ]
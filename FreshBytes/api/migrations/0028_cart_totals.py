@@ -0,0 +1,49 @@
+# Generated by Django 5.2.18 on 2026-10-19 06:24
+
+from decimal import Decimal
+from django.db import migrations, models
+from django.db.models import DecimalField, ExpressionWrapper, F, OuterRef, PositiveIntegerField, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+
+
+def backfill_cart_totals(apps, schema_editor):
+    Cart = apps.get_model("api", "Cart")
+    CartItem = apps.get_model("api", "CartItem")
+    lines = CartItem.objects.filter(cart=OuterRef("pk")).order_by().values("cart")
+    line_total = ExpressionWrapper(F("quantity") * F("unit_price"), output_field=DecimalField(max_digits=12, decimal_places=2))
+    Cart.objects.update(
+        total_items=Coalesce(
+            Subquery(lines.annotate(units=Sum("quantity")).values("units")), Value(0),
+            output_field=PositiveIntegerField()
+        ),
+        total_amount=Coalesce(
+            Subquery(lines.annotate(amount=Sum(line_total)).values("amount")), Value(Decimal("0")),
+            output_field=DecimalField(max_digits=12, decimal_places=2)
+        ),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("api", "0027_buffered_counters"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="cart",
+            name="total_amount",
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=12),
+        ),
+        migrations.AddField(
+            model_name="cart",
+            name="total_items",
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="cart",
+            name="version",
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(backfill_cart_totals, migrations.RunPython.noop),
+    ]
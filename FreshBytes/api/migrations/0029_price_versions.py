@@ -0,0 +1,31 @@
+# Generated by Django 5.2.18 on 2026-10-19 06:30
+
+from django.db import migrations, models
+
+
+def outdate_existing_cart_lines(apps, schema_editor):
+    # Lines priced before versions existed may already be stale; have them repriced on first read
+    Product = apps.get_model("api", "Product")
+    CartItem = apps.get_model("api", "CartItem")
+    Product.objects.filter(pk__in=CartItem.objects.values("product")).update(price_version=1)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("api", "0028_cart_totals"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="cartitem",
+            name="price_version",
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="product",
+            name="price_version",
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(outdate_existing_cart_lines, migrations.RunPython.noop),
+    ]
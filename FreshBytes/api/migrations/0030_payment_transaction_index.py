@@ -0,0 +1,27 @@
+# Generated by Django 5.2.18 on 2026-10-19 06:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("api", "0029_price_versions"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="archivedpayment",
+            name="transaction_id",
+            field=models.CharField(
+                blank=True, db_index=True, max_length=255, null=True
+            ),
+        ),
+        migrations.AlterField(
+            model_name="payment",
+            name="transaction_id",
+            field=models.CharField(
+                blank=True, db_index=True, max_length=255, null=True
+            ),
+        ),
+    ]
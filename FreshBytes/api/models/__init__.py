@@ -1,9 +1,18 @@
 from .user import User, UserManager
-from .seller import Seller
+from .seller import Seller, SellerOrder, SellerDailySales, SellerReaction
 from .product import Product, ProductManager
-from .order import Order, OrderItem
+from .order import Order, OrderItem, CheckoutTicket
 from .cart import Cart, CartItem
 from .review import Reviews
 from .promo import Promo, PromoProduct
 from .payment import Payment
-from .category import Category, SubCategory
\ No newline at end of file
+from .category import Category, SubCategory
+from .sequence import Sequence
+from .idempotency import IdempotencyKey
+from .inventory import StockShard, InventoryHold, InventoryMovement
+from .job import Job
+from .archive import ArchivedOrder, ArchivedOrderItem, ArchivedPayment
+from .kpi import KpiSnapshot
+from .ranking import Ranking
+from .trending import TrendingShard
+from .counter import CounterFlush
@@ -0,0 +1,55 @@
+from django.db import models
+from .user import User
+from .product import Product
+
+# Cold storage for orders that reached a final status long ago (see
+# archive_services). Columns mirror Order/OrderItem/Payment so the same
+# serializers read either; rows here are read-only.
+
+class ArchivedOrder(models.Model):
+    order_id = models.UUIDField(primary_key=True, editable=False)
+    order_number = models.CharField(max_length=32, unique=True, editable=False)
+    user_id = models.ForeignKey(User, on_delete=models.CASCADE, null=True, db_column='user_id', related_name='archived_orders')
+    order_date = models.DateTimeField()
+    order_total = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+    order_status = models.CharField(max_length=255)
+    is_archived = models.BooleanField(default=False)
+    stats_applied = models.BooleanField(default=False)
+    created_at = models.DateTimeField()
+    updated_at = models.DateTimeField()
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        db_table = 'ArchivedOrders'
+        indexes = [
+            models.Index(fields=['user_id', '-order_date']),
+        ]
+
+class ArchivedOrderItem(models.Model):
+    order_item_id = models.CharField(primary_key=True, max_length=24, editable=False)
+    order_id = models.ForeignKey(ArchivedOrder, on_delete=models.CASCADE, related_name='order_items')
+    product_id = models.ForeignKey(Product, on_delete=models.SET_NULL, null=True, related_name='archived_order_items')
+    quantity = models.IntegerField(default=1)
+    total_item_price = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+    created_at = models.DateTimeField()
+    updated_at = models.DateTimeField()
+
+    class Meta:
+        db_table = 'ArchivedOrderItems'
+
+class ArchivedPayment(models.Model):
+    payment_id = models.CharField(primary_key=True, max_length=24, editable=False)
+    order_id = models.ForeignKey(ArchivedOrder, on_delete=models.CASCADE, related_name='payments')
+    payment_method = models.CharField(max_length=20)
+    payment_status = models.CharField(max_length=20)
+    amount = models.DecimalField(max_digits=10, decimal_places=2)
+    tax = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+    revenue = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+    payment_date = models.DateTimeField(null=True, blank=True)
+    transaction_id = models.CharField(max_length=255, null=True, blank=True, db_index=True)
+    gateway_response = models.CharField(max_length=255, null=True, blank=True)
+    created_at = models.DateTimeField()
+    updated_at = models.DateTimeField()
+
+    class Meta:
+        db_table = 'ArchivedPayments'
@@ -12,6 +12,11 @@ class Cart(models.Model):
         on_delete=models.CASCADE,
         related_name='cart'
     )
+    # Kept in step with the lines by cart_services.refresh_cart_totals on every change
+    total_items = models.PositiveIntegerField(default=0)
+    total_amount = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    # Bumped on every change; the cart's ETag
+    version = models.PositiveIntegerField(default=0)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
@@ -31,6 +36,8 @@ class CartItem(models.Model):
     )
     quantity = models.PositiveIntegerField(default=1)
     unit_price = models.DecimalField(max_digits=10, decimal_places=2)
+    # Product.price_version unit_price was taken at
+    price_version = models.PositiveIntegerField(default=0)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
@@ -45,6 +52,7 @@ class CartItem(models.Model):
                 if self.product.product_discountedPrice 
                 else self.product.product_price
             )
+            self.price_version = self.product.price_version
         super().save(*args, **kwargs)
 
     @property
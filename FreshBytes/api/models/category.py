@@ -14,7 +14,7 @@ class Category(models.Model):
         verbose_name_plural = 'Categories'
 
 class SubCategory(models.Model):
-    sub_category_id = models.CharField(primary_key=True, max_length=10, unique=True, editable=False)
+    sub_category_id = models.CharField(primary_key=True, max_length=32, unique=True, editable=False)
     category_id = models.ForeignKey(Category, on_delete=models.CASCADE, null=True)
     sub_category_name = models.CharField(max_length=255, default="", unique=True)
     sub_category_description = models.CharField(max_length=255)
@@ -23,14 +23,13 @@ class SubCategory(models.Model):
     updated_at = models.DateTimeField(auto_now=True)
 
     def save(self, *args, **kwargs):
-        from ..services.category_services import generate_subcategory_id, get_starting_counter
+        from ..services.category_services import generate_subcategory_id
+        from ..services.sequence_services import next_value
         if not self.sub_category_id:
             category_prefix = str(self.category_id.category_id) if self.category_id else "0"
-            last_sub_category = SubCategory.objects.filter(
-                category_id=self.category_id
-            ).order_by('-created_at').first()
-            starting_counter = get_starting_counter(category_prefix, last_sub_category)
-            self.sub_category_id = generate_subcategory_id(category_prefix, starting_counter)
+            self.sub_category_id = generate_subcategory_id(
+                category_prefix, next_value(f'subcategory:{category_prefix}')
+            )
         super().save(*args, **kwargs)
 
     class Meta:
@@ -0,0 +1,16 @@
+from django.db import models
+
+class CounterFlush(models.Model):
+    """
+    Journal files whose counter deltas were applied (see counter_services),
+    written in the same transaction as the deltas so a replay after a crash
+    never applies a journal twice.
+    """
+    batch = models.CharField(max_length=255, unique=True)
+    applied_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    def __str__(self):
+        return self.batch
+
+    class Meta:
+        db_table = 'CounterFlushes'
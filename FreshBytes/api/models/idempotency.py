@@ -0,0 +1,27 @@
+from django.db import models
+from django.core.serializers.json import DjangoJSONEncoder
+from .user import User
+
+class IdempotencyKey(models.Model):
+    STATUS_CHOICES = [
+        ('IN_PROGRESS', 'In progress'),
+        ('COMPLETED', 'Completed'),
+    ]
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='idempotency_keys')
+    scope = models.CharField(max_length=100)
+    key = models.CharField(max_length=255)
+    fingerprint = models.CharField(max_length=64)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='IN_PROGRESS')
+    response_status = models.PositiveSmallIntegerField(null=True, blank=True)
+    response_body = models.JSONField(null=True, blank=True, encoder=DjangoJSONEncoder)
+    locked_until = models.DateTimeField()
+    expires_at = models.DateTimeField(db_index=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.scope}:{self.key} - {self.status}"
+
+    class Meta:
+        db_table = 'IdempotencyKeys'
+        unique_together = ('user', 'scope', 'key')
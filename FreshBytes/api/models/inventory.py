@@ -0,0 +1,76 @@
+from django.db import models
+import uuid
+from .user import User
+from .product import Product
+from .order import Order
+
+class StockShard(models.Model):
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='shards')
+    shard_no = models.PositiveSmallIntegerField()
+    quantity = models.IntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.product_id}#{self.shard_no} = {self.quantity}"
+
+    class Meta:
+        db_table = 'StockShards'
+        unique_together = ('product', 'shard_no')
+
+class InventoryHold(models.Model):
+    STATUS_CHOICES = [
+        ('ACTIVE', 'Active'),
+        ('CONVERTED', 'Converted'),
+        ('RELEASED', 'Released'),
+        ('EXPIRED', 'Expired'),
+    ]
+    hold_id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='inventory_holds')
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='holds')
+    quantity = models.PositiveIntegerField()
+    # {shard_no: quantity} taken from a sharded product; empty when taken from Product.quantity
+    allocations = models.JSONField(default=dict, blank=True)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='ACTIVE')
+    order = models.ForeignKey(Order, on_delete=models.SET_NULL, null=True, blank=True, related_name='inventory_holds')
+    expires_at = models.DateTimeField()
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.product_id} x{self.quantity} - {self.status}"
+
+    class Meta:
+        db_table = 'InventoryHolds'
+        indexes = [
+            models.Index(fields=['status', 'expires_at']),
+            models.Index(fields=['user', 'status']),
+        ]
+
+class InventoryMovement(models.Model):
+    KIND_CHOICES = [
+        ('RECEIPT', 'Receipt'),
+        ('SALE', 'Sale'),
+        ('CANCEL', 'Cancel'),
+        ('REFUND', 'Refund'),
+        ('ADJUSTMENT', 'Adjustment'),
+        ('HOLD', 'Hold'),
+        ('RELEASE', 'Release'),
+    ]
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='movements')
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    # Signed change to available stock
+    quantity = models.IntegerField()
+    # Whether the change is already reflected in Product.quantity / the product's shards
+    applied = models.BooleanField(default=False)
+    order = models.ForeignKey(Order, on_delete=models.SET_NULL, null=True, blank=True, related_name='inventory_movements')
+    note = models.CharField(max_length=255, blank=True, default='')
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.product_id} {self.kind} {self.quantity:+d}"
+
+    class Meta:
+        db_table = 'InventoryMovements'
+        indexes = [
+            models.Index(fields=['product', 'id']),
+            models.Index(fields=['id'], condition=models.Q(applied=False), name='inventory_movement_pending'),
+        ]
@@ -0,0 +1,42 @@
+from django.db import models
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils import timezone
+
+class Job(models.Model):
+    STATUS_CHOICES = [
+        ('PENDING', 'Pending'),
+        ('RUNNING', 'Running'),
+        ('FAILED', 'Failed'),
+    ]
+    # Dotted path of the function to call, e.g. 'api.services.promo_services.reprice_products'
+    task = models.CharField(max_length=255)
+    # Workers serve one queue each, so e.g. checkouts get their own bounded pool
+    queue = models.CharField(max_length=50, default='default')
+    kwargs = models.JSONField(default=dict, encoder=DjangoJSONEncoder)
+    # At most one pending job per key; repeats are dropped while one is still waiting
+    dedupe_key = models.CharField(max_length=255, null=True, blank=True)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='PENDING')
+    attempts = models.PositiveSmallIntegerField(default=0)
+    run_after = models.DateTimeField(default=timezone.now)
+    claim_token = models.CharField(max_length=32, null=True, blank=True)
+    locked_until = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True, default='')
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.task} - {self.status}"
+
+    class Meta:
+        db_table = 'Jobs'
+        indexes = [
+            models.Index(fields=['queue', 'status', 'run_after']),
+            models.Index(fields=['claim_token']),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=['dedupe_key'],
+                condition=models.Q(status='PENDING'),
+                name='job_pending_dedupe_key'
+            ),
+        ]
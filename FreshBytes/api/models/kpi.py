@@ -0,0 +1,16 @@
+from django.db import models
+from django.core.serializers.json import DjangoJSONEncoder
+
+class KpiSnapshot(models.Model):
+    """Platform metrics computed by kpi_services.take_snapshot; the admin dashboard reads the latest one"""
+    metrics = models.JSONField(encoder=DjangoJSONEncoder)
+    # Time spent computing the metrics, to keep an eye on the scan cost
+    duration_ms = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    def __str__(self):
+        return f"KPI snapshot {self.created_at:%Y-%m-%d %H:%M:%S}"
+
+    class Meta:
+        db_table = 'KpiSnapshots'
+        get_latest_by = 'created_at'
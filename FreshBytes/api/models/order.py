@@ -6,7 +6,7 @@ from .product import Product
 
 class Order(models.Model):
     order_id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False, unique=True)
-    order_number = models.CharField(max_length=20, unique=True, editable=False)
+    order_number = models.CharField(max_length=32, unique=True, editable=False)
     user_id = models.ForeignKey(User, on_delete=models.CASCADE, null=True, db_column='user_id')
     order_date = models.DateTimeField(auto_now_add=True)
     order_total = models.DecimalField(max_digits=10, decimal_places=2, default=0)
@@ -23,30 +23,29 @@ class Order(models.Model):
         default='PENDING'
     )
     is_archived = models.BooleanField(default=False)
+    # Whether this order's sales are currently counted in the seller/product stats
+    stats_applied = models.BooleanField(default=False, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
     def save(self, *args, **kwargs):
         if not self.order_number:
-            from datetime import datetime
-            year = datetime.now().year
-            last_order = Order.objects.filter(order_number__startswith=f'OID-{year}').order_by('-created_at').first()
-            if last_order and last_order.order_number:
-                try:
-                    last_num = int(last_order.order_number.split('-')[-1])
-                except Exception:
-                    last_num = 0
-                new_num = last_num + 1
-            else:
-                new_num = 1
-            self.order_number = f'OID-{year}-{new_num:05d}'
+            from ..services.order_services import generate_order_number
+            from ..services.sequence_services import next_value
+            year = timezone.now().year
+            self.order_number = generate_order_number(next_value(f'order_number:{year}'), year)
         super().save(*args, **kwargs)
 
     class Meta:
         db_table = 'Orders'
+        indexes = [
+            # "My Orders": newest first, optionally narrowed to a status
+            models.Index(fields=['user_id', '-order_date']),
+            models.Index(fields=['user_id', 'order_status', '-order_date']),
+        ]
 
 class OrderItem(models.Model):
-    order_item_id = models.CharField(primary_key=True, max_length=10, unique=True, editable=False)
+    order_item_id = models.CharField(primary_key=True, max_length=24, unique=True, editable=False)
     order_id = models.ForeignKey(Order, on_delete=models.CASCADE, related_name='order_items')
     product_id = models.ForeignKey(Product, on_delete=models.CASCADE, null=True)
     quantity = models.IntegerField(default=1)
@@ -56,12 +55,38 @@ class OrderItem(models.Model):
 
     def save(self, *args, **kwargs):
         from ..services.order_services import generate_order_item_id, calculate_order_item_total
+        from ..services.sequence_services import next_value
         if not self.order_item_id:
-            last_order_item = OrderItem.objects.order_by('-created_at').first()
-            self.order_item_id = generate_order_item_id(last_order_item)
+            self.order_item_id = generate_order_item_id(next_value('order_item'))
         if self.product_id:
             self.total_item_price = calculate_order_item_total(self.product_id, self.quantity)
         super().save(*args, **kwargs)
 
     class Meta:
         db_table = 'OrderItems'
+
+class CheckoutTicket(models.Model):
+    STATUS_CHOICES = [
+        ('QUEUED', 'Queued'),
+        ('PROCESSING', 'Processing'),
+        ('COMPLETED', 'Completed'),
+        ('FAILED', 'Failed'),
+    ]
+    ticket_id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='checkout_tickets')
+    cart_item_ids = models.JSONField(null=True, blank=True)
+    payment_method = models.CharField(max_length=20)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='QUEUED')
+    order = models.ForeignKey(Order, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    error = models.CharField(max_length=255, blank=True, default='')
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.ticket_id} - {self.status}"
+
+    class Meta:
+        db_table = 'CheckoutTickets'
+        indexes = [
+            models.Index(fields=['status', 'created_at']),
+        ]
@@ -14,7 +14,7 @@ class Payment(models.Model):
         ('FAILED', 'Failed'),
         ('REFUNDED', 'Refunded'),
     ]
-    payment_id = models.CharField(primary_key=True, max_length=12, unique=True, editable=False)
+    payment_id = models.CharField(primary_key=True, max_length=24, unique=True, editable=False)
     order_id = models.ForeignKey(Order, on_delete=models.CASCADE, related_name='payments')
     payment_method = models.CharField(max_length=20, choices=PAYMENT_METHODS)
     payment_status = models.CharField(max_length=20, choices=PAYMENT_STATUS, default='PENDING')
@@ -22,11 +22,18 @@ class Payment(models.Model):
     tax = models.DecimalField(max_digits=10, decimal_places=2, default=0)
     revenue = models.DecimalField(max_digits=10, decimal_places=2, default=0)
     payment_date = models.DateTimeField(auto_now_add=True, null=True, blank=True)
-    transaction_id = models.CharField(max_length=255, null=True, blank=True)
+    transaction_id = models.CharField(max_length=255, null=True, blank=True, db_index=True)
     gateway_response = models.CharField(max_length=255, null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    def save(self, *args, **kwargs):
+        if not self.payment_id:
+            from ..services.payment_services import generate_payment_id
+            from ..services.sequence_services import next_value
+            self.payment_id = generate_payment_id(next_value('payment'))
+        super().save(*args, **kwargs)
+
     def __str__(self):
         return f"{self.payment_id} - {self.order_id.order_number} - {self.payment_status}"
 
@@ -32,15 +32,28 @@ class Product(models.Model):
     has_promo = models.BooleanField(default=False)
     weight = models.DecimalField(max_digits=10, decimal_places=2, default=0, validators=[MinValueValidator(0.01)])
     quantity = models.IntegerField(default=1, validators=[MinValueValidator(0)])
+    stock_shards = models.PositiveSmallIntegerField(default=0)
     post_date = models.DateTimeField(default=timezone.now)
     harvest_date = models.DateTimeField(null=True)
     is_active = models.BooleanField(default=True)
     review_count = models.IntegerField(default=0)
+    review_rating_sum = models.IntegerField(default=0)
+    review_rating_1 = models.IntegerField(default=0)
+    review_rating_2 = models.IntegerField(default=0)
+    review_rating_3 = models.IntegerField(default=0)
+    review_rating_4 = models.IntegerField(default=0)
+    review_rating_5 = models.IntegerField(default=0)
     top_rated = models.BooleanField(default=False)
+    rating_score = models.DecimalField(max_digits=4, decimal_places=3, default=0, db_index=True)
+    rating_dirty = models.BooleanField(default=False, db_index=True)
     is_srp = models.BooleanField(default=False)
     is_discounted = models.BooleanField(default=False)
+    # Bumped whenever the selling price changes; cart lines priced at an older version are repriced on read
+    price_version = models.PositiveIntegerField(default=0)
     is_deleted = models.BooleanField(default=False)
     sell_count = models.IntegerField(default=0)
+    # Product page views, written in batches by counter_services
+    view_count = models.IntegerField(default=0)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     _skip_update = False  # Flag to prevent recursive updates
@@ -71,9 +84,36 @@ class Product(models.Model):
             finally:
                 self._skip_update = False  # Reset flag
 
+    # Stock counters are owned by the inventory ledger (inventory_services);
+    # a plain save() of an existing product never writes them back
+    STOCK_FIELDS = ('quantity', 'stock_shards')
+
+    # Counters kept with atomic F() deltas or set-based recomputes (sales, views,
+    # review aggregates and ratings); a plain save() never writes them back either
+    COUNTER_FIELDS = (
+        'sell_count', 'view_count', 'review_count', 'review_rating_sum',
+        'review_rating_1', 'review_rating_2', 'review_rating_3', 'review_rating_4', 'review_rating_5',
+        'rating_dirty', 'rating_score', 'top_rated', 'price_version',
+    )
+
+    # Fields that make up the selling price; changing any of them bumps price_version
+    PRICE_FIELDS = ('product_price', 'product_discountedPrice', 'is_discounted')
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._saved_prices = instance._price_state()
+        return instance
+
+    def _price_state(self):
+        # Read from __dict__ so deferred fields are not loaded just for the comparison
+        return tuple(self.__dict__.get(field) for field in self.PRICE_FIELDS)
+
     def save(self, *args, **kwargs):
         from ..services.product_services import generate_product_sku
+        from ..services.inventory_services import record_movements
         is_new = not self.pk  # Check if this is a new product
+        adding = self._state.adding
         if not self.product_sku:
             try:
                 self.product_sku = generate_product_sku(self)
@@ -81,7 +121,19 @@ class Product(models.Model):
                 pass  # leave blank if generator fails
         if self.product_price > 0 and (self.product_discountedPrice is None or self.product_discountedPrice <= 0):
             self.is_srp = True
-        super().save(*args, **kwargs)
+        if adding or 'update_fields' in kwargs:
+            super().save(*args, **kwargs)
+        else:
+            super().save(*args, update_fields=[
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in self.STOCK_FIELDS and field.name not in self.COUNTER_FIELDS
+            ], **kwargs)
+        if kwargs.get('update_fields') is None or not set(kwargs['update_fields']).isdisjoint(self.PRICE_FIELDS):
+            if not adding and self._price_state() != getattr(self, '_saved_prices', None):
+                Product.all_objects.filter(pk=self.pk).update(price_version=models.F('price_version') + 1)
+            self._saved_prices = self._price_state()
+        if adding and self.quantity:
+            record_movements([(self.pk, 'RECEIPT', self.quantity, None, 'Opening stock')], applied=True)
         if not is_new and not self._skip_update and 'update_fields' not in kwargs:
             self.update_discounted_price()
 
@@ -92,17 +144,22 @@ class Product(models.Model):
     class Meta:
         db_table = 'Products'
 
-# Signals for updating seller product count
+# Signals for updating seller product count (recounted by a background job)
 from django.db.models.signals import post_save, post_delete
 from django.dispatch import receiver
-from ..services.product_services import update_seller_total_products
+from ..services.job_services import enqueue
+from ..services.product_services import recount_seller_products
+
+def _enqueue_seller_recount(seller_pk):
+    if seller_pk:
+        enqueue(recount_seller_products, dedupe_key=f'seller-products:{seller_pk}', seller_pk=seller_pk)
 
 @receiver(post_save, sender=Product)
-def update_seller_product_count_on_save(sender, instance, **kwargs):
-    if instance.seller_id:
-        update_seller_total_products(instance.seller_id)
+def update_seller_product_count_on_save(sender, instance, update_fields=None, **kwargs):
+    # Only creating, (un)deleting or moving a product can change the count
+    if update_fields is None or {'is_deleted', 'seller_id'} & set(update_fields):
+        _enqueue_seller_recount(instance.seller_id_id)
 
 @receiver(post_delete, sender=Product)
 def update_seller_product_count_on_delete(sender, instance, **kwargs):
-    if instance.seller_id:
-        update_seller_total_products(instance.seller_id)
+    _enqueue_seller_recount(instance.seller_id_id)
@@ -10,15 +10,19 @@ class PromoProduct(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
 
     def save(self, *args, **kwargs):
+        from ..services.job_services import enqueue
+        from ..services.promo_services import reprice_products
         super().save(*args, **kwargs)
         # Update product's discount fields
-        self.product.update_discounted_price()
+        enqueue(reprice_products, product_ids=[self.product_id])
 
     def delete(self, *args, **kwargs):
-        product = self.product  # Store reference before deletion
+        from ..services.job_services import enqueue
+        from ..services.promo_services import reprice_products
+        product_pk = self.product_id  # Store reference before deletion
         super().delete(*args, **kwargs)
         # Update product's discount fields after removing promo
-        product.update_discounted_price()
+        enqueue(reprice_products, product_ids=[product_pk])
 
     class Meta:
         db_table = 'PromoProduct'
@@ -47,31 +51,59 @@ class Promo(models.Model):
     updated_at = models.DateTimeField(auto_now=True)
 
     def save(self, *args, **kwargs):
-        from ..services.promo_services import update_products_has_promo_on_promo_save
         # Ensure end date is after start date
         if self.promo_end_date <= self.promo_start_date:
             self.promo_end_date = self.promo_start_date + timezone.timedelta(days=7)
         super().save(*args, **kwargs)
-        update_products_has_promo_on_promo_save(self)
 
     class Meta:
         db_table = 'Promo'
 
-# Signal handlers for Promo-Product relationship
+# Signal handlers for Promo-Product relationship; products are repriced by background jobs
+import threading
+from contextlib import contextmanager
 from django.db.models.signals import post_save, pre_delete
 from django.dispatch import receiver
-from ..services.promo_services import update_products_has_promo_on_promo_save, update_products_has_promo_on_promo_delete, update_products_has_promo_on_m2m_change
+from ..services.job_services import enqueue
+from ..services.promo_services import reprice_products, reprice_promo_products
+
+# Flag to skip the per-promo handlers while a bulk operation reprices once itself
+_promo_signals = threading.local()
+
+@contextmanager
+def muted_promo_signals():
+    previous = getattr(_promo_signals, 'muted', False)
+    _promo_signals.muted = True
+    try:
+        yield
+    finally:
+        _promo_signals.muted = previous
 
 @receiver(post_save, sender=Promo)
 def handle_promo_save(sender, instance, created, **kwargs):
-    if not kwargs.get('raw', False):
-        update_products_has_promo_on_promo_save(instance)
+    if not kwargs.get('raw', False) and not getattr(_promo_signals, 'muted', False):
+        enqueue(reprice_promo_products, dedupe_key=f'promo-reprice:{instance.pk}', promo_pk=instance.pk)
 
 @receiver(pre_delete, sender=Promo)
 def handle_promo_pre_delete(sender, instance, **kwargs):
-    update_products_has_promo_on_promo_delete(instance)
+    if getattr(_promo_signals, 'muted', False):
+        return
+    # The links are gone by the time the job runs, so capture the products now
+    product_ids = list(instance.product_id.values_list('pk', flat=True))
+    if product_ids:
+        enqueue(reprice_products, product_ids=product_ids)
 
 @receiver(models.signals.m2m_changed, sender=Promo.product_id.through)
-def handle_promo_m2m_changes(sender, instance, action, pk_set, **kwargs):
-    if action.startswith("post_"):  # post_add, post_remove, post_clear
-        update_products_has_promo_on_m2m_change(instance, action, pk_set)
+def handle_promo_m2m_changes(sender, instance, action, pk_set, reverse=False, **kwargs):
+    if reverse:
+        # product.promos.add/remove/clear(): only this product's prices change
+        if action.startswith('post_'):
+            enqueue(reprice_products, product_ids=[instance.pk])
+    elif action == 'pre_clear':
+        instance._cleared_product_ids = list(instance.product_id.values_list('pk', flat=True))
+    elif action == 'post_clear':
+        product_ids = getattr(instance, '_cleared_product_ids', [])
+        if product_ids:
+            enqueue(reprice_products, product_ids=product_ids)
+    elif action in ('post_add', 'post_remove') and pk_set:
+        enqueue(reprice_products, product_ids=list(pk_set))
@@ -0,0 +1,20 @@
+from django.db import models
+
+class Ranking(models.Model):
+    """
+    A persisted top-K list maintained by ranking_services. Scopes look like
+    'products', 'products:category:<id>', 'products:subcategory:<id>',
+    'products:seller:<id>' or 'sellers'.
+    """
+    scope = models.CharField(max_length=100, unique=True)
+    # {id: score} for the best RANKING_CAPACITY entries of the scope
+    entries = models.JSONField(default=dict)
+    # Every id missing from entries scores at most this (0 when entries holds everyone who scores)
+    floor = models.FloatField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return self.scope
+
+    class Meta:
+        db_table = 'Rankings'
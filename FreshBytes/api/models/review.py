@@ -5,7 +5,7 @@ from .user import User
 from .product import Product
 
 class Reviews(models.Model):
-    review_id = models.CharField(primary_key=True, max_length=10, unique=True, editable=False)
+    review_id = models.CharField(primary_key=True, max_length=24, unique=True, editable=False)
     user_id = models.ForeignKey(User, on_delete=models.CASCADE, null=True, db_column='user_id')
     product_id = models.ForeignKey(Product, on_delete=models.CASCADE, null=True)
     review_rating = models.IntegerField(default=0, validators=[MinValueValidator(1), MaxValueValidator(5)])
@@ -15,16 +15,35 @@ class Reviews(models.Model):
     updated_at = models.DateTimeField(auto_now=True)
 
     def save(self, *args, **kwargs):
-        from ..services.review_services import generate_review_id, update_product_review_stats, update_seller_review_stats
+        from django.db import transaction
+        from ..services.job_services import enqueue
+        from ..services.review_services import generate_review_id, apply_review_delta
+        from ..services.sequence_services import next_value
         if not self.review_id:
-            last_review = Reviews.objects.order_by('-created_at').first()
-            self.review_id = generate_review_id(last_review)
-        super().save(*args, **kwargs)
-        # Update related statistics
-        if self.product_id:
-            update_product_review_stats(self.product_id)
-            if self.product_id.seller_id:
-                update_seller_review_stats(self.product_id.seller_id)
+            self.review_id = generate_review_id(next_value('review'))
+        with transaction.atomic():
+            previous = None
+            if not self._state.adding:
+                previous = Reviews.objects.filter(pk=self.pk).values_list('product_id', 'review_rating').first()
+            super().save(*args, **kwargs)
+            # Move this review's rating between the running aggregates once committed
+            if previous is None:
+                enqueue(apply_review_delta, product_pk=self.product_id_id, added_rating=self.review_rating)
+            elif previous[0] != self.product_id_id:
+                enqueue(apply_review_delta, product_pk=previous[0], removed_rating=previous[1])
+                enqueue(apply_review_delta, product_pk=self.product_id_id, added_rating=self.review_rating)
+            elif previous[1] != self.review_rating:
+                enqueue(apply_review_delta, product_pk=self.product_id_id, removed_rating=previous[1], added_rating=self.review_rating)
 
     class Meta:
         db_table = 'Reviews'
+
+# Signal handler keeping review aggregates in sync on (bulk) deletes
+from django.db.models.signals import post_delete
+from django.dispatch import receiver
+
+@receiver(post_delete, sender=Reviews)
+def handle_review_delete(sender, instance, **kwargs):
+    from ..services.job_services import enqueue
+    from ..services.review_services import apply_review_delta
+    enqueue(apply_review_delta, product_pk=instance.product_id_id, removed_rating=instance.review_rating)
@@ -18,6 +18,12 @@ class Seller(models.Model):
     total_orders = models.IntegerField(default=0)
     total_reviews = models.IntegerField(default=0)
     average_rating = models.DecimalField(max_digits=3, decimal_places=2, default=0)
+    review_rating_sum = models.IntegerField(default=0)
+    review_rating_1 = models.IntegerField(default=0)
+    review_rating_2 = models.IntegerField(default=0)
+    review_rating_3 = models.IntegerField(default=0)
+    review_rating_4 = models.IntegerField(default=0)
+    review_rating_5 = models.IntegerField(default=0)
     total_followers = models.IntegerField(default=0)
     total_likes = models.IntegerField(default=0)
     total_products_sold = models.IntegerField(default=0)
@@ -45,38 +51,109 @@ class Seller(models.Model):
 
     def get_customers(self):
         """
-        Returns a queryset of unique customers who have bought from this seller.
+        Returns this seller's customers (delivered orders only), most recent
+        first, as rows of customer, orders, total_spent and last_order_date.
         """
-        from .order import OrderItem
-        customer_ids = OrderItem.objects.filter(
-            product_id__seller_id=self,
-            order_id__order_status='DELIVERED'
-        ).values_list('order_id__user_id', flat=True).distinct()
-        return User.objects.filter(user_id__in=customer_ids)
+        from django.db.models import Count, Max, Sum
+        return SellerOrder.objects.filter(
+            seller=self,
+            order_status='DELIVERED'
+        ).values('customer').annotate(
+            orders=Count('pk'),
+            total_spent=Sum('total'),
+            last_order_date=Max('order_date')
+        ).order_by('-last_order_date', 'customer')
 
     def get_transactions(self):
         """
-        Returns a queryset of all orders (transactions) involving this seller.
+        Returns this seller's share of every order involving them, newest first.
         """
-        from .order import OrderItem, Order
-        order_ids = OrderItem.objects.filter(
-            product_id__seller_id=self
-        ).values_list('order_id', flat=True).distinct()
-        return Order.objects.filter(order_id__in=order_ids)
+        return SellerOrder.objects.filter(seller=self).order_by('-order_date', 'order_id')
 
     def get_products_bought_by_customer(self, customer):
         """
         Returns a queryset of products bought by a specific customer from this seller.
         """
+        from django.db.models import Q
+        from .archive import ArchivedOrderItem
         from .order import OrderItem
         from .product import Product
-        product_ids = OrderItem.objects.filter(
-            product_id__seller_id=self,
-            order_id__user_id=customer,
-            order_id__order_status='DELIVERED'
-        ).values_list('product_id', flat=True).distinct()
-        return Product.objects.filter(product_id__in=product_ids)
-    
+        order_ids = SellerOrder.objects.filter(
+            seller=self,
+            customer=customer,
+            order_status='DELIVERED'
+        ).values('order_id')
+        return Product.objects.filter(
+            Q(product_id__in=OrderItem.objects.filter(order_id__in=order_ids, product_id__seller_id=self).values('product_id')) |
+            Q(product_id__in=ArchivedOrderItem.objects.filter(order_id__in=order_ids, product_id__seller_id=self).values('product_id'))
+        )
+
 
     class Meta:
         db_table = 'Seller'
+
+class SellerOrder(models.Model):
+    """
+    One row per (seller, order): the seller's share of an order, written at
+    checkout and kept in step with the order status (see order_services).
+    Order fields are copied so seller listings never touch Orders/OrderItems,
+    and rows outlive the order's move to cold storage.
+    """
+    seller = models.ForeignKey(Seller, on_delete=models.CASCADE, related_name='seller_orders')
+    order_id = models.UUIDField()
+    order_number = models.CharField(max_length=32)
+    customer = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, related_name='+')
+    order_status = models.CharField(max_length=255)
+    order_date = models.DateTimeField()
+    item_count = models.PositiveIntegerField(default=0)
+    units = models.PositiveIntegerField(default=0)
+    total = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+    # Promo discount off list price included in total (not recorded for orders placed before rollups existed)
+    discount = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'SellerOrders'
+        unique_together = ('seller', 'order_id')
+        indexes = [
+            models.Index(fields=['seller', '-order_date']),
+            models.Index(fields=['seller', 'order_status', '-order_date']),
+            models.Index(fields=['order_id']),
+        ]
+
+class SellerDailySales(models.Model):
+    """
+    Per-seller, per-day sales rollup, keyed by the day orders were placed.
+    Updated incrementally at checkout and when an order is cancelled or
+    refunded (see rollup_services), so dashboards read at most one row per day.
+    """
+    seller = models.ForeignKey(Seller, on_delete=models.CASCADE, related_name='daily_sales')
+    day = models.DateField()
+    orders = models.PositiveIntegerField(default=0)
+    units = models.PositiveIntegerField(default=0)
+    gross = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    discounts = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    cancellations = models.PositiveIntegerField(default=0)
+    cancelled_amount = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    refunds = models.PositiveIntegerField(default=0)
+    refunded_amount = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+
+    class Meta:
+        db_table = 'SellerDailySales'
+        unique_together = ('seller', 'day')
+
+class SellerReaction(models.Model):
+    """A user's like or follow of a seller; Seller.total_likes and total_followers count these"""
+    KIND_CHOICES = [
+        ('LIKE', 'Like'),
+        ('FOLLOW', 'Follow'),
+    ]
+    seller = models.ForeignKey(Seller, on_delete=models.CASCADE, related_name='reactions')
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='seller_reactions')
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        db_table = 'SellerReactions'
+        unique_together = ('seller', 'user', 'kind')
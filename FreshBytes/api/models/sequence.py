@@ -0,0 +1,11 @@
+from django.db import models
+
+class Sequence(models.Model):
+    name = models.CharField(primary_key=True, max_length=100)
+    value = models.BigIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.name} = {self.value}"
+
+    class Meta:
+        db_table = 'Sequences'
@@ -0,0 +1,22 @@
+from django.db import models
+
+class TrendingShard(models.Model):
+    """
+    One process's time-decayed count-min sketch of product activity (see
+    trending_services), saved periodically so any process can merge them.
+    """
+    # '<host>:<pid>' of the process that owns the shard
+    shard = models.CharField(max_length=100, unique=True)
+    # Unix time the counters are scaled against (forward decay)
+    landmark = models.FloatField()
+    # depth x width float64 counters
+    cells = models.BinaryField()
+    # Heavy-hitter candidates: product ids the shard saw most often
+    candidates = models.JSONField(default=list)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
+
+    def __str__(self):
+        return self.shard
+
+    class Meta:
+        db_table = 'TrendingShards'
@@ -1,11 +1,11 @@
 from .product import ProductSerializer
 from .category import CategorySerializer
 from .user import UserSerializer, UserListSerializer
-from .seller import SellerSerializer
+from .seller import SellerSerializer, SellerOrderSerializer
 from .subcategory import SubCategorySerializer
 from .review import ReviewsSerializer
-from .promo import PromoSerializer
-from .cart import CartSerializer, CartItemSerializer
-from .order import OrderSerializer, OrderItemSerializer
+from .promo import PromoSerializer, PromoSimulationSerializer
+from .cart import CartSerializer, CartItemSerializer, CartBatchSerializer, GuestCartSerializer, InventoryHoldSerializer
+from .order import OrderSerializer, OrderDetailSerializer, OrderItemSerializer, CheckoutTicketSerializer, ArchivedOrderRowSerializer
 from .payment import PaymentSerializer
 from .token import CustomTokenObtainPairSerializer
\ No newline at end of file
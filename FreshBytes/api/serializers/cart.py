@@ -1,5 +1,6 @@
+from django.conf import settings
 from rest_framework import serializers
-from ..models import Cart, CartItem
+from ..models import Cart, CartItem, InventoryHold, Product
 
 class CartItemSerializer(serializers.ModelSerializer):
     total_price = serializers.DecimalField(
@@ -22,23 +23,69 @@ class CartItemSerializer(serializers.ModelSerializer):
             raise serializers.ValidationError("Quantity must be at least 1")
         return value
 
+class CartProductSnapshotSerializer(serializers.ModelSerializer):
+    """The product fields a cart page shows next to each line"""
+    class Meta:
+        model = Product
+        fields = [
+            'product_id', 'product_name', 'product_price', 'product_discountedPrice',
+            'is_discounted', 'quantity', 'is_active', 'seller_id',
+        ]
+        read_only_fields = fields
+
+class CartLineSerializer(CartItemSerializer):
+    product_snapshot = CartProductSnapshotSerializer(source='product', read_only=True)
+
+    class Meta(CartItemSerializer.Meta):
+        fields = CartItemSerializer.Meta.fields + ['product_snapshot']
+
 class CartSerializer(serializers.ModelSerializer):
-    items = CartItemSerializer(many=True, read_only=True)
-    total_items = serializers.IntegerField(read_only=True)
-    total_amount = serializers.DecimalField(
-        max_digits=10, 
-        decimal_places=2, 
-        read_only=True
-    )
+    """Renders a cart from cart_services.cart_snapshot (lines preloaded, stored totals)"""
+    items = CartLineSerializer(source='lines', many=True, read_only=True)
 
     class Meta:
         model = Cart
-        fields = ['cart_id', 'user', 'items', 'total_items', 'total_amount', 'created_at', 'updated_at']
-        read_only_fields = ['cart_id', 'created_at', 'updated_at']
-
-    def to_representation(self, instance):
-        data = super().to_representation(instance)
-        # Calculate totals
-        data['total_items'] = sum(item.quantity for item in instance.items.all())
-        data['total_amount'] = sum(item.total_price for item in instance.items.all())
-        return data
+        fields = ['cart_id', 'user', 'items', 'total_items', 'total_amount', 'version', 'created_at', 'updated_at']
+        read_only_fields = fields
+
+class GuestCartLineSerializer(serializers.Serializer):
+    product_id = serializers.CharField(read_only=True)
+    quantity = serializers.IntegerField(read_only=True)
+    unit_price = serializers.DecimalField(max_digits=10, decimal_places=2, read_only=True)
+    total_price = serializers.DecimalField(max_digits=12, decimal_places=2, read_only=True)
+
+class GuestCartSerializer(serializers.Serializer):
+    """Renders cart_services.guest_cart_summary plus the re-signed token"""
+    token = serializers.CharField(read_only=True)
+    items = GuestCartLineSerializer(many=True, read_only=True)
+    total_items = serializers.IntegerField(read_only=True)
+    total_amount = serializers.DecimalField(max_digits=12, decimal_places=2, read_only=True)
+
+class CartOperationSerializer(serializers.Serializer):
+    op = serializers.ChoiceField(choices=['add', 'update', 'remove'])
+    product_id = serializers.CharField()
+    quantity = serializers.IntegerField(required=False, min_value=0)
+
+    def validate(self, attrs):
+        if attrs['op'] == 'add':
+            attrs.setdefault('quantity', 1)
+            if attrs['quantity'] < 1:
+                raise serializers.ValidationError({'quantity': "Quantity must be at least 1"})
+        elif attrs['op'] == 'update' and 'quantity' not in attrs:
+            raise serializers.ValidationError({'quantity': "Quantity is required for update"})
+        return attrs
+
+class CartBatchSerializer(serializers.Serializer):
+    operations = CartOperationSerializer(many=True, allow_empty=False)
+
+    def validate_operations(self, value):
+        limit = getattr(settings, 'CART_BATCH_MAX_OPERATIONS', 100)
+        if len(value) > limit:
+            raise serializers.ValidationError(f"At most {limit} operations per batch")
+        return value
+
+class InventoryHoldSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = InventoryHold
+        fields = ['hold_id', 'product', 'quantity', 'status', 'expires_at', 'created_at']
+        read_only_fields = fields
@@ -1,5 +1,6 @@
 from rest_framework import serializers
-from ..models import Order, OrderItem
+from ..models import Order, OrderItem, CheckoutTicket
+from .payment import PaymentSerializer
 
 class OrderSerializer(serializers.ModelSerializer):
     class Meta:
@@ -22,3 +23,37 @@ class OrderItemSerializer(serializers.ModelSerializer):
         fields = [
             "order_item_id", "order_id", "product_id", "product_name", "product_price", "first_name", "last_name", "business_name", "order_status", "quantity", "total_item_price", "created_at", "updated_at"
         ]
+
+class OrderDetailSerializer(OrderSerializer):
+    """An order with its items and payments; expects them prefetched (see OrderViewSet.retrieve)"""
+    items = OrderItemSerializer(source='order_items', many=True, read_only=True)
+    payments = PaymentSerializer(many=True, read_only=True)
+
+    class Meta(OrderSerializer.Meta):
+        fields = OrderSerializer.Meta.fields + ["items", "payments"]
+
+class CheckoutTicketSerializer(serializers.ModelSerializer):
+    order = OrderSerializer(read_only=True)
+    payment = serializers.SerializerMethodField()
+
+    class Meta:
+        model = CheckoutTicket
+        fields = ["ticket_id", "status", "error", "order", "payment", "created_at", "updated_at"]
+        read_only_fields = fields
+
+    def get_payment(self, obj):
+        payment = obj.order.payments.first() if obj.order_id else None
+        return PaymentSerializer(payment).data if payment else None
+
+class ArchivedOrderRowSerializer(serializers.Serializer):
+    """Row of the archived orders listing (archive_services.archived_orders_listing)"""
+    order_id = serializers.UUIDField()
+    order_number = serializers.CharField()
+    user_id = serializers.UUIDField(allow_null=True)
+    order_date = serializers.DateTimeField()
+    order_total = serializers.DecimalField(max_digits=10, decimal_places=2)
+    order_status = serializers.CharField()
+    is_archived = serializers.BooleanField()
+    created_at = serializers.DateTimeField()
+    updated_at = serializers.DateTimeField()
+    storage = serializers.CharField()
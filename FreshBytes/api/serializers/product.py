@@ -1,3 +1,4 @@
+from django.db import transaction
 from rest_framework import serializers
 from ..models import Product
 
@@ -20,9 +21,25 @@ class ProductSerializer(serializers.ModelSerializer):
             "product_brief_description", "product_full_description", "product_discountedPrice", 
             "product_sku", "product_status", "product_location", "sub_category_id", 
             "category_id", "quantity", "post_date", "harvest_date", "is_active", 
-            "review_count", "top_rated", "discounted_amount", "is_discounted", 
-            "is_srp", "is_deleted", "sell_count", "created_at", "updated_at", "has_promo"
+            "review_count", "top_rated", "rating_score", "discounted_amount", "is_discounted", 
+            "is_srp", "is_deleted", "sell_count", "view_count", "created_at", "updated_at", "has_promo"
         ]
+        read_only_fields = ["review_count", "top_rated", "rating_score", "sell_count", "view_count"]
+
+    def update(self, instance, validated_data):
+        # Stock changes go through the inventory ledger instead of overwriting the counter
+        from ..services.inventory_services import set_stock_level
+        quantity = validated_data.pop('quantity', None)
+        with transaction.atomic():
+            instance = super().update(instance, validated_data)
+            if quantity is not None:
+                try:
+                    set_stock_level(instance, quantity)
+                except ValueError as e:
+                    raise serializers.ValidationError({'quantity': str(e)})
+        if quantity is not None:
+            instance.refresh_from_db(fields=['quantity'])
+        return instance
 
     def get_category_id(self, obj):
         return obj.category_id.category_id if obj.category_id else None
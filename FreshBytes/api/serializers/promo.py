@@ -27,3 +27,24 @@ class PromoSerializer(serializers.ModelSerializer):
             if data.get('promo_start_date') >= data.get('promo_end_date'):
                 raise serializers.ValidationError("promo_end_date must be after promo_start_date.")
         return data
+
+class PromoSimulationRuleSerializer(serializers.Serializer):
+    discount_type = serializers.ChoiceField(choices=[('PERCENTAGE', 'Percentage'), ('FIXED', 'Fixed')])
+    discount_amount = serializers.IntegerField(required=False, default=0, min_value=0)
+    discount_percentage = serializers.IntegerField(required=False, default=0, min_value=0, max_value=100)
+    product_ids = serializers.ListField(child=serializers.CharField(), required=False, default=list)
+
+    def validate(self, data):
+        if data['discount_type'] == 'PERCENTAGE' and not data.get('discount_percentage'):
+            raise serializers.ValidationError("discount_percentage is required for percentage discount type.")
+        if data['discount_type'] == 'FIXED' and not data.get('discount_amount'):
+            raise serializers.ValidationError("discount_amount is required for fixed discount type.")
+        return data
+
+class PromoSimulationSerializer(serializers.Serializer):
+    # Admins only: simulate another seller's catalog
+    seller_id = serializers.UUIDField(required=False)
+    rules = PromoSimulationRuleSerializer(many=True, allow_empty=False)
+    include_existing = serializers.BooleanField(required=False, default=True)
+    offset = serializers.IntegerField(required=False, default=0, min_value=0)
+    limit = serializers.IntegerField(required=False, default=100, min_value=0, max_value=1000)
@@ -1,7 +1,13 @@
 from rest_framework import serializers
-from ..models import Seller
+from ..models import Seller, SellerOrder
 
 class SellerSerializer(serializers.ModelSerializer):
     class Meta:
         model = Seller
         fields = ["seller_id", "user_id", "business_name", 'street', 'barangay', 'city', 'province', 'zip_code', "business_phone", "total_earnings", "total_products", "total_orders", "total_reviews", "average_rating", "total_followers", "total_likes", "total_products_sold", "is_active", "is_deleted", "is_verified", "terms_accepted", "created_at", "updated_at", ]
+
+class SellerOrderSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = SellerOrder
+        fields = ["order_id", "order_number", "customer", "order_status", "order_date", "item_count", "units", "total"]
+        read_only_fields = fields
@@ -0,0 +1,104 @@
+import logging
+from datetime import timedelta
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Prefetch, Q, Value, CharField
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+# Orders in these statuses can no longer change and are moved to cold storage once old enough
+ARCHIVABLE_STATUSES = ('DELIVERED', 'CANCELLED')
+
+# Columns shared by Orders and ArchivedOrders, used by the combined archived listing
+LISTING_FIELDS = (
+    'order_id', 'order_number', 'user_id', 'order_date', 'order_total',
+    'order_status', 'is_archived', 'created_at', 'updated_at',
+)
+
+def _columns(model):
+    return [field.attname for field in model._meta.concrete_fields]
+
+def _archive_chunk(order_pks):
+    """Copies one chunk of orders, their items and payments to cold storage and deletes the hot rows"""
+    from ..models import Order, OrderItem, Payment, ArchivedOrder, ArchivedOrderItem, ArchivedPayment
+
+    with transaction.atomic():
+        # Re-check under lock: the order may have changed since it was picked
+        orders = list(
+            Order.objects.select_for_update(skip_locked=True)
+            .filter(pk__in=order_pks, order_status__in=ARCHIVABLE_STATUSES)
+            .values(*_columns(Order))
+        )
+        if not orders:
+            return 0
+        pks = [order['order_id'] for order in orders]
+        items = OrderItem.objects.filter(order_id__in=pks).values(*_columns(OrderItem))
+        payments = Payment.objects.filter(order_id__in=pks).values(*_columns(Payment))
+
+        ArchivedOrder.objects.bulk_create([ArchivedOrder(**order) for order in orders])
+        ArchivedOrderItem.objects.bulk_create([ArchivedOrderItem(**item) for item in items])
+        ArchivedPayment.objects.bulk_create([ArchivedPayment(**payment) for payment in payments])
+        # Cascades to the hot items and payments; ledger rows, holds and
+        # checkout tickets keep their history with the order reference cleared
+        Order.objects.filter(pk__in=pks).delete()
+    return len(orders)
+
+def archive_orders(older_than_days=None, batch_size=500):
+    """
+    Moves delivered and cancelled orders not updated for older_than_days
+    (default ORDER_ARCHIVE_AFTER_DAYS) into the Archived* cold tables, one
+    transaction per batch_size orders, so the hot tables and their indexes
+    only carry live orders. Walks the table once in primary key order.
+    Returns the number of orders archived.
+    """
+    from ..models import Order
+
+    if older_than_days is None:
+        older_than_days = getattr(settings, 'ORDER_ARCHIVE_AFTER_DAYS', 365)
+    cutoff = timezone.now() - timedelta(days=older_than_days)
+    candidates = Order.objects.filter(order_status__in=ARCHIVABLE_STATUSES, updated_at__lt=cutoff).order_by('pk')
+
+    archived = 0
+    last_pk = None
+    while True:
+        chunk = candidates if last_pk is None else candidates.filter(pk__gt=last_pk)
+        order_pks = list(chunk.values_list('pk', flat=True)[:batch_size])
+        if not order_pks:
+            break
+        archived += _archive_chunk(order_pks)
+        last_pk = order_pks[-1]
+
+    logger.info(f"Archived {archived} orders older than {older_than_days} days")
+    return archived
+
+def archived_order_bundle():
+    """Cold-storage counterpart of the OrderViewSet.retrieve queryset"""
+    from ..models import ArchivedOrder, ArchivedOrderItem
+
+    return ArchivedOrder.objects.select_related('user_id').prefetch_related(
+        Prefetch('order_items', queryset=ArchivedOrderItem.objects.select_related('product_id__seller_id').order_by('created_at')),
+        'payments',
+    )
+
+def archived_orders_listing(user=None):
+    """
+    Archived orders as rows of LISTING_FIELDS plus 'storage' ('hot' or 'cold'),
+    newest first: hot orders flagged is_archived and every order in cold storage.
+    One UNION query, so it paginates and streams like a single table.
+    Pass a user to restrict it to orders they placed or sold into.
+    """
+    from ..models import Order, OrderItem, ArchivedOrder, ArchivedOrderItem
+
+    hot = Order.objects.filter(is_archived=True)
+    cold = ArchivedOrder.objects.all()
+    if user is not None:
+        hot = hot.filter(
+            Q(user_id=user) | Q(pk__in=OrderItem.objects.filter(product_id__seller_id__user_id=user).values('order_id'))
+        )
+        cold = cold.filter(
+            Q(user_id=user) | Q(pk__in=ArchivedOrderItem.objects.filter(product_id__seller_id__user_id=user).values('order_id'))
+        )
+    hot = hot.annotate(storage=Value('hot', output_field=CharField())).values(*LISTING_FIELDS, 'storage')
+    cold = cold.annotate(storage=Value('cold', output_field=CharField())).values(*LISTING_FIELDS, 'storage')
+    return hot.union(cold, all=True).order_by('-order_date', 'order_id')
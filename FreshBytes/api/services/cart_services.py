@@ -1,5 +1,11 @@
+from decimal import Decimal, InvalidOperation
+from django.conf import settings
+from django.core import signing
 from django.shortcuts import get_object_or_404
 from django.db import transaction
+from django.db.models import DecimalField, Exists, ExpressionWrapper, F, OuterRef, PositiveIntegerField, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
 from django.core.exceptions import ValidationError
 from ..models import Cart, CartItem, Product
 
@@ -21,19 +27,109 @@ def get_or_create_cart(user):
     cart, created = Cart.objects.get_or_create(user=user)
     return cart
 
+def _line_price(product):
+    return product.product_discountedPrice if product.is_discounted else product.product_price
+
+def refresh_cart_totals(carts):
+    """
+    Recomputes total_items and total_amount of the given Cart queryset from
+    their lines and bumps version, in one UPDATE. Called inside every
+    transaction that changes cart lines, so the stored totals never drift.
+    """
+    lines = CartItem.objects.filter(cart=OuterRef('pk')).order_by().values('cart')
+    line_total = ExpressionWrapper(F('quantity') * F('unit_price'), output_field=DecimalField(max_digits=12, decimal_places=2))
+    carts.update(
+        total_items=Coalesce(
+            Subquery(lines.annotate(units=Sum('quantity')).values('units')), Value(0),
+            output_field=PositiveIntegerField()
+        ),
+        total_amount=Coalesce(
+            Subquery(lines.annotate(amount=Sum(line_total)).values('amount')), Value(Decimal('0')),
+            output_field=DecimalField(max_digits=12, decimal_places=2)
+        ),
+        version=F('version') + 1,
+        updated_at=timezone.now(),
+    )
+
+def cart_etag(cart_pk, version):
+    return f'"cart-{cart_pk}-{version}"'
+
+def etag_matches(if_none_match, etag):
+    """Whether an If-None-Match header value covers etag (weak comparison, as for GET)"""
+    if not if_none_match:
+        return False
+    candidates = [candidate.strip() for candidate in if_none_match.split(',')]
+    return '*' in candidates or etag in [candidate[2:] if candidate.startswith('W/') else candidate for candidate in candidates]
+
+def cart_version(user):
+    """
+    (cart_pk, version) of the user's cart, or None when they have none yet or
+    some line is priced at an outdated Product.price_version (reading the cart
+    reprices it and moves the version on). One query.
+    """
+    stale = CartItem.objects.filter(cart=OuterRef('pk'), price_version__lt=F('product__price_version'))
+    row = Cart.objects.filter(user=user).annotate(stale=Exists(stale)).values_list('cart_id', 'version', 'stale').first()
+    return row[:2] if row and not row[2] else None
+
+def reprice_stale_lines(cart, lines):
+    """
+    Re-takes unit_price for the lines (products loaded) whose price_version is
+    behind their product's, with one bulk UPDATE, and refreshes the cart's
+    totals when a price actually moved. Returns the number of lines repriced.
+    """
+    stale = [line for line in lines if line.price_version != line.product.price_version]
+    if not stale:
+        return 0
+    moved = False
+    for line in stale:
+        unit_price = _line_price(line.product)
+        moved = moved or unit_price != line.unit_price
+        line.unit_price, line.price_version = unit_price, line.product.price_version
+    with transaction.atomic():
+        CartItem.objects.bulk_update(stale, ['unit_price', 'price_version'])
+        if moved:
+            refresh_cart_totals(Cart.objects.filter(pk=cart.pk))
+            cart.refresh_from_db(fields=['total_items', 'total_amount', 'version', 'updated_at'])
+    return len(stale)
+
+def cart_snapshot(user):
+    """
+    The user's cart with its lines and their products attached as cart.lines,
+    read in one joined query (plus a cart lookup only when the cart is empty).
+    Totals come from the stored columns. Lines whose product changed price
+    since they were priced are repriced on the way (see reprice_stale_lines).
+    """
+    validate_user_for_cart(user)
+    lines = list(
+        CartItem.objects.filter(cart__user=user)
+        .select_related('cart', 'product')
+        .order_by('created_at')
+    )
+    cart = lines[0].cart if lines else get_or_create_cart(user)
+    reprice_stale_lines(cart, lines)
+    cart.lines = lines
+    return cart
+
+def holds_on_add_to_cart():
+    """Whether adding to the cart takes an inventory hold (otherwise holds start at checkout)"""
+    return getattr(settings, 'INVENTORY_HOLD_ON_ADD_TO_CART', False)
+
 def add_to_cart(user, product_id, quantity=1):
     """Add a product to user's cart. Update quantity if product already exists."""
+    from .inventory_services import sync_cart_hold
+    from .trending_services import record_product_events
     with transaction.atomic():
         validate_user_for_cart(user)
         cart = get_or_create_cart(user)
         product = get_object_or_404(Product, pk=product_id)
+        hold = holds_on_add_to_cart()
         
         # Check if product is available
         if not product.is_active or product.is_deleted:
             raise ValueError("This product is not available.")
         
-        # Check stock availability
-        if product.quantity < quantity:
+        # Check stock availability (a hold checks it atomically instead)
+        if not hold and product.quantity < quantity:
             raise ValueError(f"Insufficient stock. Only {product.quantity} items available.")
         
         # Get or create cart item
@@ -46,52 +142,331 @@ def add_to_cart(user, product_id, quantity=1):
         if not created:
             # Update quantity if item already exists
             new_quantity = cart_item.quantity + quantity
-            if product.quantity < new_quantity:
+            if not hold and product.quantity < new_quantity:
                 raise ValueError(f"Insufficient stock. Only {product.quantity} items available.")
             cart_item.quantity = new_quantity
             cart_item.save()
-            
+
+        if hold:
+            sync_cart_hold(user, product, cart_item.quantity)
+
+        refresh_cart_totals(Cart.objects.filter(pk=cart.pk))
+        record_product_events({product.pk: quantity}, 'cart')
         return cart_item
 
 def update_cart_item(user, product_id, quantity):
     """Update quantity of a cart item."""
+    from .inventory_services import sync_cart_hold
     with transaction.atomic():
         validate_user_for_cart(user)
         cart = get_object_or_404(Cart, user=user)
         cart_item = get_object_or_404(CartItem, cart=cart, product_id=product_id)
+        product = cart_item.product
+        hold = holds_on_add_to_cart()
         
         if quantity < 1:
             cart_item.delete()
+            sync_cart_hold(user, product, 0)
+            refresh_cart_totals(Cart.objects.filter(pk=cart.pk))
             return None
         
-        # Check stock availability
-        product = cart_item.product
-        if product.quantity < quantity:
+        # Check stock availability (a hold checks it atomically instead)
+        if not hold and product.quantity < quantity:
             raise ValueError(f"Insufficient stock. Only {product.quantity} items available.")
             
         cart_item.quantity = quantity
         cart_item.save()
+        # Shrinking a line always gives held stock back; growing it only holds more when enabled
+        sync_cart_hold(user, product, quantity, grow=hold)
+        refresh_cart_totals(Cart.objects.filter(pk=cart.pk))
         return cart_item
 
 def remove_from_cart(user, product_id):
     """Remove a product from user's cart."""
+    from ..models import InventoryHold
+    from .inventory_services import release_holds
     validate_user_for_cart(user)
     cart = get_object_or_404(Cart, user=user)
-    CartItem.objects.filter(cart=cart, product_id=product_id).delete()
+    with transaction.atomic():
+        CartItem.objects.filter(cart=cart, product_id=product_id).delete()
+        refresh_cart_totals(Cart.objects.filter(pk=cart.pk))
+        release_holds(InventoryHold.objects.filter(user=user, product_id=product_id))
 
 def clear_cart(user):
     """Remove all items from user's cart."""
+    from ..models import InventoryHold
+    from .inventory_services import release_holds
     validate_user_for_cart(user)
     cart = get_object_or_404(Cart, user=user)
-    cart.items.all().delete()
+    with transaction.atomic():
+        cart.items.all().delete()
+        refresh_cart_totals(Cart.objects.filter(pk=cart.pk))
+        release_holds(InventoryHold.objects.filter(user=user))
+
+def reserve_cart(user, cart_item_ids=None):
+    """
+    Checkout-start: holds stock for the selected cart lines (all by default) for
+    INVENTORY_HOLD_TTL_SECONDS, topping up or trimming existing holds. Raises
+    ValueError if any line can't be covered; nothing is held in that case.
+    """
+    from .inventory_services import sync_cart_hold
+    with transaction.atomic():
+        validate_user_for_cart(user)
+        items = CartItem.objects.filter(cart__user=user).select_related('product')
+        if cart_item_ids:
+            items = items.filter(cart_item_id__in=cart_item_ids)
+        holds = []
+        for item in items:
+            if not item.product.is_active or item.product.is_deleted:
+                raise ValueError(f"{item.product.product_name} is no longer available.")
+            holds.extend(sync_cart_hold(user, item.product, item.quantity))
+        if not holds:
+            raise ValueError("No items in cart to reserve.")
+        return holds
+
+def apply_cart_operations(user, operations):
+    """
+    Applies a batch of cart operations ({'op': 'add' | 'update' | 'remove',
+    'product_id', 'quantity'}) in one transaction and a fixed number of
+    queries: the cart, one read of the products (the stock check for every
+    line), one of the affected lines, then at most one bulk INSERT, one bulk
+    UPDATE, one DELETE and one totals refresh. Operations run in order
+    against the running quantities, so several may touch the same product.
+    One that fails (unavailable product, insufficient stock, updating a line
+    not in the cart) is reported and skipped without affecting the others.
+    With INVENTORY_HOLD_ON_ADD_TO_CART, grown lines are held one by one and
+    the hold checks the stock instead.
+    Returns (cart with refreshed totals, one result per operation).
+    """
+    from ..models import InventoryHold
+    from .inventory_services import sync_cart_hold
+    from .trending_services import record_product_events
+
+    with transaction.atomic():
+        cart = get_or_create_cart(user)
+        product_pks = list({str(operation['product_id']) for operation in operations})
+        products = Product.objects.only(*CART_PRODUCT_FIELDS).in_bulk(product_pks)
+        lines = {item.product_id: item for item in CartItem.objects.filter(cart=cart, product_id__in=product_pks)}
+        hold = holds_on_add_to_cart()
+
+        quantities = {product_pk: item.quantity for product_pk, item in lines.items()}
+        results = []
+        for index, operation in enumerate(operations):
+            product_pk = str(operation['product_id'])
+            result = {'index': index, 'op': operation['op'], 'product_id': product_pk}
+            current = quantities.get(product_pk, 0)
+            if operation['op'] == 'remove':
+                quantity = 0
+            elif operation['op'] == 'update' and not current:
+                results.append({**result, 'status': 'error', 'error': "Cart item not found"})
+                continue
+            else:
+                quantity = operation['quantity'] + (current if operation['op'] == 'add' else 0)
+
+            product = products.get(product_pk)
+            if quantity > current:
+                if product is None or not product.is_active:
+                    results.append({**result, 'status': 'error', 'error': "This product is not available."})
+                    continue
+                if not hold and product.quantity < quantity:
+                    results.append({**result, 'status': 'error',
+                                    'error': f"Insufficient stock. Only {product.quantity} items available."})
+                    continue
+            quantities[product_pk] = quantity
+            results.append({**result, 'status': 'ok', 'quantity': quantity})
+
+        original = {product_pk: lines[product_pk].quantity if product_pk in lines else 0 for product_pk in quantities}
+        grown = [product_pk for product_pk, quantity in quantities.items() if quantity > original[product_pk]]
+        shrunk = [product_pk for product_pk, quantity in quantities.items() if quantity < original[product_pk]]
+
+        if hold:
+            for product_pk in grown:
+                try:
+                    with transaction.atomic():
+                        sync_cart_hold(user, products[product_pk], quantities[product_pk])
+                except ValueError as e:
+                    quantities[product_pk] = original[product_pk]
+                    for result in results:
+                        if result['product_id'] == product_pk and result['status'] == 'ok':
+                            result.update(status='error', error=str(e))
+                            del result['quantity']
+        if shrunk:
+            # Removed quantity gives its hold back, as in update_cart_item and remove_from_cart
+            for product_pk in InventoryHold.objects.filter(
+                user=user, product_id__in=shrunk, status='ACTIVE'
+            ).values_list('product_id', flat=True).distinct():
+                sync_cart_hold(user, lines[product_pk].product, quantities[product_pk], grow=False)
+
+        now = timezone.now()
+        created = [
+            CartItem(
+                cart=cart, product=products[product_pk], quantity=quantity,
+                unit_price=_line_price(products[product_pk]), price_version=products[product_pk].price_version
+            )
+            for product_pk, quantity in quantities.items() if product_pk not in lines and quantity > 0
+        ]
+        changed = []
+        removed = []
+        for product_pk, item in lines.items():
+            if quantities[product_pk] == 0:
+                removed.append(item.pk)
+            elif quantities[product_pk] != item.quantity:
+                item.quantity, item.updated_at = quantities[product_pk], now
+                changed.append(item)
+
+        if created:
+            CartItem.objects.bulk_create(created)
+        if changed:
+            CartItem.objects.bulk_update(changed, ['quantity', 'updated_at'])
+        if removed:
+            CartItem.objects.filter(pk__in=removed).delete()
+        if created or changed or removed:
+            refresh_cart_totals(Cart.objects.filter(pk=cart.pk))
+            cart.refresh_from_db(fields=['total_items', 'total_amount', 'version', 'updated_at'])
+
+        added = {}
+        for operation, result in zip(operations, results):
+            if operation['op'] == 'add' and result['status'] == 'ok':
+                added[result['product_id']] = added.get(result['product_id'], 0) + operation['quantity']
+        record_product_events(added, 'cart')
+        return cart, results
 
 def get_cart_summary(user):
     """Get cart with total items and amount."""
-    validate_user_for_cart(user)
-    cart = get_object_or_404(Cart, user=user)
+    cart = cart_snapshot(user)
+    return {
+        'id': cart.pk,
+        'total_items': cart.total_items,
+        'total_amount': cart.total_amount,
+        'items': cart.lines
+    }
+
+# Guest carts: the cart lives in a signed token instead of the database
+
+GUEST_CART_SALT = 'api.cart.guest'
+
+CART_PRODUCT_FIELDS = (
+    'product_id', 'product_name', 'product_price', 'product_discountedPrice',
+    'is_discounted', 'is_active', 'is_deleted', 'quantity', 'price_version',
+)
+
+def dump_guest_cart(lines):
+    """Signs guest cart lines ({product_pk: (quantity, unit_price)}) into a compact URL-safe token"""
+    return signing.dumps(
+        [[product_pk, quantity, str(unit_price)] for product_pk, (quantity, unit_price) in lines.items()],
+        salt=GUEST_CART_SALT,
+        compress=True
+    )
+
+def load_guest_cart(token):
+    """
+    The lines of a guest cart token, {product_pk: (quantity, unit_price)}; an
+    empty token is an empty cart. Raises ValueError for a token that was
+    tampered with, is malformed, or was last changed more than
+    GUEST_CART_MAX_AGE_SECONDS ago.
+    """
+    if not token:
+        return {}
+    try:
+        payload = signing.loads(
+            token,
+            salt=GUEST_CART_SALT,
+            max_age=getattr(settings, 'GUEST_CART_MAX_AGE_SECONDS', 30 * 24 * 3600)
+        )
+        return {str(product_pk): (int(quantity), Decimal(unit_price)) for product_pk, quantity, unit_price in payload}
+    except signing.SignatureExpired:
+        raise ValueError("Guest cart has expired.")
+    except (signing.BadSignature, TypeError, ValueError, InvalidOperation):
+        raise ValueError("Invalid guest cart.")
+
+def update_guest_cart(lines, product_id, quantity, add=False):
+    """
+    Returns new guest cart lines with product_id's quantity set to (or, with
+    add, increased by) quantity and its price snapshot refreshed; a quantity
+    below 1 removes the line. Costs one product lookup and writes nothing.
+    """
+    from .trending_services import record_product_events
+    lines = dict(lines)
+    product_id = str(product_id)
+    if add:
+        quantity += lines.get(product_id, (0, None))[0]
+    if quantity < 1:
+        lines.pop(product_id, None)
+        return lines
+
+    product = get_object_or_404(Product.objects.only(*CART_PRODUCT_FIELDS), pk=product_id)
+    if not product.is_active or product.is_deleted:
+        raise ValueError("This product is not available.")
+    if product.quantity < quantity:
+        raise ValueError(f"Insufficient stock. Only {product.quantity} items available.")
+    max_lines = getattr(settings, 'GUEST_CART_MAX_LINES', 50)
+    if product_id not in lines and len(lines) >= max_lines:
+        raise ValueError(f"A guest cart can hold at most {max_lines} products. Please log in to add more.")
+
+    if add:
+        record_product_events({product.pk: quantity - lines.get(product_id, (0, None))[0]}, 'cart')
+    lines[product_id] = (quantity, _line_price(product))
+    return lines
+
+def guest_cart_summary(lines):
+    """Totals and lines of a guest cart as priced when each line was last changed; no queries"""
+    items = [
+        {'product_id': product_pk, 'quantity': quantity, 'unit_price': unit_price, 'total_price': quantity * unit_price}
+        for product_pk, (quantity, unit_price) in lines.items()
+    ]
     return {
-        'id': cart.id,
-        'total_items': sum(item.quantity for item in cart.items.all()),
-        'total_amount': sum(item.total_price for item in cart.items.all()),
-        'items': cart.items.all()
+        'items': items,
+        'total_items': sum(item['quantity'] for item in items),
+        'total_amount': sum((item['total_price'] for item in items), Decimal('0')),
     }
+
+def merge_guest_cart(user, lines):
+    """
+    Moves guest cart lines into user's cart, on login or at checkout, in a
+    fixed number of queries: one read of the products (the batched stock
+    check), one of the lines already in the cart, one INSERT ... ON CONFLICT
+    upsert of every merged line and one totals refresh. Quantities add to
+    existing lines and are capped at the stock available; prices come from
+    the product rows, not from the token's snapshot. Lines that could not be
+    merged in full are reported as {'product_id', 'requested', 'added',
+    'error'}. Inventory holds, if enabled, are taken at reserve or checkout.
+    Returns (lines merged, issues).
+    """
+    if not lines:
+        return 0, []
+
+    with transaction.atomic():
+        cart = get_or_create_cart(user)
+        products = Product.objects.only(*CART_PRODUCT_FIELDS).in_bulk(list(lines))
+        existing = dict(
+            CartItem.objects.filter(cart=cart, product_id__in=list(products)).values_list('product_id', 'quantity')
+        )
+
+        upserts = []
+        issues = []
+        for product_pk, (quantity, _) in lines.items():
+            product = products.get(product_pk)
+            if product is None or not product.is_active:
+                issues.append({'product_id': product_pk, 'requested': quantity, 'added': 0,
+                               'error': "This product is no longer available."})
+                continue
+            in_cart = existing.get(product_pk, 0)
+            merged = min(in_cart + quantity, max(product.quantity, in_cart))
+            if merged < in_cart + quantity:
+                issues.append({'product_id': product_pk, 'requested': quantity, 'added': merged - in_cart,
+                               'error': f"Insufficient stock for {product.product_name}. Only {product.quantity} items available."})
+            if merged > in_cart:
+                upserts.append(CartItem(
+                    cart=cart, product=product, quantity=merged,
+                    unit_price=_line_price(product), price_version=product.price_version
+                ))
+
+        if upserts:
+            CartItem.objects.bulk_create(
+                upserts,
+                update_conflicts=True,
+                unique_fields=['cart', 'product'],
+                update_fields=['quantity', 'updated_at']
+            )
+            refresh_cart_totals(Cart.objects.filter(pk=cart.pk))
+    return len(upserts), issues
@@ -0,0 +1,196 @@
+import atexit
+import json
+import logging
+import os
+import socket
+import threading
+import uuid
+from datetime import timedelta
+from pathlib import Path
+from django.apps import apps
+from django.conf import settings
+from django.db import DatabaseError, IntegrityError, close_old_connections, transaction
+from django.db.models import Case, F, When
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+# This process's unflushed deltas, {(model label, field): {pk: delta}}, the
+# journal file that holds the same increments on disk, and the event that
+# wakes its flusher thread
+_buffer = {'pid': None, 'pending': {}, 'keys': 0, 'journal': None, 'fd': None, 'wakeup': None}
+_buffer_lock = threading.Lock()
+
+def _journal_dir():
+    path = Path(getattr(settings, 'COUNTER_JOURNAL_DIR', settings.BASE_DIR / 'counter_journal'))
+    path.mkdir(parents=True, exist_ok=True)
+    return path
+
+def _journal_prefix():
+    return f'{socket.gethostname()}-{os.getpid()}-'
+
+def _open_journal():
+    # One journal per flush interval; its file name doubles as the batch id recorded on flush
+    path = _journal_dir() / f'{_journal_prefix()}{uuid.uuid4().hex}.log'
+    _buffer['journal'] = path
+    _buffer['fd'] = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o644)
+
+def _ensure_process_buffer():
+    if _buffer['pid'] != os.getpid():
+        # A forked worker starts empty; the parent's journal and flusher stay with the parent
+        _buffer.update(pid=os.getpid(), pending={}, keys=0, wakeup=threading.Event())
+        _open_journal()
+        threading.Thread(target=_flusher, args=(os.getpid(), _buffer['wakeup']), name='counter-flusher', daemon=True).start()
+        atexit.register(flush_counters)
+
+def _flusher(pid, wakeup):
+    """
+    Background thread flushing this process's buffer every COUNTER_FLUSH_SECONDS,
+    or as soon as _increment reports COUNTER_FLUSH_THRESHOLD pending rows, so
+    idle processes catch up too and no request ever waits on a flush
+    """
+    while _buffer['pid'] == pid:
+        wakeup.wait(getattr(settings, 'COUNTER_FLUSH_SECONDS', 10))
+        wakeup.clear()
+        try:
+            flush_counters()
+        except Exception:
+            logger.exception('Counter flush failed')
+        finally:
+            close_old_connections()
+
+def _add(pending, label, field, pk, delta):
+    deltas = pending.setdefault((label, field), {})
+    deltas[pk] = deltas.get(pk, 0) + delta
+    return len(deltas)
+
+def increment(model, pk, field, delta=1):
+    """
+    Adds delta to model.field of row pk once the current transaction commits,
+    without touching the row then. The increment is appended to this
+    process's journal file and summed in memory; a background thread writes
+    the sums with one UPDATE per counter every COUNTER_FLUSH_SECONDS, or as
+    soon as COUNTER_FLUSH_THRESHOLD rows are pending. Counters therefore lag
+    by up to the flush interval, and each hot row is locked once per flush
+    instead of once per event.
+    """
+    if delta:
+        transaction.on_commit(lambda: _increment(model._meta.label, str(pk), field, delta))
+
+def _increment(label, pk, field, delta):
+    line = json.dumps([label, field, pk, delta]) + '\n'
+    with _buffer_lock:
+        _ensure_process_buffer()
+        os.write(_buffer['fd'], line.encode())
+        if getattr(settings, 'COUNTER_JOURNAL_FSYNC', False):
+            os.fsync(_buffer['fd'])
+        before = len(_buffer['pending'].get((label, field), ()))
+        _buffer['keys'] += _add(_buffer['pending'], label, field, pk, delta) - before
+        if _buffer['keys'] >= getattr(settings, 'COUNTER_FLUSH_THRESHOLD', 500):
+            _buffer['wakeup'].set()
+
+def _apply(batch, pending):
+    """
+    Writes the summed deltas, one UPDATE per (model, field) with a CASE per
+    distinct delta, and records batch in the same transaction. Returns False
+    when batch was already applied.
+    """
+    from ..models import CounterFlush
+
+    try:
+        with transaction.atomic():
+            CounterFlush.objects.create(batch=batch)
+            for (label, field), deltas in pending.items():
+                by_delta = {}
+                for pk, delta in deltas.items():
+                    if delta:
+                        by_delta.setdefault(delta, []).append(pk)
+                if not by_delta:
+                    continue
+                model = apps.get_model(label)
+                model._base_manager.filter(pk__in=[pk for pks in by_delta.values() for pk in pks]).update(**{
+                    field: Case(
+                        *[When(pk__in=pks, then=F(field) + delta) for delta, pks in by_delta.items()],
+                        default=F(field)
+                    )
+                })
+    except IntegrityError:
+        return False
+    return True
+
+def flush_counters():
+    """
+    Applies this process's pending deltas. The journal is swapped for a fresh
+    one first so increments keep flowing, and deleted only after the deltas
+    and its batch row commit. If the database write fails the deltas go back
+    into the buffer (and the new journal) to be retried on the next flush.
+    Returns the number of rows updated.
+    """
+    with _buffer_lock:
+        if _buffer['pid'] != os.getpid():
+            return 0
+        if not _buffer['pending']:
+            return 0
+        pending, journal, fd = _buffer['pending'], _buffer['journal'], _buffer['fd']
+        _buffer.update(pending={}, keys=0)
+        _open_journal()
+    os.close(fd)
+
+    try:
+        _apply(journal.name, pending)
+        updated = sum(len(deltas) for deltas in pending.values())
+    except DatabaseError as error:
+        logger.warning(f"Counter flush failed, retrying on the next flush: {error}")
+        with _buffer_lock:
+            for (label, field), deltas in pending.items():
+                for pk, delta in deltas.items():
+                    os.write(_buffer['fd'], (json.dumps([label, field, pk, delta]) + '\n').encode())
+                    before = len(_buffer['pending'].get((label, field), ()))
+                    _buffer['keys'] += _add(_buffer['pending'], label, field, pk, delta) - before
+        updated = 0
+    journal.unlink(missing_ok=True)
+    return updated
+
+def _process_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+def replay_orphaned_journals():
+    """
+    Applies journals left behind by processes on this host that died before
+    flushing, then deletes them. A journal whose batch was already recorded
+    (the process died between commit and cleanup) is only deleted. Batch
+    records older than COUNTER_FLUSH_RETENTION_DAYS are pruned.
+    Returns (journals replayed, journals skipped).
+    """
+    from ..models import CounterFlush
+
+    host_prefix = f'{socket.gethostname()}-'
+    replayed = skipped = 0
+    for journal in sorted(_journal_dir().glob(f'{host_prefix}*.log')):
+        pid = journal.name[len(host_prefix):].split('-', 1)[0]
+        if not pid.isdigit() or int(pid) == os.getpid() or _process_alive(int(pid)):
+            continue
+        pending = {}
+        with journal.open() as lines:
+            for line in lines:
+                try:
+                    label, field, pk, delta = json.loads(line)
+                except ValueError:
+                    # A torn last line from the crash; everything before it is intact
+                    continue
+                _add(pending, label, field, pk, delta)
+        if _apply(journal.name, pending):
+            replayed += 1
+        else:
+            skipped += 1
+        journal.unlink(missing_ok=True)
+
+    retention = getattr(settings, 'COUNTER_FLUSH_RETENTION_DAYS', 7)
+    CounterFlush.objects.filter(applied_at__lt=timezone.now() - timedelta(days=retention)).delete()
+    return replayed, skipped
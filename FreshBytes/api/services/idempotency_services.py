@@ -0,0 +1,170 @@
+import hashlib
+import json
+import time
+from datetime import timedelta
+from functools import wraps
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.response import Response
+
+IDEMPOTENCY_HEADER = 'Idempotency-Key'
+
+def request_fingerprint(request):
+    """Hash of the method, path and body, used to reject a key reused for a different request"""
+    data = request.data
+    if hasattr(data, 'lists'):
+        data = dict(data.lists())
+    payload = json.dumps(
+        {'method': request.method, 'path': request.path, 'body': data},
+        sort_keys=True,
+        default=str
+    )
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+def _claim(user, scope, key, fingerprint):
+    """
+    Inserts an IN_PROGRESS record for the key. Returns the record if this
+    request now owns the key, or None if another request already holds it.
+    """
+    from ..models import IdempotencyKey
+
+    now = timezone.now()
+    try:
+        with transaction.atomic():
+            return IdempotencyKey.objects.create(
+                user=user,
+                scope=scope,
+                key=key,
+                fingerprint=fingerprint,
+                locked_until=now + timedelta(seconds=getattr(settings, 'IDEMPOTENCY_LEASE_SECONDS', 60)),
+                expires_at=now + timedelta(hours=getattr(settings, 'IDEMPOTENCY_KEY_TTL_HOURS', 24)),
+            )
+    except IntegrityError:
+        return None
+
+def _take_over(record):
+    """Takes over a key whose owner let its lease lapse (e.g. the worker died mid-request)"""
+    from ..models import IdempotencyKey
+
+    new_lease = timezone.now() + timedelta(seconds=getattr(settings, 'IDEMPOTENCY_LEASE_SECONDS', 60))
+    taken = IdempotencyKey.objects.filter(
+        pk=record.pk,
+        status='IN_PROGRESS',
+        locked_until=record.locked_until
+    ).update(locked_until=new_lease)
+    if taken:
+        record.locked_until = new_lease
+        return record
+    return None
+
+def _replay(record):
+    response = Response(record.response_body, status=record.response_status)
+    response['Idempotent-Replayed'] = 'true'
+    return response
+
+def _acquire(user, scope, key, fingerprint):
+    """
+    Returns (record, response). Exactly one of them is set: the record when
+    this request must execute, or the response to send back instead (a replay,
+    a fingerprint mismatch, or a timeout waiting on a concurrent duplicate).
+    """
+    from ..models import IdempotencyKey
+
+    deadline = time.monotonic() + getattr(settings, 'IDEMPOTENCY_WAIT_SECONDS', 10)
+    poll_interval = getattr(settings, 'IDEMPOTENCY_POLL_INTERVAL', 0.1)
+    while True:
+        record = _claim(user, scope, key, fingerprint)
+        if record:
+            return record, None
+
+        record = IdempotencyKey.objects.filter(user=user, scope=scope, key=key).first()
+        if record is None:
+            continue
+        if record.expires_at <= timezone.now():
+            IdempotencyKey.objects.filter(pk=record.pk, expires_at=record.expires_at).delete()
+            continue
+        if record.fingerprint != fingerprint:
+            return None, Response(
+                {'error': f'This {IDEMPOTENCY_HEADER} was already used for a different request.'},
+                status=status.HTTP_422_UNPROCESSABLE_ENTITY
+            )
+        if record.status == 'COMPLETED':
+            return None, _replay(record)
+        if record.locked_until <= timezone.now() and _take_over(record):
+            return record, None
+
+        # A duplicate is still running: wait for it to finish and replay its result
+        if time.monotonic() >= deadline:
+            response = Response(
+                {'error': f'A request with this {IDEMPOTENCY_HEADER} is still being processed.'},
+                status=status.HTTP_409_CONFLICT
+            )
+            response['Retry-After'] = '1'
+            return None, response
+        time.sleep(poll_interval)
+
+def idempotent(scope):
+    """
+    Makes a view method safe to retry. Requests carrying an Idempotency-Key
+    header run at most once per (user, scope, key); repeats get the stored
+    response back and concurrent duplicates wait for the first one to finish.
+    The response is recorded in the same transaction as the view's writes, so
+    a crash can never leave the work committed without its response. Server
+    errors are not recorded, so the client can retry them with the same key.
+    Requests without the header are passed through untouched.
+    """
+    def decorator(view_method):
+        @wraps(view_method)
+        def wrapper(self, request, *args, **kwargs):
+            key = request.headers.get(IDEMPOTENCY_HEADER)
+            if not key:
+                return view_method(self, request, *args, **kwargs)
+            if len(key) > 255:
+                return Response(
+                    {'error': f'{IDEMPOTENCY_HEADER} must be at most 255 characters.'},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+
+            record, response = _acquire(request.user, scope, key, request_fingerprint(request))
+            if response is not None:
+                return response
+
+            try:
+                with transaction.atomic():
+                    response = view_method(self, request, *args, **kwargs)
+                    if response.status_code >= 500:
+                        raise _ServerError(response)
+                    record.status = 'COMPLETED'
+                    record.response_status = response.status_code
+                    record.response_body = response.data
+                    record.save(update_fields=['status', 'response_status', 'response_body', 'updated_at'])
+            except _ServerError as error:
+                record.delete()
+                return error.response
+            except Exception:
+                record.delete()
+                raise
+            return response
+        return wrapper
+    return decorator
+
+class _ServerError(Exception):
+    """Rolls back the view's transaction when it answers with a 5xx"""
+    def __init__(self, response):
+        super().__init__(response.status_code)
+        self.response = response
+
+def purge_expired_keys(batch_size=1000):
+    """Deletes idempotency keys past their TTL in batches. Returns the number deleted."""
+    from ..models import IdempotencyKey
+
+    deleted = 0
+    while True:
+        expired = list(
+            IdempotencyKey.objects.filter(expires_at__lte=timezone.now()).values_list('pk', flat=True)[:batch_size]
+        )
+        if not expired:
+            return deleted
+        deleted += IdempotencyKey.objects.filter(pk__in=expired).delete()[0]
@@ -0,0 +1,493 @@
+import random
+from datetime import timedelta
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Case, F, OuterRef, Q, Subquery, Sum, When
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+def decrement_stock(quantities):
+    """
+    Takes {product_pk: quantity} out of Product.quantity in a single conditional
+    UPDATE. Each row only matches while it still has enough stock, so a short
+    update count means another writer got there first and the caller must roll back.
+    """
+    from ..models import Product
+
+    if not quantities:
+        return
+    # Lines asking for the same quantity share one guard and one CASE branch
+    by_quantity = {}
+    for product_pk, quantity in quantities.items():
+        by_quantity.setdefault(quantity, []).append(product_pk)
+    in_stock = Q()
+    for quantity, product_pks in by_quantity.items():
+        in_stock |= Q(pk__in=product_pks, quantity__gte=quantity)
+    updated = Product.all_objects.filter(in_stock).update(
+        quantity=Case(
+            *[When(pk__in=product_pks, then=F('quantity') - quantity) for quantity, product_pks in by_quantity.items()],
+            default=F('quantity')
+        )
+    )
+    if updated != len(quantities):
+        raise ValueError("Insufficient stock for one or more items in your cart.")
+
+def increment_stock(quantities):
+    """Puts {product_pk: quantity} back into Product.quantity in a single UPDATE"""
+    from ..models import Product
+
+    if not quantities:
+        return
+    by_quantity = {}
+    for product_pk, quantity in quantities.items():
+        by_quantity.setdefault(quantity, []).append(product_pk)
+    Product.all_objects.filter(pk__in=list(quantities)).update(
+        quantity=Case(
+            *[When(pk__in=product_pks, then=F('quantity') + quantity) for quantity, product_pks in by_quantity.items()],
+            default=F('quantity')
+        )
+    )
+
+def take_from_shards(product_pk, shard_count, quantity):
+    """
+    Takes quantity from a sharded product and returns {shard_no: quantity}.
+    Starts at a random shard so concurrent buyers land on different rows; only
+    when no single shard can cover the request are the shards locked and drained
+    in order. Must run inside the caller's transaction.
+    """
+    from ..models import StockShard
+
+    start = random.randrange(shard_count)
+    for offset in range(shard_count):
+        shard_no = (start + offset) % shard_count
+        taken = StockShard.objects.filter(
+            product_id=product_pk,
+            shard_no=shard_no,
+            quantity__gte=quantity
+        ).update(quantity=F('quantity') - quantity)
+        if taken:
+            return {shard_no: quantity}
+
+    shards = list(StockShard.objects.select_for_update().filter(product_id=product_pk).order_by('shard_no'))
+    if sum(shard.quantity for shard in shards) < quantity:
+        raise ValueError("Insufficient stock for one or more items in your cart.")
+    allocations = {}
+    remaining = quantity
+    for shard in shards:
+        take = min(shard.quantity, remaining)
+        if take <= 0:
+            continue
+        if not StockShard.objects.filter(pk=shard.pk, quantity__gte=take).update(quantity=F('quantity') - take):
+            raise ValueError("Insufficient stock for one or more items in your cart.")
+        allocations[shard.shard_no] = take
+        remaining -= take
+        if not remaining:
+            break
+    return allocations
+
+def return_to_shards(product_pk, shard_count, quantity):
+    """Puts quantity back into one random shard of a sharded product"""
+    from ..models import StockShard
+
+    StockShard.objects.filter(
+        product_id=product_pk,
+        shard_no=random.randrange(shard_count)
+    ).update(quantity=F('quantity') + quantity)
+
+def take_stock(products, quantities):
+    """
+    Takes {product_pk: quantity} out of stock, from Product.quantity or from the
+    product's shards. products maps pk to a Product with stock_shards loaded.
+    Returns {product_pk: allocations} for recording on holds.
+    """
+    allocations = {}
+    unsharded = {}
+    for product_pk, quantity in quantities.items():
+        if products[product_pk].stock_shards:
+            allocations[product_pk] = take_from_shards(product_pk, products[product_pk].stock_shards, quantity)
+        else:
+            unsharded[product_pk] = quantity
+            allocations[product_pk] = {}
+    decrement_stock(unsharded)
+    return allocations
+
+def return_stock(quantities):
+    """
+    Puts {product_pk: quantity} back into stock right away, routed by each
+    product's current sharding so stock is never lost if it was resharded meanwhile.
+    """
+    from ..models import Product
+
+    if not quantities:
+        return
+    shard_counts = dict(Product.all_objects.filter(pk__in=list(quantities)).values_list('pk', 'stock_shards'))
+    increment_stock({
+        product_pk: quantity
+        for product_pk, quantity in quantities.items()
+        if product_pk in shard_counts and not shard_counts[product_pk]
+    })
+    for product_pk, quantity in quantities.items():
+        if shard_counts.get(product_pk):
+            return_to_shards(product_pk, shard_counts[product_pk], quantity)
+
+def record_movements(movements, applied):
+    """
+    Appends ledger rows in one INSERT. movements is an iterable of
+    (product_pk, kind, signed_quantity, order, note). applied says whether the
+    caller already changed the stock counters; pending rows are folded later.
+    """
+    from ..models import InventoryMovement
+
+    rows = [
+        InventoryMovement(product_id=product_pk, kind=kind, quantity=quantity, applied=applied, order=order, note=note)
+        for product_pk, kind, quantity, order, note in movements
+        if quantity
+    ]
+    if rows:
+        InventoryMovement.objects.bulk_create(rows)
+
+def append_returns(quantities, kind, order=None, note=''):
+    """
+    Records stock coming back ({product_pk: quantity}) without touching the
+    product or shard rows. Increases can never oversell, so hot writers
+    (hold releases, cancellations, refunds) only append; fold_movements
+    applies the rows in batches.
+    """
+    record_movements(
+        [(product_pk, kind, quantity, order, note) for product_pk, quantity in quantities.items()],
+        applied=False
+    )
+
+def reshard_product_stock(product_pk, shards):
+    """
+    Splits a product's stock evenly across shards rows (0 folds it back into
+    Product.quantity). Use it ahead of a flash sale for products expected to
+    be hot. Returns the total stock moved.
+    """
+    from ..models import Product, StockShard
+
+    with transaction.atomic():
+        product = Product.all_objects.select_for_update().get(pk=product_pk)
+        current = list(StockShard.objects.select_for_update().filter(product_id=product_pk))
+        total = sum(shard.quantity for shard in current) if product.stock_shards else product.quantity
+        _split_into_shards(product_pk, shards, total)
+        Product.all_objects.filter(pk=product_pk).update(stock_shards=shards, quantity=total)
+        return total
+
+def _split_into_shards(product_pk, shards, total):
+    """Replaces a product's shard rows with total spread evenly over shards rows (callers hold the locks)"""
+    from ..models import StockShard
+
+    StockShard.objects.filter(product_id=product_pk).delete()
+    if shards:
+        StockShard.objects.bulk_create([
+            StockShard(product_id=product_pk, shard_no=shard_no, quantity=total // shards + (shard_no < total % shards))
+            for shard_no in range(shards)
+        ])
+
+def sync_sharded_quantities():
+    """Refreshes Product.quantity of sharded products from their shards (for display and reads)"""
+    from ..models import Product, StockShard
+
+    shard_total = StockShard.objects.filter(
+        product_id=OuterRef('pk')
+    ).order_by().values('product_id').annotate(total=Sum('quantity')).values('total')
+    return Product.all_objects.filter(stock_shards__gt=0).update(
+        quantity=Coalesce(Subquery(shard_total), 0)
+    )
+
+def hold_stock(user, product, quantity):
+    """Takes quantity of product out of stock for user for INVENTORY_HOLD_TTL_SECONDS"""
+    from ..models import InventoryHold
+
+    if quantity <= 0:
+        raise ValueError("Quantity must be at least 1.")
+    ttl = getattr(settings, 'INVENTORY_HOLD_TTL_SECONDS', 600)
+    with transaction.atomic():
+        allocations = take_stock({product.pk: product}, {product.pk: quantity})[product.pk]
+        record_movements([(product.pk, 'HOLD', -quantity, None, '')], applied=True)
+        return InventoryHold.objects.create(
+            user=user,
+            product=product,
+            quantity=quantity,
+            allocations=allocations,
+            expires_at=timezone.now() + timedelta(seconds=ttl),
+        )
+
+def release_holds(holds, status='RELEASED'):
+    """
+    Ends the given active holds and appends their stock as pending RELEASE
+    movements. Holds already locked by a checkout that is converting them are
+    skipped. Returns the number released.
+    """
+    from ..models import InventoryHold
+
+    with transaction.atomic():
+        rows = list(
+            holds.select_for_update(skip_locked=True).filter(status='ACTIVE').values_list(
+                'hold_id', 'product_id', 'quantity'
+            )
+        )
+        if not rows:
+            return 0
+        InventoryHold.objects.filter(pk__in=[row[0] for row in rows], status='ACTIVE').update(status=status)
+        returns = {}
+        for _, product_pk, quantity in rows:
+            returns[product_pk] = returns.get(product_pk, 0) + quantity
+        append_returns(returns, 'RELEASE')
+        return len(rows)
+
+def release_expired_holds(batch_size=500):
+    """Sweeps expired holds in batches and folds their stock back in. Returns the number expired."""
+    from ..models import InventoryHold
+
+    expired = 0
+    while True:
+        hold_ids = list(
+            InventoryHold.objects.filter(
+                status='ACTIVE',
+                expires_at__lte=timezone.now()
+            ).order_by('expires_at').values_list('hold_id', flat=True)[:batch_size]
+        )
+        if not hold_ids:
+            break
+        released = release_holds(InventoryHold.objects.filter(pk__in=hold_ids), status='EXPIRED')
+        expired += released
+        if not released:
+            break
+    fold_movements(batch_size=batch_size)
+    return expired
+
+def sync_cart_hold(user, product, quantity, grow=True):
+    """
+    Makes user's active holds on product cover exactly quantity and restarts
+    their TTL. With grow=False holds are only ever shrunk (used when holding at
+    add-to-cart is disabled, so removed cart quantity is still given back).
+    """
+    from ..models import InventoryHold
+
+    with transaction.atomic():
+        holds = InventoryHold.objects.filter(user=user, product=product, status='ACTIVE')
+        held = holds.aggregate(total=Sum('quantity'))['total'] or 0
+        if quantity == held:
+            ttl = getattr(settings, 'INVENTORY_HOLD_TTL_SECONDS', 600)
+            holds.update(expires_at=timezone.now() + timedelta(seconds=ttl))
+        elif quantity > held:
+            if grow:
+                hold_stock(user, product, quantity - held)
+        else:
+            trim_holds(holds, held - quantity)
+        return InventoryHold.objects.filter(user=user, product=product, status='ACTIVE')
+
+def trim_holds(holds, excess):
+    """Gives back excess units from the given active holds, newest first, keeping the rest held"""
+    from ..models import InventoryHold
+
+    with transaction.atomic():
+        returned = {}
+        for hold in holds.select_for_update().filter(status='ACTIVE').order_by('-created_at'):
+            if excess <= 0:
+                break
+            take = min(hold.quantity, excess)
+            if take == hold.quantity:
+                InventoryHold.objects.filter(pk=hold.pk).update(status='RELEASED')
+            else:
+                InventoryHold.objects.filter(pk=hold.pk).update(quantity=F('quantity') - take)
+            returned[hold.product_id] = returned.get(hold.product_id, 0) + take
+            excess -= take
+        append_returns(returned, 'RELEASE')
+
+def take_stock_for_checkout(user, quantities):
+    """
+    Makes sure {product_pk: quantity} is out of stock for user's checkout.
+    Quantities already covered by the user's active holds are not taken again,
+    surplus held quantity is appended back to stock, and only the shortfall is
+    taken now. Unsharded products being taken are locked in primary-key order;
+    held and sharded products are read without locking their (hot) product row.
+    Returns (products, hold_ids, held); pass them to record_sale once the order exists.
+    """
+    from ..models import InventoryHold, Product
+
+    held = {}
+    hold_ids = []
+    for hold_id, product_pk, quantity in InventoryHold.objects.select_for_update().filter(
+        user=user,
+        product_id__in=list(quantities),
+        status='ACTIVE'
+    ).values_list('hold_id', 'product_id', 'quantity'):
+        hold_ids.append(hold_id)
+        held[product_pk] = held.get(product_pk, 0) + quantity
+
+    shortfall = {}
+    surplus = {}
+    for product_pk, quantity in quantities.items():
+        held_quantity = held.get(product_pk, 0)
+        if quantity > held_quantity:
+            shortfall[product_pk] = quantity - held_quantity
+        elif held_quantity > quantity:
+            surplus[product_pk] = held_quantity - quantity
+
+    fields = (
+        'product_id', 'seller_id', 'product_name', 'product_price', 'product_discountedPrice',
+        'is_discounted', 'is_active', 'is_deleted', 'quantity', 'stock_shards'
+    )
+    products = {
+        product.pk: product
+        for product in Product.all_objects.select_for_update().filter(
+            pk__in=sorted(shortfall),
+            stock_shards=0
+        ).order_by('pk').only(*fields)
+    } if shortfall else {}
+    unlocked = [product_pk for product_pk in quantities if product_pk not in products]
+    if unlocked:
+        products.update({
+            product.pk: product
+            for product in Product.all_objects.filter(pk__in=unlocked).only(*fields)
+        })
+
+    # Validate every line before writing anything
+    for product_pk in quantities:
+        product = products.get(product_pk)
+        if product is None or product.is_deleted or not product.is_active:
+            raise ValueError("One or more products in your cart are no longer available.")
+        if product_pk in shortfall and not product.stock_shards and product.quantity < shortfall[product_pk]:
+            raise ValueError(
+                f"Insufficient stock for {product.product_name}. Only {product.quantity} items available."
+            )
+
+    take_stock(products, shortfall)
+    append_returns(surplus, 'RELEASE', note='Checkout surplus')
+    held = {product_pk: min(quantity, quantities[product_pk]) for product_pk, quantity in held.items()}
+    return products, hold_ids, held
+
+def record_sale(order, quantities, hold_ids, held):
+    """
+    Converts the checkout's holds into order and writes its ledger rows in one
+    INSERT: a SALE per line, plus a RELEASE for the part that had been held so
+    the HOLD/RELEASE/SALE rows net out to the stock actually taken.
+    """
+    from ..models import InventoryHold
+
+    if hold_ids:
+        InventoryHold.objects.filter(pk__in=hold_ids).update(status='CONVERTED', order=order)
+    movements = []
+    for product_pk, quantity in quantities.items():
+        if held.get(product_pk):
+            movements.append((product_pk, 'RELEASE', held[product_pk], order, 'Converted hold'))
+        movements.append((product_pk, 'SALE', -quantity, order, ''))
+    record_movements(movements, applied=True)
+
+def adjust_stock(product, delta, kind='ADJUSTMENT', note='', order=None):
+    """
+    Changes a product's stock right away and records it. Decreases are guarded
+    and raise ValueError rather than go below zero.
+    """
+    with transaction.atomic():
+        if delta < 0:
+            take_stock({product.pk: product}, {product.pk: -delta})
+        elif delta > 0:
+            return_stock({product.pk: delta})
+        record_movements([(product.pk, kind, delta, order, note)], applied=True)
+
+def current_stock(product_pk):
+    """Available stock of a product including movements not folded in yet"""
+    from ..models import InventoryMovement, Product, StockShard
+
+    product = Product.all_objects.only('quantity', 'stock_shards').get(pk=product_pk)
+    if product.stock_shards:
+        level = StockShard.objects.filter(product_id=product_pk).aggregate(total=Sum('quantity'))['total'] or 0
+    else:
+        level = product.quantity
+    pending = InventoryMovement.objects.filter(product_id=product_pk, applied=False).aggregate(total=Sum('quantity'))['total'] or 0
+    return level + pending
+
+def set_stock_level(product, quantity, note='Stock level set by seller'):
+    """Records the movement that brings product's stock to quantity (receipt when it grows)"""
+    delta = quantity - current_stock(product.pk)
+    adjust_stock(product, delta, kind='RECEIPT' if delta > 0 else 'ADJUSTMENT', note=note)
+
+def fold_movements(batch_size=1000):
+    """
+    Applies pending ledger rows to the stock counters: one CASE UPDATE for the
+    unsharded products in each batch plus one UPDATE per sharded product, then
+    refreshes the display quantity of sharded products. Returns the rows folded.
+    """
+    from ..models import InventoryMovement
+
+    folded = 0
+    while True:
+        with transaction.atomic():
+            rows = list(
+                InventoryMovement.objects.select_for_update(skip_locked=True).filter(
+                    applied=False
+                ).order_by('id').values_list('id', 'product_id', 'quantity')[:batch_size]
+            )
+            if not rows:
+                break
+            deltas = {}
+            for _, product_pk, quantity in rows:
+                deltas[product_pk] = deltas.get(product_pk, 0) + quantity
+            return_stock({product_pk: delta for product_pk, delta in deltas.items() if delta})
+            InventoryMovement.objects.filter(id__in=[row[0] for row in rows]).update(applied=True)
+            folded += len(rows)
+    sync_sharded_quantities()
+    return folded
+
+def reconcile_inventory(fix=False):
+    """
+    Verifies every product's stock counters against the fold of its applied
+    ledger rows. Products that disagree are re-checked under a row lock to rule
+    out writes that landed between the two scans. Returns a list of
+    (product_pk, expected, actual, pending); with fix=True the counters are
+    rewritten from the ledger, sharded products getting expected split evenly
+    across their shards again.
+    """
+    from ..models import InventoryMovement, Product, StockShard
+
+    def ledger_totals(product_pks=None, applied=True):
+        movements = InventoryMovement.objects.filter(applied=applied)
+        if product_pks is not None:
+            movements = movements.filter(product_id__in=product_pks)
+        return dict(movements.order_by().values('product_id').annotate(total=Sum('quantity')).values_list('product_id', 'total'))
+
+    def shard_totals(product_pks=None):
+        shards = StockShard.objects.all()
+        if product_pks is not None:
+            shards = shards.filter(product_id__in=product_pks)
+        return dict(shards.order_by().values('product_id').annotate(total=Sum('quantity')).values_list('product_id', 'total'))
+
+    def drifted(products, ledger, shards):
+        return {
+            product_pk: (ledger.get(product_pk, 0), shards.get(product_pk, 0) if stock_shards else quantity)
+            for product_pk, quantity, stock_shards in products
+            if (shards.get(product_pk, 0) if stock_shards else quantity) != ledger.get(product_pk, 0)
+        }
+
+    ledger = ledger_totals()
+    shards = shard_totals()
+    suspects = drifted(Product.all_objects.values_list('pk', 'quantity', 'stock_shards').iterator(chunk_size=2000), ledger, shards)
+    if not suspects:
+        return []
+
+    report = []
+    with transaction.atomic():
+        products = list(
+            Product.all_objects.select_for_update().filter(pk__in=list(suspects)).order_by('pk').values_list('pk', 'quantity', 'stock_shards')
+        )
+        sharded = {product_pk: stock_shards for product_pk, _, stock_shards in products if stock_shards}
+        if fix and sharded:
+            # Buyers only lock shard rows, so hold them too while the split is rewritten
+            list(StockShard.objects.select_for_update().filter(product_id__in=list(sharded)).order_by('product_id', 'shard_no').values_list('pk'))
+        confirmed = drifted(products, ledger_totals(list(suspects)), shard_totals(list(suspects)))
+        pending = ledger_totals(list(confirmed), applied=False)
+        for product_pk, (expected, actual) in confirmed.items():
+            report.append((product_pk, expected, actual, pending.get(product_pk, 0)))
+            if not fix:
+                continue
+            if product_pk in sharded:
+                _split_into_shards(product_pk, sharded[product_pk], expected)
+            else:
+                Product.all_objects.filter(pk=product_pk).update(quantity=expected)
+    if fix:
+        sync_sharded_quantities()
+    return report
@@ -0,0 +1,165 @@
+import logging
+import random
+import traceback
+import uuid
+from datetime import timedelta
+from django.conf import settings
+from django.db import IntegrityError, OperationalError, close_old_connections, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+logger = logging.getLogger(__name__)
+
+def task_path(func):
+    return f'{func.__module__}.{func.__qualname__}'
+
+def _insert_job(task, kwargs, queue, dedupe_key, delay):
+    from ..models import Job
+
+    # ignore_conflicts turns a clash with a still-pending duplicate into a no-op
+    Job.objects.bulk_create([
+        Job(task=task, kwargs=kwargs, queue=queue, dedupe_key=dedupe_key, run_after=timezone.now() + timedelta(seconds=delay))
+    ], ignore_conflicts=dedupe_key is not None)
+
+def enqueue(func, queue='default', dedupe_key=None, delay=0, **kwargs):
+    """
+    Schedules func(**kwargs) to run on a background worker once the current
+    transaction commits (immediately when there is none). kwargs must be JSON
+    serialisable; pass primary keys, not model instances. Jobs sharing a
+    dedupe_key collapse into one while the first is still pending, so the
+    task should read current state rather than rely on its arguments alone.
+    Only workers started for the given queue pick the job up. With
+    JOB_QUEUE_INLINE the task runs in-process after commit instead.
+    """
+    task = task_path(func)
+    if getattr(settings, 'JOB_QUEUE_INLINE', False):
+        transaction.on_commit(lambda: _run_inline(task, kwargs))
+    else:
+        transaction.on_commit(lambda: _insert_job(task, kwargs, queue, dedupe_key, delay))
+
+def _run_inline(task, kwargs):
+    with transaction.atomic():
+        import_string(task)(**kwargs)
+
+def claim_jobs(limit=10, queue='default'):
+    """
+    Claims up to limit runnable jobs from the queue, oldest first, and returns them.
+    Jobs whose worker died (lease lapsed while RUNNING) are runnable again.
+    Candidates are picked with SELECT ... FOR UPDATE SKIP LOCKED where the
+    database supports it; the claim itself is a conditional UPDATE stamped
+    with a fresh token, so on SQLite two workers racing for the same rows
+    can never both get them.
+    """
+    from ..models import Job
+
+    now = timezone.now()
+    runnable = Q(status='PENDING', run_after__lte=now) | Q(status='RUNNING', locked_until__lt=now)
+    token = uuid.uuid4().hex
+    with transaction.atomic():
+        candidates = list(
+            Job.objects.select_for_update(skip_locked=True).filter(runnable, queue=queue).order_by('id').values_list('pk', flat=True)[:limit]
+        )
+        if not candidates:
+            return []
+        Job.objects.filter(runnable, pk__in=candidates).update(
+            status='RUNNING',
+            claim_token=token,
+            attempts=F('attempts') + 1,
+            locked_until=now + timedelta(seconds=getattr(settings, 'JOB_LEASE_SECONDS', 300)),
+            updated_at=now,
+        )
+    return list(Job.objects.filter(claim_token=token).order_by('id'))
+
+class _LeaseLost(Exception):
+    """Another worker reclaimed the job while it ran; its writes are rolled back"""
+
+def _retry_delay(attempts):
+    base = getattr(settings, 'JOB_RETRY_BASE_SECONDS', 5)
+    delay = min(base * 2 ** (attempts - 1), getattr(settings, 'JOB_RETRY_MAX_SECONDS', 3600))
+    return delay * random.uniform(0.5, 1.0)
+
+def _give_up(job, exc):
+    """
+    Calls the task's on_failure(error, **kwargs) hook, if it has one, once the
+    job has used its last attempt, so the task can record the failure on the
+    rows it was working for
+    """
+    on_failure = getattr(import_string(job.task), 'on_failure', None)
+    if on_failure is None:
+        return
+    try:
+        with transaction.atomic():
+            on_failure(error=str(exc), **job.kwargs)
+    except Exception:
+        logger.exception(f"on_failure hook of job {job.pk} ({job.task}) failed")
+
+def run_job(job):
+    """
+    Runs one claimed job. The task's writes and the job's removal commit
+    together, so a task that finished is never run again and one that
+    crashed left nothing behind. Failures are retried with exponential
+    backoff until JOB_MAX_ATTEMPTS, after which the job is kept as FAILED
+    and the task's on_failure hook runs; a retry is dropped when a job with its dedupe_key is already pending.
+    Returns True when the job succeeded.
+    """
+    from ..models import Job
+
+    try:
+        with transaction.atomic():
+            import_string(job.task)(**job.kwargs)
+            if not Job.objects.filter(pk=job.pk, claim_token=job.claim_token).delete()[0]:
+                raise _LeaseLost(job.pk)
+        return True
+    except _LeaseLost:
+        logger.warning(f"Job {job.pk} ({job.task}) was reclaimed by another worker, skipping")
+        return False
+    except Exception as exc:
+        error = traceback.format_exc()
+        logger.error(f"Job {job.pk} ({job.task}) failed on attempt {job.attempts}: {error}")
+        claimed = Job.objects.filter(pk=job.pk, claim_token=job.claim_token)
+        if job.attempts >= getattr(settings, 'JOB_MAX_ATTEMPTS', 5):
+            updates = {'status': 'FAILED'}
+            _give_up(job, exc)
+        else:
+            updates = {'status': 'PENDING', 'run_after': timezone.now() + timedelta(seconds=_retry_delay(job.attempts))}
+        try:
+            with transaction.atomic():
+                claimed.update(claim_token=None, locked_until=None, last_error=error[-10000:], updated_at=timezone.now(), **updates)
+        except IntegrityError:
+            # A pending twin with the same dedupe_key was queued meanwhile; tasks
+            # read current state, so it does this job's work and the retry is dropped
+            claimed.delete()
+            logger.info(f"Job {job.pk} ({job.task}) dropped its retry to pending job with dedupe key {job.dedupe_key}")
+        return False
+
+def run_pending_jobs(limit=None, batch_size=10, queue='default'):
+    """Runs jobs until none are due (or limit jobs ran). Returns (succeeded, failed)."""
+    succeeded = failed = 0
+    while limit is None or succeeded + failed < limit:
+        batch = claim_jobs(batch_size if limit is None else min(batch_size, limit - succeeded - failed), queue=queue)
+        if not batch:
+            break
+        for job in batch:
+            if run_job(job):
+                succeeded += 1
+            else:
+                failed += 1
+    return succeeded, failed
+
+def work(stop_event, batch_size=10, poll_interval=1.0, queue='default'):
+    """Worker loop: runs due jobs until stop_event is set, sleeping poll_interval when idle."""
+    from .sequence_services import close_side_connection
+
+    while not stop_event.is_set():
+        close_old_connections()
+        close_side_connection()
+        try:
+            succeeded, failed = run_pending_jobs(batch_size=batch_size, queue=queue)
+        except OperationalError as error:
+            # e.g. SQLite "database is locked" while another worker claims
+            logger.warning(f"Job worker could not claim jobs: {error}")
+            succeeded = failed = 0
+        if not succeeded + failed:
+            stop_event.wait(poll_interval)
+    close_side_connection(force=True)
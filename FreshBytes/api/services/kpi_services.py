@@ -0,0 +1,158 @@
+import logging
+import time
+from datetime import timedelta
+from django.conf import settings
+from django.db.models import Count, Q, Sum
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+ORDER_STATUSES = ('PENDING', 'CONFIRMED', 'SHIPPED', 'DELIVERED', 'CANCELLED', 'REFUNDED')
+
+# Orders in these statuses do not count towards GMV
+NON_GMV_STATUSES = ('CANCELLED', 'REFUNDED')
+
+def _user_metrics(since):
+    from ..models import User
+
+    live = Q(is_deleted=False)
+    row = User.objects.aggregate(
+        total=Count('pk'),
+        active=Count('pk', filter=live & Q(is_active=True)),
+        inactive=Count('pk', filter=live & Q(is_active=False)),
+        deleted=Count('pk', filter=Q(is_deleted=True)),
+        admin=Count('pk', filter=live & Q(role='admin')),
+        seller=Count('pk', filter=live & Q(role='seller')),
+        customer=Count('pk', filter=live & Q(role='customer')),
+        recent_30_days=Count('pk', filter=live & Q(created_at__gte=since)),
+    )
+    return {
+        'total': row['total'],
+        'active': row['active'],
+        'inactive': row['inactive'],
+        'deleted': row['deleted'],
+        'role_distribution': {role: row[role] for role in ('admin', 'seller', 'customer')},
+        'recent_30_days': row['recent_30_days'],
+    }
+
+def _seller_metrics(since):
+    from ..models import Seller
+
+    live = Q(is_deleted=False)
+    return Seller.objects.aggregate(
+        total=Count('pk', filter=live),
+        active=Count('pk', filter=live & Q(is_active=True)),
+        verified=Count('pk', filter=live & Q(is_verified=True)),
+        deleted=Count('pk', filter=Q(is_deleted=True)),
+        recent_30_days=Count('pk', filter=live & Q(created_at__gte=since)),
+    )
+
+def _order_metrics(model, since):
+    """Counts and GMV for one order table (hot or archived) in a single query"""
+    counted = ~Q(order_status__in=NON_GMV_STATUSES)
+    recent = Q(order_date__gte=since)
+    return model.objects.aggregate(
+        total=Count('pk'),
+        recent_30_days=Count('pk', filter=recent),
+        gmv=Sum('order_total', filter=counted, default=0),
+        gmv_30_days=Sum('order_total', filter=counted & recent, default=0),
+        **{status.lower(): Count('pk', filter=Q(order_status=status)) for status in ORDER_STATUSES},
+    )
+
+def _promo_metrics(now):
+    from ..models import Promo
+
+    return Promo.objects.aggregate(
+        total=Count('pk'),
+        running=Count('pk', filter=Q(is_active=True, promo_start_date__lte=now, promo_end_date__gte=now)),
+        scheduled=Count('pk', filter=Q(is_active=True, promo_start_date__gt=now)),
+        expired=Count('pk', filter=Q(promo_end_date__lt=now)),
+        inactive=Count('pk', filter=Q(is_active=False)),
+    )
+
+def compute_kpis():
+    """
+    Platform metrics for the admin dashboard. Each table is scanned once with
+    conditional aggregation: users, sellers, promos, and hot plus archived
+    orders (whose counts are added together).
+    """
+    from ..models import Order, ArchivedOrder
+
+    now = timezone.now()
+    since = now - timedelta(days=30)
+    hot = _order_metrics(Order, since)
+    cold = _order_metrics(ArchivedOrder, since)
+    orders = {key: hot[key] + cold[key] for key in hot}
+    counted_orders = orders['total'] - orders['cancelled'] - orders['refunded']
+
+    return {
+        'users': _user_metrics(since),
+        'sellers': _seller_metrics(since),
+        'orders': {
+            'total': orders['total'],
+            'recent_30_days': orders['recent_30_days'],
+            'by_status': {status: orders[status.lower()] for status in ORDER_STATUSES},
+        },
+        'gmv': {
+            'total': round(orders['gmv'], 2),
+            'last_30_days': round(orders['gmv_30_days'], 2),
+            'average_order_value': round(orders['gmv'] / counted_orders, 2) if counted_orders else 0,
+        },
+        'promos': _promo_metrics(now),
+    }
+
+def take_snapshot():
+    """Computes the KPIs, stores them as a new snapshot and drops snapshots past KPI_SNAPSHOT_RETENTION_DAYS"""
+    from ..models import KpiSnapshot
+
+    started = time.monotonic()
+    metrics = compute_kpis()
+    snapshot = KpiSnapshot.objects.create(metrics=metrics, duration_ms=int((time.monotonic() - started) * 1000))
+    retention = getattr(settings, 'KPI_SNAPSHOT_RETENTION_DAYS', 90)
+    KpiSnapshot.objects.filter(created_at__lt=timezone.now() - timedelta(days=retention)).delete()
+    logger.info(f"KPI snapshot {snapshot.pk} took {snapshot.duration_ms}ms")
+    return snapshot
+
+def refresh_kpis():
+    """Job task: takes a snapshot unless one was taken within KPI_REFRESH_MIN_SECONDS"""
+    if _seconds_until_refresh_allowed(_latest()) == 0:
+        take_snapshot()
+
+def _latest():
+    from ..models import KpiSnapshot
+
+    return KpiSnapshot.objects.order_by('-created_at').first()
+
+def _seconds_until_refresh_allowed(snapshot):
+    if snapshot is None:
+        return 0
+    age = (timezone.now() - snapshot.created_at).total_seconds()
+    return max(0, int(getattr(settings, 'KPI_REFRESH_MIN_SECONDS', 60) - age))
+
+def request_refresh():
+    """
+    Queues a KPI refresh for a background worker. Returns 0 when queued, or
+    the seconds to wait when the latest snapshot is too recent. Concurrent
+    requests share one pending job (and the task re-checks freshness), so
+    several admins refreshing at once cost a single scan.
+    """
+    from .job_services import enqueue
+
+    wait = _seconds_until_refresh_allowed(_latest())
+    if wait:
+        return wait
+    enqueue(refresh_kpis, dedupe_key='kpi-refresh')
+    return 0
+
+def latest_snapshot():
+    """
+    The newest snapshot, taken on the spot only when none exists yet. One
+    older than KPI_SNAPSHOT_MAX_AGE_SECONDS is still returned, with a refresh
+    queued in the background.
+    """
+    snapshot = _latest()
+    if snapshot is None:
+        return take_snapshot()
+    if (timezone.now() - snapshot.created_at).total_seconds() > getattr(settings, 'KPI_SNAPSHOT_MAX_AGE_SECONDS', 900):
+        request_refresh()
+    return snapshot
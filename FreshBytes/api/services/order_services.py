@@ -5,15 +5,16 @@ def generate_order_id(last_order):
         return f"oid{last_id + 1:03d}25"
     return "oid00125"
 
-def generate_order_item_id(last_order_item):
-    """Generate unique order item ID"""
-    if last_order_item and last_order_item.order_item_id and len(last_order_item.order_item_id) >= 8:
-        try:
-            last_id = int(last_order_item.order_item_id[5:8])
-            return f"oitid{last_id + 1:03d}25"
-        except (ValueError, IndexError):
-            return "oitid00125"
-    return "oitid00125"
+def generate_order_number(number, year=None):
+    """Generate order number from a sequence value"""
+    if year is None:
+        year = timezone.now().year
+    return f"OID-{year}-{number:07d}"
+
+def generate_order_item_id(number):
+    """Generate unique order item ID from a sequence value"""
+    current_year = timezone.now().year % 100
+    return f"oitid{number:07d}{current_year:02d}"
 
 def calculate_order_item_total(product, quantity):
     """Calculate total price for order item"""
@@ -21,6 +22,7 @@ def calculate_order_item_total(product, quantity):
     return product_price * quantity 
 
 from django.db import transaction
+from django.utils import timezone
 from ..models import Cart, CartItem, Order, OrderItem, Product, Payment
 
 def validate_user_for_order(user):
@@ -40,45 +42,71 @@ def validate_user_for_order(user):
     return True
 
 def create_order_from_cart(user, cart_item_ids=None, payment_method=None):
+    """
+    Set-based checkout. The number of queries does not depend on the number of
+    cart lines: one read of the cart, one read of the user's holds, one locking
+    read of the products, one conditional stock UPDATE, one bulk insert each of
+    order items, ledger rows and seller shares, plus the order, payment and
+    cart cleanup.
+    Quantities covered by inventory holds are converted instead of taken again;
+    sharded products cost a few extra queries each. Line prices come from the
+    product rows read here.
+    """
+    from .cart_services import refresh_cart_totals
+    from .inventory_services import take_stock_for_checkout, record_sale
+    from .sequence_services import next_values
+    from .trending_services import record_product_events
+
+    if not payment_method:
+        raise ValueError("Payment method is required.")
+
     with transaction.atomic():
         # Validate user can place order
         validate_user_for_order(user)
-        
-        cart = Cart.objects.get(user=user)
+
+        items = CartItem.objects.filter(cart__user=user)
         if cart_item_ids:
-            items = cart.items.filter(cart_item_id__in=cart_item_ids)
-        else:
-            items = cart.items.all()
-        if not items.exists():
+            items = items.filter(cart_item_id__in=cart_item_ids)
+        lines = list(items.values_list('cart_item_id', 'product_id', 'quantity'))
+        if not lines:
             raise ValueError("No items in cart to order.")
 
-        # Calculate order total
-        order_total = sum(item.total_price for item in items)
+        quantities = {}
+        for _, product_pk, quantity in lines:
+            quantities[product_pk] = quantities.get(product_pk, 0) + quantity
+
+        products, hold_ids, held = take_stock_for_checkout(user, quantities)
+        unit_prices = {
+            product_pk: product.product_discountedPrice if product.is_discounted else product.product_price
+            for product_pk, product in products.items()
+        }
+
+        line_totals = {product_pk: unit_prices[product_pk] * quantity for product_pk, quantity in quantities.items()}
+        order_total = sum(line_totals.values())
         # TODO: Add discount, tax, shipping logic as needed
 
-        # Create order
         order = Order.objects.create(
             user_id=user,
             order_total=order_total,
-            # Add other fields as needed
         )
 
-        # Create order items
-        for item in items:
-            OrderItem.objects.create(
+        # Order item IDs are allocated in one round trip and inserted in one statement
+        item_ids = next_values('order_item', len(quantities))
+        OrderItem.objects.bulk_create([
+            OrderItem(
+                order_item_id=generate_order_item_id(item_id),
                 order_id=order,
-                product_id=item.product,
-                quantity=item.quantity,
-                total_item_price=item.total_price,
-                # Add discount_amount if needed
+                product_id_id=product_pk,
+                quantity=quantity,
+                total_item_price=line_totals[product_pk],
             )
-            # Optionally: update product inventory
-            item.product.quantity -= item.quantity
-            item.product.save()
+            for item_id, (product_pk, quantity) in zip(item_ids, quantities.items())
+        ])
+
+        record_sale(order, quantities, hold_ids, held)
+        record_seller_orders(order, products, quantities, line_totals)
+        record_product_events(quantities, 'order')
 
-        # Create payment
-        if not payment_method:
-            raise ValueError("Payment method is required.")
         payment = Payment.objects.create(
             order_id=order,
             payment_method=payment_method,
@@ -87,6 +115,135 @@ def create_order_from_cart(user, cart_item_ids=None, payment_method=None):
         )
 
         # Remove ordered items from cart
-        items.delete()
+        CartItem.objects.filter(cart_item_id__in=[cart_item_id for cart_item_id, _, _ in lines]).delete()
+        refresh_cart_totals(Cart.objects.filter(user=user))
+
+        return order, payment
+
+def record_seller_orders(order, products, quantities, line_totals):
+    """Writes each seller's share of a new order to SellerOrders in one INSERT and adds it to the daily rollups"""
+    from ..models import SellerOrder
+    from .rollup_services import record_order_sales
+
+    shares = {}
+    for product_pk, quantity in quantities.items():
+        product = products[product_pk]
+        seller_pk = product.seller_id_id
+        if seller_pk is None:
+            continue
+        share = shares.setdefault(seller_pk, {'item_count': 0, 'units': 0, 'total': 0, 'discount': 0})
+        share['item_count'] += 1
+        share['units'] += quantity
+        share['total'] += line_totals[product_pk]
+        share['discount'] += max(product.product_price * quantity - line_totals[product_pk], 0)
+    SellerOrder.objects.bulk_create([
+        SellerOrder(
+            seller_id=seller_pk,
+            order_id=order.pk,
+            order_number=order.order_number,
+            customer_id=order.user_id_id,
+            order_status=order.order_status,
+            order_date=order.order_date,
+            **share
+        )
+        for seller_pk, share in shares.items()
+    ])
+    record_order_sales(order, shares)
+
+class CheckoutQueueFull(Exception):
+    """Raised when too many asynchronous checkouts are already waiting"""
+
+def submit_checkout(user, cart_item_ids=None, payment_method=None):
+    """
+    Admits an asynchronous checkout: runs only the cheap checks, records a
+    CheckoutTicket and queues it on the 'checkout' job queue, where a bounded
+    pool of workers (run_workers --queue checkout) processes tickets in
+    arrival order. Stock, prices and holds are checked when the ticket runs.
+    """
+    from django.conf import settings
+    from ..models import CheckoutTicket
+    from .job_services import enqueue
+
+    if not payment_method:
+        raise ValueError("Payment method is required.")
+    if payment_method not in dict(Payment.PAYMENT_METHODS):
+        raise ValueError(f"Invalid payment method. Allowed: {[choice for choice, _ in Payment.PAYMENT_METHODS]}")
+    validate_user_for_order(user)
+
+    items = CartItem.objects.filter(cart__user=user)
+    if cart_item_ids:
+        items = items.filter(cart_item_id__in=cart_item_ids)
+    if not items.exists():
+        raise ValueError("No items in cart to order.")
+
+    waiting = CheckoutTicket.objects.filter(status__in=['QUEUED', 'PROCESSING']).count()
+    if waiting >= getattr(settings, 'CHECKOUT_QUEUE_LIMIT', 10000):
+        raise CheckoutQueueFull("Checkout is busy, please try again shortly.")
+
+    with transaction.atomic():
+        ticket = CheckoutTicket.objects.create(
+            user=user,
+            cart_item_ids=list(cart_item_ids) if cart_item_ids else None,
+            payment_method=payment_method,
+        )
+        enqueue(process_checkout_ticket, queue='checkout', ticket_pk=ticket.pk)
+    return ticket
+
+def process_checkout_ticket(ticket_pk):
+    """
+    Background job: places the order for a queued checkout ticket. Runs in
+    the job's transaction, so the order, payment and ticket outcome commit
+    together. Checkout errors fail the ticket; database errors propagate so
+    the job is retried with the ticket still queued, and fail it through
+    fail_checkout_ticket once the job runs out of attempts.
+    """
+    from django.db import DatabaseError
+    from ..models import CheckoutTicket
+
+    if not CheckoutTicket.objects.filter(pk=ticket_pk, status='QUEUED').update(status='PROCESSING'):
+        return  # already processed
+    ticket = CheckoutTicket.objects.select_related('user').get(pk=ticket_pk)
+    try:
+        ticket.order, _ = create_order_from_cart(ticket.user, ticket.cart_item_ids, ticket.payment_method)
+        ticket.status = 'COMPLETED'
+    except DatabaseError:
+        raise
+    except Exception as e:
+        ticket.status = 'FAILED'
+        ticket.error = str(e)[:255]
+    ticket.save(update_fields=['status', 'order', 'error', 'updated_at'])
+
+def fail_checkout_ticket(ticket_pk, error):
+    """Fails a ticket whose job gave up after database errors on every attempt"""
+    from ..models import CheckoutTicket
+
+    CheckoutTicket.objects.filter(pk=ticket_pk, status__in=['QUEUED', 'PROCESSING']).update(
+        status='FAILED',
+        error=f'Checkout could not be completed: {error}'[:255],
+        updated_at=timezone.now()
+    )
+
+# Without it a ticket would stay QUEUED once its job stops retrying
+process_checkout_ticket.on_failure = fail_checkout_ticket
+
+def handle_order_status_change(order, old_status, new_status):
+    """Side effects of an order moving from old_status to new_status"""
+    from ..models import SellerOrder
+    from .inventory_services import append_returns
+    from .job_services import enqueue
+    from .rollup_services import record_order_reversal
+    from .seller_services import sync_order_sales
+
+    SellerOrder.objects.filter(order_id=order.pk).update(order_status=new_status, updated_at=timezone.now())
+
+    # Sales counters only change when an order enters or leaves DELIVERED
+    if 'DELIVERED' in (old_status, new_status) and old_status != new_status:
+        enqueue(sync_order_sales, dedupe_key=f'order-sales:{order.pk}', order_pk=order.pk)
 
-        return order, payment 
\ No newline at end of file
+    # Cancelled and refunded goods go back to stock through the ledger
+    if new_status in ('CANCELLED', 'REFUNDED') and old_status not in ('CANCELLED', 'REFUNDED'):
+        record_order_reversal(order, new_status)
+        quantities = {}
+        for product_pk, quantity in order.order_items.exclude(product_id=None).values_list('product_id', 'quantity'):
+            quantities[product_pk] = quantities.get(product_pk, 0) + quantity
+        append_returns(quantities, 'CANCEL' if new_status == 'CANCELLED' else 'REFUND', order=order)
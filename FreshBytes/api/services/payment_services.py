@@ -1,26 +1,11 @@
-from django.db import models
+# Status changes a payment may go through, manually (PaymentViewSet.update_status) or from a settlement file
+PAYMENT_TRANSITIONS = {
+    'PENDING': ['COMPLETED', 'FAILED'],
+    'COMPLETED': ['REFUNDED'],
+    'FAILED': [],
+    'REFUNDED': [],
+}
 
-class Payment(models.Model):
-    PAYMENT_METHODS = [
-        ('CARD', 'Card'),
-        ('PAYPAL', 'PayPal'),
-        ('COD', 'Cash on Delivery'),
-    ]
-    PAYMENT_STATUS = [
-        ('PENDING', 'Pending'),
-        ('COMPLETED', 'Completed'),
-        ('FAILED', 'Failed'),
-        ('REFUNDED', 'Refunded'),
-    ]
-    payment_id = models.CharField(primary_key=True, max_length=12, unique=True, editable=False)
-    order = models.OneToOneField('Order', on_delete=models.CASCADE, related_name='payment')
-    payment_method = models.CharField(max_length=20, choices=PAYMENT_METHODS)
-    payment_status = models.CharField(max_length=20, choices=PAYMENT_STATUS, default='PENDING')
-    amount = models.DecimalField(max_digits=10, decimal_places=2)
-    transaction_id = models.CharField(max_length=255, null=True, blank=True)
-    payment_date = models.DateTimeField(auto_now_add=True)
-    created_at = models.DateTimeField(auto_now_add=True)
-    updated_at = models.DateTimeField(auto_now=True)
-
-    def __str__(self):
-        return f"{self.payment_id} - {self.order.order_id} - {self.payment_status}"
+def generate_payment_id(number):
+    """Generate unique payment ID from a sequence value"""
+    return f"PAY{number:09d}"
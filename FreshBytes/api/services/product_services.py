@@ -34,6 +34,17 @@ def update_seller_total_products(seller):
     seller.total_products = total_products
     seller.save()
 
+def recount_seller_products(seller_pk):
+    """Background job: recounts a seller's active products in a single UPDATE."""
+    from django.db.models import Count, IntegerField, OuterRef, Subquery
+    from django.db.models.functions import Coalesce
+    from ..models import Product, Seller
+
+    active = Product.objects.filter(seller_id=OuterRef('pk')).order_by().values('seller_id').annotate(total=Count('pk')).values('total')
+    Seller.objects.filter(pk=seller_pk).update(
+        total_products=Coalesce(Subquery(active, output_field=IntegerField()), 0)
+    )
+
 def generate_product_id(last_product):
     """Generate unique product ID"""
     if last_product and last_product.product_id and len(last_product.product_id) >= 8:
@@ -66,7 +77,7 @@ def generate_product_sku(product, seller_products_count=None, counter=0):
 
 def update_product_discounted_price(product):
     """Update product's discounted price based on active promos"""
-    from ..models import Discount_Type
+    from ..choices import Discount_Type
     
     # Skip updates for deleted products
     if product.is_deleted:
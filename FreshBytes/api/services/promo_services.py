@@ -1,5 +1,5 @@
 from django.utils import timezone
-from django.db.models import Q
+from django.db.models import F, Q
 from django.db import transaction
 import logging
 
@@ -34,7 +34,7 @@ def update_product_discounted_price(product):
     """
     try:
         with transaction.atomic():
-            from ..models import Discount_Type
+            from ..choices import Discount_Type
             
             active_promos = product.promos.select_related('seller_id').filter(
                 Q(is_active=True) &
@@ -153,4 +153,121 @@ def update_products_has_promo_on_m2m_change(promo, action, pk_set=None):
                 update_product_has_promo_field(product)
     except Exception as e:
         logger.error(f"Error in M2M change for promo {promo.promo_id}: {str(e)}")
-        raise
\ No newline at end of file
+        raise
+
+def _best_promo_rules(links_qs):
+    """
+    Returns {product_id: (discount_type, discount_amount, discount_percentage)}
+    for the best currently active promo of each product in the given
+    PromoProduct queryset, using one query. "Best" follows
+    update_product_discounted_price: highest discount_amount, then highest
+    discount_percentage.
+    """
+    now = timezone.now()
+    rows = links_qs.filter(
+        promo__is_active=True,
+        promo__promo_start_date__lte=now,
+        promo__promo_end_date__gte=now,
+    ).order_by(
+        'product_id', '-promo__discount_amount', '-promo__discount_percentage'
+    ).values_list(
+        'product_id', 'promo__discount_type', 'promo__discount_amount', 'promo__discount_percentage'
+    )
+
+    best = {}
+    for product_id, discount_type, discount_amount, discount_percentage in rows:
+        best.setdefault(product_id, (discount_type, discount_amount, discount_percentage))
+    return best
+
+def reprice_products(product_ids, batch_size=500):
+    """
+    Recomputes discount fields for many products in one batched pass.
+    Active promos are loaded once per chunk and only products whose
+    discount fields actually change are written, with bulk_update.
+    Returns the number of products updated.
+    """
+    from ..choices import Discount_Type
+    from ..models import Product, PromoProduct
+
+    product_ids = list(product_ids)
+    fields = ['product_discountedPrice', 'is_discounted', 'has_promo']
+    updated = 0
+
+    for start in range(0, len(product_ids), batch_size):
+        chunk = product_ids[start:start + batch_size]
+        best = _best_promo_rules(PromoProduct.objects.filter(product_id__in=chunk))
+        changed = []
+        for product in Product.objects.filter(product_id__in=chunk).only('product_id', 'product_price', *fields):
+            rule = best.get(product.product_id)
+            if rule is None:
+                new_values = (None, False, False)
+            else:
+                discount_type, discount_amount, discount_percentage = rule
+                if discount_type == Discount_Type.PERCENTAGE:
+                    discount = (product.product_price * discount_percentage) / 100
+                else:  # FIXED amount
+                    discount = discount_amount
+                new_values = (max(0, product.product_price - discount), True, True)
+
+            if (product.product_discountedPrice, product.is_discounted, product.has_promo) != new_values:
+                product.product_discountedPrice, product.is_discounted, product.has_promo = new_values
+                changed.append(product)
+
+        if changed:
+            Product.objects.bulk_update(changed, fields, batch_size=batch_size)
+            Product.objects.filter(product_id__in=[product.product_id for product in changed]).update(
+                price_version=F('price_version') + 1
+            )
+            updated += len(changed)
+
+    logger.info(f"Repriced {updated} of {len(product_ids)} products")
+    return updated
+
+def reprice_promo_products(promo_pk):
+    """Background job: reprices every product linked to a promo after it was saved."""
+    from ..models import PromoProduct
+
+    return reprice_products(PromoProduct.objects.filter(promo_id=promo_pk).values_list('product_id', flat=True))
+
+def bulk_delete_promos(promos_qs, batch_size=500):
+    """
+    Deletes promos and their PromoProduct links in chunks of batch_size with
+    two DELETE statements per chunk, whatever the number of promos. The
+    per-promo repricing signals are muted (see muted_promo_signals); the
+    affected products are repriced once afterwards via reprice_products.
+    Returns the number of promos deleted.
+    """
+    from ..models import Promo, PromoProduct
+    from ..models.promo import muted_promo_signals
+
+    with transaction.atomic(), muted_promo_signals():
+        promo_ids = list(promos_qs.values_list('promo_id', flat=True))
+        product_ids = set()
+
+        for start in range(0, len(promo_ids), batch_size):
+            chunk = promo_ids[start:start + batch_size]
+            links = PromoProduct.objects.filter(promo_id__in=chunk)
+            product_ids.update(links.values_list('product_id', flat=True))
+            links.delete()
+            # The pre_delete receiver on Promo stops Django from fast-deleting: .delete()
+            # would load every promo and send a signal per row. The links (the only
+            # rows that reference a promo) are gone and the repricing happens below,
+            # so a raw DELETE skips nothing
+            Promo.objects.filter(promo_id__in=chunk)._raw_delete(Promo.objects.db)
+
+        logger.info(f"Bulk deleted {len(promo_ids)} promos affecting {len(product_ids)} products")
+        reprice_products(product_ids, batch_size=batch_size)
+
+    return len(promo_ids)
+
+def delete_expired_promos(seller=None, batch_size=500):
+    """
+    Removes promos whose end date has passed, optionally limited to one seller.
+    Returns the number of promos deleted.
+    """
+    from ..models import Promo
+
+    promos_qs = Promo.objects.filter(promo_end_date__lt=timezone.now())
+    if seller is not None:
+        promos_qs = promos_qs.filter(seller_id=seller)
+    return bulk_delete_promos(promos_qs, batch_size=batch_size)
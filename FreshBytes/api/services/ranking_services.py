@@ -0,0 +1,205 @@
+import heapq
+import logging
+import threading
+import time
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+# Per-process copy of the persisted lists, refreshed every RANKING_CACHE_SECONDS
+_ranking_cache = {}
+_ranking_cache_lock = threading.Lock()
+
+def _capacity():
+    return getattr(settings, 'RANKING_CAPACITY', 50)
+
+def product_scope(category_id=None, sub_category_id=None, seller_id=None):
+    if sub_category_id:
+        return f'products:subcategory:{sub_category_id}'
+    if category_id:
+        return f'products:category:{category_id}'
+    if seller_id:
+        return f'products:seller:{seller_id}'
+    return 'products'
+
+SELLER_SCOPE = 'sellers'
+
+class TopK:
+    """
+    The best capacity scores of a scope as {id: score}, plus a floor that no
+    id outside the list can beat. New scores above the floor are admitted and
+    the lowest entries evicted through a heap, raising the floor; an entry
+    whose score drops below the floor leaves, since outsiders may now outrank
+    it. While complete() holds, top(k) is exact without looking at the table.
+    """
+
+    def __init__(self, capacity, scores=None, floor=0):
+        self.capacity = capacity
+        self.scores = dict(scores or {})
+        self.floor = floor
+
+    def offer(self, key, score):
+        if score <= 0 or (key in self.scores and score < self.floor):
+            self.scores.pop(key, None)
+        elif key in self.scores or score > self.floor:
+            self.scores[key] = score
+            overflow = len(self.scores) - self.capacity
+            if overflow > 0:
+                for evicted, evicted_score in heapq.nsmallest(overflow, self.scores.items(), key=lambda entry: entry[1]):
+                    del self.scores[evicted]
+                    self.floor = max(self.floor, evicted_score)
+
+    def complete(self, k):
+        return self.floor == 0 or len(self.scores) >= k
+
+    def top(self, k):
+        return [key for key, _ in heapq.nlargest(k, sorted(self.scores.items()), key=lambda entry: entry[1])]
+
+def _scope_candidates(scope):
+    """(id, score) rows of a scope, best first, straight from the counters"""
+    from ..models import Product, Seller
+
+    if scope == SELLER_SCOPE:
+        return (
+            Seller.objects.filter(is_active=True, is_deleted=False, total_earnings__gt=0)
+            .order_by('-total_earnings', 'pk').values_list('pk', 'total_earnings')
+        )
+    products = Product.objects.filter(is_active=True, sell_count__gt=0)
+    parts = scope.split(':')
+    if len(parts) == 3:
+        lookup = {
+            'category': 'sub_category_id__category_id',
+            'subcategory': 'sub_category_id',
+            'seller': 'seller_id',
+        }[parts[1]]
+        products = products.filter(**{lookup: parts[2]})
+    return products.order_by('-sell_count', 'pk').values_list('pk', 'sell_count')
+
+def _build(scope):
+    capacity = _capacity()
+    rows = list(_scope_candidates(scope)[:capacity])
+    scores = {str(pk): float(score) for pk, score in rows}
+    floor = min(scores.values()) if len(rows) == capacity else 0
+    return TopK(capacity, scores, floor)
+
+def rebuild_ranking(scope):
+    """Recomputes one scope from the counters; also a job task for scopes that ran short"""
+    from ..models import Ranking
+
+    with transaction.atomic():
+        # Wait for in-flight updates of this scope so the counters read below include them
+        Ranking.objects.select_for_update().filter(scope=scope).first()
+        topk = _build(scope)
+        Ranking.objects.update_or_create(scope=scope, defaults={'entries': topk.scores, 'floor': topk.floor})
+    return topk
+
+def rebuild_all_rankings():
+    """Rebuilds every scope: platform, each category, subcategory and seller, and the seller ranking"""
+    from ..models import Category, SubCategory, Seller
+
+    scopes = [product_scope(), SELLER_SCOPE]
+    scopes += [product_scope(category_id=pk) for pk in Category.objects.values_list('pk', flat=True)]
+    scopes += [product_scope(sub_category_id=pk) for pk in SubCategory.objects.values_list('pk', flat=True)]
+    scopes += [product_scope(seller_id=pk) for pk in Seller.objects.filter(is_deleted=False).values_list('pk', flat=True)]
+    for scope in scopes:
+        rebuild_ranking(scope)
+    return len(scopes)
+
+def update_rankings(product_pks=(), seller_pks=()):
+    """
+    Feeds the current sell_count of the given products and total_earnings of
+    the given sellers into every scope they belong to. Runs inside the
+    transaction that changed the counters (see seller_services), locking the
+    affected Ranking rows in a fixed order; scores are absolute, so
+    replaying an update is harmless. Scopes left with fewer than
+    RANKING_TOP_K known entries get a background rebuild.
+    """
+    from ..models import Product, Seller, Ranking
+    from .job_services import enqueue
+
+    offers = {}
+    for pk, sell_count, seller_pk, sub_category_pk, category_pk, active, deleted in (
+        Product.all_objects.filter(pk__in=list(product_pks)).values_list(
+            'pk', 'sell_count', 'seller_id', 'sub_category_id', 'sub_category_id__category_id', 'is_active', 'is_deleted'
+        )
+    ):
+        # Hidden products drop out of every list they were in
+        score = float(sell_count) if active and not deleted else 0
+        scopes = [product_scope()]
+        if category_pk:
+            scopes.append(product_scope(category_id=category_pk))
+        if sub_category_pk:
+            scopes.append(product_scope(sub_category_id=sub_category_pk))
+        if seller_pk:
+            scopes.append(product_scope(seller_id=seller_pk))
+        for scope in scopes:
+            offers.setdefault(scope, {})[str(pk)] = score
+    for pk, earnings, active, deleted in (
+        Seller.objects.filter(pk__in=list(seller_pks)).values_list('pk', 'total_earnings', 'is_active', 'is_deleted')
+    ):
+        offers.setdefault(SELLER_SCOPE, {})[str(pk)] = float(earnings or 0) if active and not deleted else 0
+    if not offers:
+        return
+
+    top_k = getattr(settings, 'RANKING_TOP_K', 20)
+    with transaction.atomic():
+        rankings = list(Ranking.objects.select_for_update().filter(scope__in=list(offers)).order_by('scope'))
+        # A scope's first sale builds its list from the counters, which already include this change
+        missing = set(offers) - {ranking.scope for ranking in rankings}
+        if missing:
+            Ranking.objects.bulk_create(
+                [Ranking(scope=scope, entries=(topk := _build(scope)).scores, floor=topk.floor) for scope in sorted(missing)],
+                ignore_conflicts=True
+            )
+        for ranking in rankings:
+            topk = TopK(_capacity(), ranking.entries, ranking.floor)
+            for key, score in offers[ranking.scope].items():
+                topk.offer(key, score)
+            ranking.entries, ranking.floor, ranking.updated_at = topk.scores, topk.floor, timezone.now()
+            if not topk.complete(top_k):
+                enqueue(rebuild_ranking, dedupe_key=f'ranking:{ranking.scope}', scope=ranking.scope)
+        Ranking.objects.bulk_update(rankings, ['entries', 'floor', 'updated_at'])
+
+def top_ids(scope, k):
+    """
+    The best k ids of a scope, from this process's cache of the persisted
+    list. Reads never sort the counters: a scope without a list yet (no sale
+    since the last rebuild_rankings) reads as empty while a background job
+    builds it. Callers pass only scopes that exist.
+    """
+    from ..models import Ranking
+    from .job_services import enqueue
+
+    now = time.monotonic()
+    with _ranking_cache_lock:
+        cached = _ranking_cache.get(scope)
+    if cached and now - cached[0] < getattr(settings, 'RANKING_CACHE_SECONDS', 60):
+        return cached[1].top(k)
+
+    ranking = Ranking.objects.filter(scope=scope).first()
+    if ranking is None:
+        enqueue(rebuild_ranking, dedupe_key=f'ranking:{scope}', scope=scope)
+        return []
+    topk = TopK(_capacity(), ranking.entries, ranking.floor)
+    with _ranking_cache_lock:
+        _ranking_cache[scope] = (now, topk)
+    return topk.top(k)
+
+def top_products(k, **scope):
+    """The k best-selling live products of a scope, best first, looked up by primary key"""
+    from ..models import Product
+
+    ids = top_ids(product_scope(**scope), _capacity())
+    products = Product.objects.filter(pk__in=ids, is_active=True).select_related('seller_id__user_id', 'sub_category_id')
+    by_pk = {product.pk: product for product in products}
+    return [by_pk[pk] for pk in ids if pk in by_pk][:k]
+
+def top_sellers(k):
+    """The k highest-earning live sellers, best first, looked up by primary key"""
+    from ..models import Seller
+
+    ids = top_ids(SELLER_SCOPE, _capacity())
+    by_pk = {str(seller.pk): seller for seller in Seller.objects.filter(pk__in=ids, is_active=True, is_deleted=False)}
+    return [by_pk[pk] for pk in ids if pk in by_pk][:k]
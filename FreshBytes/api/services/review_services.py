@@ -1,30 +1,187 @@
+from decimal import Decimal
+from django.conf import settings
 from django.utils import timezone
+from django.db import transaction
+from django.db.models import F, Q, Count, Sum, Value, Window, DecimalField, FloatField, ExpressionWrapper
+from django.db.models.functions import Cast, Coalesce, NullIf, PercentRank, Round
 
-def generate_review_id(last_review):
-    """Generate unique review ID"""
+RATING_VALUES = (1, 2, 3, 4, 5)
+
+# Products whose rating_dirty flag is cleared per UPDATE (one OR'd condition each)
+RATING_CLEAR_CHUNK = 200
+
+def generate_review_id(number):
+    """Generate unique review ID from a sequence value"""
     current_year = timezone.now().year % 100
-    if last_review:
-        last_id = int(last_review.review_id[3:6])
-        return f"rid{last_id + 1:03d}{current_year:02d}"
-    return f"rid001{current_year:02d}"
-
-def update_product_review_stats(product):
-    """Update product's review count and rating"""
-    reviews = product.reviews_set.all()
-    product.review_count = reviews.count()
-    product.save(update_fields=['review_count'])
-
-def update_seller_review_stats(seller):
-    """Update seller's review statistics"""
-    reviews = []
-    for product in seller.product_set.all():
-        reviews.extend(product.reviews_set.all())
-    
-    seller.total_reviews = len(reviews)
-    if reviews:
-        avg_rating = sum(review.review_rating for review in reviews) / len(reviews)
-        seller.average_rating = round(avg_rating, 2)
-    else:
-        seller.average_rating = 0
-    
-    seller.save(update_fields=['total_reviews', 'average_rating']) 
\ No newline at end of file
+    return f"rid{number:07d}{current_year:02d}"
+
+def _review_delta_updates(count_field, removed_rating=None, added_rating=None):
+    """
+    Builds F() expressions that move one review out of / into the running
+    aggregates (count, rating sum and rating histogram).
+    """
+    count_delta = (added_rating is not None) - (removed_rating is not None)
+    sum_delta = (added_rating or 0) - (removed_rating or 0)
+    updates = {
+        count_field: F(count_field) + count_delta,
+        'review_rating_sum': F('review_rating_sum') + sum_delta,
+    }
+    histogram = {}
+    for rating, step in ((removed_rating, -1), (added_rating, 1)):
+        if rating in RATING_VALUES:
+            histogram[rating] = histogram.get(rating, 0) + step
+    for rating, step in histogram.items():
+        if step:
+            field = f'review_rating_{rating}'
+            updates[field] = F(field) + step
+    return updates, count_delta, sum_delta
+
+def apply_review_delta(product_pk, removed_rating=None, added_rating=None):
+    """
+    Applies one review change to the product's and its seller's review
+    aggregates with atomic F() updates. Pass removed_rating for a deleted
+    review, added_rating for a new one, or both for an edited rating.
+    """
+    from ..models import Product, Seller
+
+    if product_pk is None or (removed_rating is None and added_rating is None):
+        return
+
+    product_updates, _, _ = _review_delta_updates('review_count', removed_rating, added_rating)
+    # Queue the product for the next recompute_product_ratings run; moving
+    # updated_at tells a run that scored the row before this review to keep the flag
+    product_updates['rating_dirty'] = True
+    product_updates['updated_at'] = timezone.now()
+    seller_updates, count_delta, sum_delta = _review_delta_updates('total_reviews', removed_rating, added_rating)
+    # Both sides of the assignment read the pre-update row, so the new average is
+    # (old sum + delta) / (old count + delta), computed in the same statement.
+    seller_updates['average_rating'] = Coalesce(
+        Round(
+            ExpressionWrapper(
+                (F('review_rating_sum') + sum_delta) * Value(1.0) / NullIf(F('total_reviews') + count_delta, 0),
+                output_field=DecimalField(max_digits=3, decimal_places=2)
+            ),
+            2
+        ),
+        Value(0),
+        output_field=DecimalField(max_digits=3, decimal_places=2)
+    )
+
+    with transaction.atomic():
+        Product.all_objects.filter(pk=product_pk).update(**product_updates)
+        Seller.objects.filter(product__product_id=product_pk).update(**seller_updates)
+
+def _rating_aggregates():
+    aggregates = {
+        'count': Count('review_id'),
+        'rating_sum': Coalesce(Sum('review_rating'), 0),
+    }
+    for rating in RATING_VALUES:
+        aggregates[f'rating_{rating}'] = Count('review_id', filter=Q(review_rating=rating))
+    return aggregates
+
+def rebuild_review_stats(batch_size=500):
+    """
+    Recomputes every product's and seller's review aggregates from scratch
+    with two grouped queries and chunked bulk updates.
+    Returns (products_updated, sellers_updated).
+    """
+    from ..models import Product, Reviews, Seller
+
+    histogram_fields = [f'review_rating_{rating}' for rating in RATING_VALUES]
+    zeroed = {field: 0 for field in ['review_rating_sum', *histogram_fields]}
+
+    with transaction.atomic():
+        Product.all_objects.update(review_count=0, **zeroed)
+        Seller.objects.update(total_reviews=0, average_rating=0, **zeroed)
+
+        products = []
+        for row in Reviews.objects.filter(product_id__isnull=False).values('product_id').annotate(**_rating_aggregates()).order_by():
+            product = Product(product_id=row['product_id'], review_count=row['count'], review_rating_sum=row['rating_sum'])
+            for rating in RATING_VALUES:
+                setattr(product, f'review_rating_{rating}', row[f'rating_{rating}'])
+            products.append(product)
+        Product.all_objects.bulk_update(products, ['review_count', 'review_rating_sum', *histogram_fields], batch_size=batch_size)
+
+        sellers = []
+        for row in Reviews.objects.filter(product_id__seller_id__isnull=False).values('product_id__seller_id').annotate(**_rating_aggregates()).order_by():
+            seller = Seller(
+                seller_id=row['product_id__seller_id'],
+                total_reviews=row['count'],
+                review_rating_sum=row['rating_sum'],
+                average_rating=round(row['rating_sum'] / row['count'], 2) if row['count'] else 0,
+            )
+            for rating in RATING_VALUES:
+                setattr(seller, f'review_rating_{rating}', row[f'rating_{rating}'])
+            sellers.append(seller)
+        Seller.objects.bulk_update(sellers, ['total_reviews', 'average_rating', 'review_rating_sum', *histogram_fields], batch_size=batch_size)
+
+    return len(products), len(sellers)
+
+def recompute_product_ratings(full=False, batch_size=500):
+    """
+    Recomputes each product's Bayesian average rating (rating_score) and its
+    percentile rank within its subcategory, and sets top_rated for products in
+    the top RATING_TOP_PERCENTILE with at least RATING_MIN_REVIEWS reviews.
+
+    Incremental runs only rescore subcategories containing products flagged
+    rating_dirty by apply_review_delta; pass full=True to rescore everything
+    (e.g. nightly, so scores follow drift in the global mean).
+    Returns the number of products whose score or flag changed.
+    """
+    from ..models import Product
+
+    prior_weight = getattr(settings, 'RATING_PRIOR_WEIGHT', 5)
+    top_percentile = getattr(settings, 'RATING_TOP_PERCENTILE', 0.9)
+    min_reviews = getattr(settings, 'RATING_MIN_REVIEWS', 3)
+
+    totals = Product.objects.aggregate(count=Sum('review_count'), rating_sum=Sum('review_rating_sum'))
+    global_mean = (totals['rating_sum'] or 0) / totals['count'] if totals['count'] else 0
+
+    scope = Product.objects.all()
+    partition_filter = Q()
+    if not full:
+        dirty = Product.all_objects.filter(rating_dirty=True)
+        sub_category_ids = set(dirty.values_list('sub_category_id', flat=True).distinct())
+        if not sub_category_ids:
+            return 0
+        partition_filter = Q(sub_category_id__in=[pk for pk in sub_category_ids if pk is not None])
+        if None in sub_category_ids:
+            partition_filter |= Q(sub_category_id__isnull=True)
+        scope = scope.filter(partition_filter)
+
+    score = ExpressionWrapper(
+        (Value(global_mean * prior_weight) + Cast('review_rating_sum', FloatField()))
+        / (Value(float(prior_weight)) + Cast('review_count', FloatField())),
+        output_field=FloatField()
+    )
+    rows = scope.annotate(
+        score=score,
+        percentile=Window(PercentRank(), partition_by=F('sub_category_id'), order_by=score.asc()),
+    ).values_list('product_id', 'score', 'percentile', 'review_count', 'rating_score', 'top_rated', 'rating_dirty', 'updated_at')
+
+    # Score every partition before writing so no UPDATE runs under the open read cursor
+    changed = []
+    scored_dirty = []
+    for product_id, new_score, percentile, review_count, old_score, old_top_rated, dirty, updated_at in rows.iterator(chunk_size=2000):
+        new_score = Decimal(str(round(new_score, 3)))
+        new_top_rated = percentile >= top_percentile and review_count >= min_reviews
+        if new_score != old_score or new_top_rated != old_top_rated:
+            changed.append(Product(product_id=product_id, rating_score=new_score, top_rated=new_top_rated))
+        if dirty:
+            scored_dirty.append((product_id, updated_at))
+
+    # Scores and flags commit together, so a crash leaves the products queued.
+    # A flag is only cleared on rows still as they were scored: apply_review_delta
+    # moves updated_at, so a review that was not in the read keeps its product queued.
+    with transaction.atomic():
+        Product.all_objects.bulk_update(changed, ['rating_score', 'top_rated'], batch_size=batch_size)
+        for start in range(0, len(scored_dirty), RATING_CLEAR_CHUNK):
+            as_scored = Q()
+            for product_id, updated_at in scored_dirty[start:start + RATING_CLEAR_CHUNK]:
+                as_scored |= Q(product_id=product_id, updated_at=updated_at)
+            Product.all_objects.filter(as_scored, rating_dirty=True).update(rating_dirty=False)
+        # Deleted products are not ranked; their flags only need dropping
+        Product.all_objects.filter(partition_filter, rating_dirty=True, is_deleted=True).update(rating_dirty=False)
+
+    return len(changed)
@@ -0,0 +1,162 @@
+import logging
+from datetime import timedelta
+from decimal import Decimal
+from django.db import transaction
+from django.db.models import Case, Count, F, Q, Sum, Value, When
+from django.db.models.functions import Coalesce, TruncDate
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+# Counters kept per seller and day in SellerDailySales
+ROLLUP_FIELDS = (
+    'orders', 'units', 'gross', 'discounts',
+    'cancellations', 'cancelled_amount', 'refunds', 'refunded_amount',
+)
+
+# Windows served by the store dashboard
+DASHBOARD_WINDOWS = (7, 30, 90)
+
+def _order_day(order):
+    # Every counter is keyed by the local day the order was placed, so a late
+    # cancellation lands on the same row as the sale and a backfill reproduces
+    # exactly what the incremental updates wrote
+    return timezone.localdate(order.order_date)
+
+def _apply_daily_deltas(day, deltas):
+    """
+    Adds deltas ({seller_pk: {field: amount}}) to the sellers' rows for day in
+    two queries whatever the number of sellers: an INSERT of any missing rows,
+    then one UPDATE with a CASE per counter.
+    """
+    from ..models import SellerDailySales
+
+    deltas = {seller_pk: delta for seller_pk, delta in deltas.items() if any(delta.values())}
+    if not deltas:
+        return
+    SellerDailySales.objects.bulk_create(
+        [SellerDailySales(seller_id=seller_pk, day=day) for seller_pk in deltas],
+        ignore_conflicts=True
+    )
+    fields = {field for delta in deltas.values() for field, amount in delta.items() if amount}
+    SellerDailySales.objects.filter(day=day, seller_id__in=deltas).update(**{
+        field: Case(
+            *[When(seller_id=seller_pk, then=F(field) + Value(delta[field], output_field=SellerDailySales._meta.get_field(field)))
+              for seller_pk, delta in deltas.items() if delta.get(field)],
+            default=F(field)
+        )
+        for field in fields
+    })
+
+def record_order_sales(order, shares):
+    """Adds a newly placed order's per-seller shares (from record_seller_orders) to the rollups"""
+    _apply_daily_deltas(_order_day(order), {
+        seller_pk: {
+            'orders': 1,
+            'units': share['units'],
+            'gross': share['total'] + share['discount'],
+            'discounts': share['discount'],
+        }
+        for seller_pk, share in shares.items()
+    })
+
+def record_order_reversal(order, new_status):
+    """Counts an order that was just cancelled or refunded against each seller's share of it"""
+    from ..models import SellerOrder
+
+    count_field, amount_field = (
+        ('cancellations', 'cancelled_amount') if new_status == 'CANCELLED' else ('refunds', 'refunded_amount')
+    )
+    _apply_daily_deltas(_order_day(order), {
+        seller_pk: {count_field: 1, amount_field: total}
+        for seller_pk, total in SellerOrder.objects.filter(order_id=order.pk).values_list('seller_id', 'total')
+    })
+
+def rebuild_daily_sales(seller=None, batch_size=1000):
+    """
+    Recomputes SellerDailySales from SellerOrders (which cover hot and
+    archived orders) in one grouped query, replacing the existing rows for
+    seller (or for everyone). Meant for the initial backfill and for repairs;
+    day-to-day the rollups are maintained incrementally. Returns the number
+    of rows written.
+    """
+    from ..models import SellerOrder, SellerDailySales
+
+    zero = Value(Decimal('0'))
+    cancelled = Q(order_status='CANCELLED')
+    refunded = Q(order_status='REFUNDED')
+    shares = SellerOrder.objects.all()
+    if seller is not None:
+        shares = shares.filter(seller=seller)
+    rows = (
+        shares.annotate(day=TruncDate('order_date'))
+        .values('seller_id', 'day')
+        .annotate(
+            orders=Count('id'),
+            units=Sum('units'),
+            gross=Sum(F('total') + F('discount')),
+            discounts=Sum('discount'),
+            cancellations=Count('id', filter=cancelled),
+            cancelled_amount=Coalesce(Sum('total', filter=cancelled), zero),
+            refunds=Count('id', filter=refunded),
+            refunded_amount=Coalesce(Sum('total', filter=refunded), zero),
+        )
+        .order_by()
+    )
+
+    with transaction.atomic():
+        existing = SellerDailySales.objects.all()
+        if seller is not None:
+            existing = existing.filter(seller=seller)
+        existing.delete()
+        written = 0
+        batch = []
+        for row in rows.iterator(chunk_size=batch_size):
+            batch.append(SellerDailySales(**row))
+            if len(batch) >= batch_size:
+                SellerDailySales.objects.bulk_create(batch)
+                written += len(batch)
+                batch = []
+        if batch:
+            SellerDailySales.objects.bulk_create(batch)
+            written += len(batch)
+
+    logger.info(f"Rebuilt {written} daily sales rows")
+    return written
+
+def _summarise(rows):
+    totals = {field: sum(row[field] for row in rows) for field in ROLLUP_FIELDS}
+    totals['net'] = totals['gross'] - totals['discounts'] - totals['cancelled_amount'] - totals['refunded_amount']
+    return totals
+
+def seller_dashboard(seller, days=30):
+    """
+    Sales series for the last days (one zero-filled entry per local day,
+    oldest first) plus totals for every DASHBOARD_WINDOWS window. Reads at
+    most max(DASHBOARD_WINDOWS) rollup rows in one query, however much order
+    history the seller has.
+    """
+    from ..models import SellerDailySales
+
+    today = timezone.localdate()
+    span = max(max(DASHBOARD_WINDOWS), days)
+    start = today - timedelta(days=span - 1)
+    stored = {
+        row['day']: row
+        for row in SellerDailySales.objects.filter(seller=seller, day__gte=start, day__lte=today).values('day', *ROLLUP_FIELDS)
+    }
+
+    series = []
+    for offset in range(span):
+        day = start + timedelta(days=offset)
+        row = stored.get(day) or {'day': day, **{field: 0 for field in ROLLUP_FIELDS}}
+        row['net'] = row['gross'] - row['discounts'] - row['cancelled_amount'] - row['refunded_amount']
+        series.append(row)
+
+    return {
+        'from': series[-days]['day'],
+        'to': today,
+        'days': days,
+        'totals': {str(window): _summarise(series[-window:]) for window in DASHBOARD_WINDOWS},
+        'series': series[-days:],
+    }
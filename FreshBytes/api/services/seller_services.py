@@ -37,61 +37,125 @@ def initialize_seller_stats(seller):
     seller.total_likes = seller.total_likes or 0
     seller.total_products_sold = seller.total_products_sold or 0
 
+# Seller counter fed by each SellerReaction kind
+REACTION_COUNTERS = {'LIKE': 'total_likes', 'FOLLOW': 'total_followers'}
+
+def set_seller_reaction(user, seller, kind, active):
+    """
+    Adds (active=True) or removes a user's like or follow of a seller. Returns
+    whether anything changed; only changes move the seller's counter, which
+    is written in batches by counter_services.
+    """
+    from ..models import Seller, SellerReaction
+    from .counter_services import increment
+
+    if active:
+        changed = SellerReaction.objects.get_or_create(seller=seller, user=user, kind=kind)[1]
+    else:
+        changed = SellerReaction.objects.filter(seller=seller, user=user, kind=kind).delete()[0] > 0
+    if changed:
+        increment(Seller, seller.pk, REACTION_COUNTERS[kind], 1 if active else -1)
+    return changed
+
 def update_seller_total_orders(seller):
     """
-    Recalculates and updates the total_orders count for a given seller.
+    Recounts total_orders for a given seller from its delivered SellerOrder
+    rows, the same orders the DELIVERED deltas of sync_order_sales add up.
+    A repair tool for a drifted counter.
     """
-    from ..models import OrderItem
-    order_ids = OrderItem.objects.filter(
-        product_id__seller_id=seller
-    ).values_list('order_id', flat=True).distinct()
-    seller.total_orders = len(order_ids)
+    from ..models import SellerOrder
+    seller.total_orders = SellerOrder.objects.filter(seller=seller, order_status='DELIVERED').count()
     seller.save(update_fields=['total_orders'])
 
+def _order_sales(order):
+    """
+    This order's sales in one grouped query: returns
+    ({seller_pk: (earnings, units)}, {product_pk: units}).
+    """
+    from django.db.models import Sum
+    from ..models import OrderItem
+
+    sellers, products = {}, {}
+    rows = OrderItem.objects.filter(order_id=order).exclude(product_id=None).values_list(
+        'product_id', 'product_id__seller_id'
+    ).annotate(earnings=Sum('total_item_price'), units=Sum('quantity'))
+    for product_pk, seller_pk, earnings, units in rows:
+        products[product_pk] = products.get(product_pk, 0) + units
+        if seller_pk:
+            total_earnings, total_units = sellers.get(seller_pk, (0, 0))
+            sellers[seller_pk] = (total_earnings + earnings, total_units + units)
+    return sellers, products
+
+def _apply_order_sales(order, sign):
+    """Adds (sign=1) or subtracts (sign=-1) this order's sales from the seller and product counters and their rankings"""
+    from django.db.models import Case, DecimalField, When, Value
+    from django.db.models.functions import Coalesce
+    from ..models import Product, Seller
+    from .ranking_services import update_rankings
+
+    sellers, products = _order_sales(order)
+    if sellers:
+        Seller.objects.filter(pk__in=list(sellers)).update(
+            total_earnings=Case(
+                *[When(pk=seller_pk, then=Coalesce(F('total_earnings'), Value(0), output_field=DecimalField()) + sign * earnings)
+                  for seller_pk, (earnings, _) in sellers.items()],
+                default=F('total_earnings')
+            ),
+            total_orders=F('total_orders') + sign,
+            total_products_sold=Case(
+                *[When(pk=seller_pk, then=F('total_products_sold') + sign * units)
+                  for seller_pk, (_, units) in sellers.items()],
+                default=F('total_products_sold')
+            ),
+        )
+    if products:
+        by_units = {}
+        for product_pk, units in products.items():
+            by_units.setdefault(units, []).append(product_pk)
+        Product.all_objects.filter(pk__in=list(products)).update(
+            sell_count=Case(
+                *[When(pk__in=product_pks, then=F('sell_count') + sign * units) for units, product_pks in by_units.items()],
+                default=F('sell_count')
+            )
+        )
+    update_rankings(product_pks=products, seller_pks=sellers)
 
 def update_seller_stats_on_order_delivered(order):
     """
-    Update seller statistics when an order is marked as delivered.
-    This recalculates total_earnings, total_orders, and total_products_sold
-    for all sellers involved in the delivered order.
+    Adds a delivered order's items to total_earnings, total_orders and
+    total_products_sold of every seller involved and to each product's
+    sell_count. Order.stats_applied is flipped in the same statement that
+    claims the order, so applying an order twice is a no-op.
     """
-    print("Updating seller stats for order:", order.order_id, flush=True)
-    from ..models import OrderItem, Seller
-    
-    # Get all unique sellers involved in this order
-    seller_ids = OrderItem.objects.filter(
-        order_id=order
-    ).values_list('product_id__seller_id', flat=True).distinct()
-    
-    for seller_id in seller_ids:
-        if seller_id:  # Make sure seller_id is not None
-            seller = Seller.objects.get(pk=seller_id)
-            
-            # Get all delivered order items for this seller
-            delivered_items = OrderItem.objects.filter(
-                product_id__seller_id=seller,
-                order_id__order_status='DELIVERED'
-            )
-            
-            # Calculate new stats
-            total_earnings = sum(item.total_item_price for item in delivered_items)
-            total_orders = delivered_items.values('order_id').distinct().count()
-            total_products_sold = sum(item.quantity for item in delivered_items)
-            
-            # Update seller stats
-            seller.total_earnings = total_earnings
-            seller.total_orders = total_orders
-            seller.total_products_sold = total_products_sold
-            seller.save(update_fields=['total_earnings', 'total_orders', 'total_products_sold'])
-
-            # Update product sell_count
-            from django.db import models
-            for item in delivered_items:
-                product = item.product_id
-                # Calculate total sold for this product across all delivered orders
-                total_sold = OrderItem.objects.filter(
-                    product_id=product,
-                    order_id__order_status='DELIVERED'
-                ).aggregate(total=models.Sum('quantity'))['total'] or 0
-                product.sell_count = total_sold
-                product.save(update_fields=['sell_count'])
\ No newline at end of file
+    from ..models import Order
+
+    if Order.objects.filter(pk=order.pk, order_status='DELIVERED', stats_applied=False).update(stats_applied=True):
+        order.stats_applied = True
+        _apply_order_sales(order, 1)
+
+def reverse_seller_stats_on_order(order):
+    """
+    Takes a refunded or cancelled order's items back out of the seller and
+    product counters, if they were ever added. Safe to call more than once.
+    """
+    from ..models import Order
+
+    if Order.objects.filter(pk=order.pk, stats_applied=True).exclude(order_status='DELIVERED').update(stats_applied=False):
+        order.stats_applied = False
+        _apply_order_sales(order, -1)
+
+def sync_order_sales(order_pk):
+    """
+    Background job: brings the sales counters in line with the order's
+    current status. Runs after every move to or from DELIVERED, so it is
+    order-independent: whichever status change ran last wins.
+    """
+    from ..models import Order
+
+    order = Order.objects.filter(pk=order_pk).first()
+    if order is None:
+        return
+    if order.order_status == 'DELIVERED':
+        update_seller_stats_on_order_delivered(order)
+    else:
+        reverse_seller_stats_on_order(order)
@@ -0,0 +1,131 @@
+import threading
+from django.conf import settings
+from django.core.signals import request_finished, request_started
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.dispatch import receiver
+
+# Per-process blocks of reserved values: name -> [next_value, last_value]
+_blocks = {}
+_blocks_lock = threading.Lock()
+# Per-thread autocommit connections used to reserve blocks from inside a transaction
+_side_connections = threading.local()
+
+def _sequence_table(connection):
+    from ..models import Sequence
+    return connection.ops.quote_name(Sequence._meta.db_table)
+
+def _increment(connection, name, size):
+    """
+    Atomically adds size to the named counter (creating it on first use) and
+    returns the new value. Values (new - size, new] now belong to the caller.
+    """
+    table = _sequence_table(connection)
+    with connection.cursor() as cursor:
+        for _ in range(2):
+            if connection.vendor == 'mysql':
+                cursor.execute(
+                    f"UPDATE {table} SET value = LAST_INSERT_ID(value + %s) WHERE name = %s",
+                    [size, name]
+                )
+                if cursor.rowcount:
+                    cursor.execute("SELECT LAST_INSERT_ID()")
+                    return cursor.fetchone()[0]
+                cursor.execute(f"INSERT IGNORE INTO {table} (name, value) VALUES (%s, 0)", [name])
+            else:
+                cursor.execute(
+                    f"UPDATE {table} SET value = value + %s WHERE name = %s RETURNING value",
+                    [size, name]
+                )
+                row = cursor.fetchone()
+                if row:
+                    return row[0]
+                cursor.execute(
+                    f"INSERT INTO {table} (name, value) VALUES (%s, 0) ON CONFLICT (name) DO NOTHING",
+                    [name]
+                )
+    raise RuntimeError(f"Unable to allocate from sequence '{name}'")
+
+def _side_connection():
+    """
+    Returns this thread's private autocommit connection. Blocks reserved on it
+    commit immediately, so the counter row is never held locked for the length
+    of the caller's transaction and a rollback can't hand out the same values twice.
+    """
+    connection = getattr(_side_connections, 'connection', None)
+    if connection is None:
+        connection = connections.create_connection(DEFAULT_DB_ALIAS)
+        _side_connections.connection = connection
+    connection.close_if_unusable_or_obsolete()
+    return connection
+
+def close_side_connection(force=False):
+    """
+    Closes this thread's side connection if it is unusable or older than
+    CONN_MAX_AGE (always with force), the way close_old_connections treats
+    the regular ones, and forgets it once closed.
+    """
+    connection = getattr(_side_connections, 'connection', None)
+    if connection is None:
+        return
+    if force:
+        connection.close()
+    else:
+        connection.close_if_unusable_or_obsolete()
+    if connection.connection is None:
+        del _side_connections.connection
+
+def _reserve(name, needed, block_size):
+    """
+    Reserves at least needed values and returns (first, last).
+    SQLite allows a single writer, so inside a transaction the increment has to
+    share the caller's connection; those values roll back with it, so exactly
+    needed values are taken and nothing is left over to cache.
+    """
+    connection = connections[DEFAULT_DB_ALIAS]
+    size = max(needed, block_size)
+    if connection.in_atomic_block:
+        if connection.vendor == 'sqlite':
+            size = needed
+        else:
+            connection = _side_connection()
+    last = _increment(connection, name, size)
+    return last - size + 1, last
+
+def next_values(name, count=1):
+    """
+    Allocates count values from the named sequence.
+
+    Values are unique but only increasing within a process: each process
+    reserves SEQUENCE_BLOCK_SIZE values at a time and hands them out from
+    memory, so concurrent writers never contend on a "last row" read or on
+    the counter itself.
+    """
+    if count <= 0:
+        return []
+    block_size = max(getattr(settings, 'SEQUENCE_BLOCK_SIZE', 20), 1)
+    values = []
+    with _blocks_lock:
+        block = _blocks.get(name)
+        if block:
+            take = min(count, block[1] - block[0] + 1)
+            values.extend(range(block[0], block[0] + take))
+            block[0] += take
+            if block[0] > block[1]:
+                del _blocks[name]
+
+        remaining = count - len(values)
+        if remaining:
+            first, last = _reserve(name, remaining, block_size)
+            values.extend(range(first, first + remaining))
+            if first + remaining <= last:
+                _blocks[name] = [first + remaining, last]
+    return values
+
+def next_value(name):
+    """Allocates a single value from the named sequence."""
+    return next_values(name, 1)[0]
+
+# Side connections follow the request lifecycle like Django's own connections
+@receiver([request_started, request_finished])
+def close_side_connection_on_request(**kwargs):
+    close_side_connection()
@@ -0,0 +1,216 @@
+import csv
+import logging
+import time
+from decimal import Decimal, InvalidOperation
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Case, F, Value, When
+from django.utils import timezone
+from .payment_services import PAYMENT_TRANSITIONS
+
+logger = logging.getLogger(__name__)
+
+# Settlement file column for each field read; override with SETTLEMENT_CSV_COLUMNS
+DEFAULT_COLUMNS = {
+    'transaction_id': 'transaction_id',
+    'status': 'status',
+    'amount': 'amount',
+    'tax': 'tax',
+    'net': 'net',
+}
+
+# Gateway status (upper-cased) to Payment.payment_status; override with SETTLEMENT_STATUS_MAP
+DEFAULT_STATUS_MAP = {
+    'SUCCESS': 'COMPLETED',
+    'SETTLED': 'COMPLETED',
+    'COMPLETED': 'COMPLETED',
+    'PAID': 'COMPLETED',
+    'FAILED': 'FAILED',
+    'DECLINED': 'FAILED',
+    'EXPIRED': 'FAILED',
+    'REFUNDED': 'REFUNDED',
+    'REVERSED': 'REFUNDED',
+}
+
+REPORT_FIELDS = ['line', 'transaction_id', 'reason', 'detail']
+
+# Fields a settlement line sets, in the order _parse returns them after the amount
+SETTLED_FIELDS = ('payment_status', 'tax', 'revenue')
+
+# Payments written per UPDATE statement
+UPDATE_CHUNK = 500
+
+def _amount(value):
+    return Decimal(value.replace(',', '').strip()).quantize(Decimal('0.01'))
+
+def _parse(row, columns, status_map):
+    """(transaction_id, payment_status, amount, tax, net) of a settlement row; raises ValueError naming the problem"""
+    transaction_id = (row.get(columns['transaction_id']) or '').strip()
+    if not transaction_id:
+        raise ValueError('missing transaction id')
+    status = (row.get(columns['status']) or '').strip().upper()
+    if status not in status_map:
+        raise ValueError(f'unknown status {status!r}')
+    values = []
+    for field in ('amount', 'tax', 'net'):
+        try:
+            values.append(_amount(row.get(columns[field]) or ''))
+        except InvalidOperation:
+            raise ValueError(f'bad {field} {row.get(columns[field])!r}')
+    return (transaction_id, status_map[status], *values)
+
+def _payments_by_transaction(transaction_ids):
+    """
+    {transaction_id: [(model, payment_id, payment_method, amount, (status, tax, revenue)), ...]}
+    from the hot table, then the archive for ids not found there
+    """
+    from ..models import Payment, ArchivedPayment
+
+    found = {}
+    for model in (Payment, ArchivedPayment):
+        missing = [transaction_id for transaction_id in transaction_ids if transaction_id not in found]
+        if not missing:
+            break
+        for transaction_id, payment_id, method, amount, *settled in model.objects.filter(
+            transaction_id__in=missing
+        ).values_list('transaction_id', 'payment_id', 'payment_method', 'amount', *SETTLED_FIELDS):
+            found.setdefault(transaction_id, []).append((model, payment_id, method, amount, tuple(settled)))
+    return found
+
+def _write_settled(model, rows, now):
+    """
+    Writes {payment_id: (status, tax, revenue)} with one UPDATE per
+    UPDATE_CHUNK payments, each field a CASE over its distinct values (a
+    file has far fewer distinct statuses and amounts than lines)
+    """
+    rows = list(rows.items())
+    for start in range(0, len(rows), UPDATE_CHUNK):
+        chunk = rows[start:start + UPDATE_CHUNK]
+        updates = {'updated_at': now}
+        for index, field in enumerate(SETTLED_FIELDS):
+            by_value = {}
+            for payment_id, values in chunk:
+                by_value.setdefault(values[index], []).append(payment_id)
+            output_field = model._meta.get_field(field)
+            updates[field] = Case(
+                *[When(pk__in=payment_ids, then=Value(value, output_field=output_field)) for value, payment_ids in by_value.items()],
+                default=F(field)
+            )
+        model.objects.filter(pk__in=[payment_id for payment_id, _ in chunk]).update(**updates)
+
+def _reconcile_batch(batch, provider, dry_run, stats, mismatch):
+    """
+    Matches one batch of rows, (line, parsed fields or the ValueError that
+    rejected them), with one lookup and writes the changes in one transaction
+    """
+    payments = _payments_by_transaction({fields[0] for _, fields in batch if not isinstance(fields, ValueError)})
+    now = timezone.now()
+    changed = {}
+    seen = set()
+    for line, fields in batch:
+        if isinstance(fields, ValueError):
+            transaction_id, error = fields.args
+            mismatch(line, transaction_id, 'malformed', error)
+            continue
+        transaction_id, status, amount, tax, net = fields
+        if transaction_id in seen:
+            mismatch(line, transaction_id, 'duplicate', 'transaction id repeated in the file')
+            continue
+        seen.add(transaction_id)
+        matches = payments.get(transaction_id)
+        if not matches:
+            mismatch(line, transaction_id, 'unknown_transaction', 'no payment has this transaction id')
+            continue
+        if len(matches) > 1:
+            mismatch(line, transaction_id, 'ambiguous_transaction', f'{len(matches)} payments share this transaction id')
+            continue
+        model, payment_id, method, expected, current = matches[0]
+        if provider and method != provider:
+            mismatch(line, transaction_id, 'method_mismatch', f'{payment_id} was paid with {method}')
+            continue
+        if amount != expected:
+            mismatch(line, transaction_id, 'amount_mismatch', f'{payment_id} is {expected}, settled {amount}')
+            continue
+        if status != current[0] and status not in PAYMENT_TRANSITIONS.get(current[0], []):
+            mismatch(line, transaction_id, 'status_conflict', f'{payment_id} is {current[0]}, settled {status}')
+            continue
+
+        stats['matched'] += 1
+        if current != (status, tax, net):
+            changed.setdefault(model, {})[payment_id] = (status, tax, net)
+
+    stats['updated'] += sum(len(rows) for rows in changed.values())
+    if changed and not dry_run:
+        with transaction.atomic():
+            for model, rows in changed.items():
+                _write_settled(model, rows, now)
+
+def reconcile_settlement(lines, provider=None, report=None, batch_size=None, dry_run=False, progress=None):
+    """
+    Reconciles a GCash/PayMaya settlement CSV (any iterable of text lines,
+    such as an open file) with the payments, streaming it in batches of
+    batch_size rows (SETTLEMENT_BATCH_SIZE by default). Each batch costs one
+    indexed transaction_id lookup (plus one in the archive for ids not found)
+    and one UPDATE of payment_status, tax and revenue per few hundred
+    payments that changed, so memory stays flat whatever the file size.
+
+    Rows that cannot be applied (malformed, unknown or shared transaction
+    id, another payment method than provider, a different amount, or a
+    status change the payment does not allow) are written to report, a
+    writable text file, as CSV. A transaction id repeated within a batch is
+    reported; across batches the later row simply wins, as re-applying a
+    settlement is harmless. With dry_run nothing is written to the database.
+    progress, if given, is called with the running stats after each batch.
+    Returns the stats.
+    """
+    columns = {**DEFAULT_COLUMNS, **getattr(settings, 'SETTLEMENT_CSV_COLUMNS', {})}
+    status_map = getattr(settings, 'SETTLEMENT_STATUS_MAP', DEFAULT_STATUS_MAP)
+    batch_size = batch_size or getattr(settings, 'SETTLEMENT_BATCH_SIZE', 2000)
+
+    reader = csv.DictReader(lines)
+    missing = [column for column in columns.values() if column not in (reader.fieldnames or [])]
+    if missing:
+        raise ValueError(f"Settlement file is missing columns: {', '.join(missing)}")
+
+    writer = None
+    if report is not None:
+        writer = csv.writer(report)
+        writer.writerow(REPORT_FIELDS)
+
+    stats = {'lines': 0, 'matched': 0, 'updated': 0, 'mismatched': 0, 'reasons': {}, 'seconds': 0.0, 'lines_per_second': 0.0}
+    started = time.monotonic()
+
+    def mismatch(line, transaction_id, reason, detail):
+        stats['mismatched'] += 1
+        stats['reasons'][reason] = stats['reasons'].get(reason, 0) + 1
+        if writer is not None:
+            writer.writerow([line, transaction_id, reason, detail])
+
+    def flush(batch):
+        if batch:
+            _reconcile_batch(batch, provider, dry_run, stats, mismatch)
+        stats['seconds'] = time.monotonic() - started
+        stats['lines_per_second'] = stats['lines'] / stats['seconds'] if stats['seconds'] else 0.0
+        if progress is not None:
+            progress(stats)
+
+    batch = []
+    for row in reader:
+        stats['lines'] += 1
+        # Line numbers in the file, counting the header
+        line = reader.line_num
+        try:
+            batch.append((line, _parse(row, columns, status_map)))
+        except ValueError as error:
+            # Reported with the batch so the report stays in file order
+            batch.append((line, ValueError((row.get(columns['transaction_id']) or '').strip(), str(error))))
+        if len(batch) >= batch_size:
+            flush(batch)
+            batch = []
+    flush(batch)
+
+    logger.info(
+        f"Reconciled {stats['lines']} settlement lines in {stats['seconds']:.1f}s: "
+        f"{stats['matched']} matched, {stats['updated']} updated, {stats['mismatched']} mismatched"
+    )
+    return stats
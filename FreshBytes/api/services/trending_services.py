@@ -0,0 +1,255 @@
+import hashlib
+import heapq
+import logging
+import os
+import socket
+import threading
+import time
+from datetime import timedelta
+import numpy as np
+from django.conf import settings
+from django.db import DatabaseError, transaction
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_EVENT_WEIGHTS = {'view': 1, 'cart': 3, 'order': 5}
+
+# Rescale the counters once the decay weight reaches 2**RESCALE_HALF_LIVES, long before floats overflow
+RESCALE_HALF_LIVES = 30
+
+class DecayedCountMinSketch:
+    """
+    Count-min sketch whose counts halve every half_life seconds, using forward
+    decay: an event at time t adds 2**((t - landmark) / half_life), and reads
+    divide by the same weight for now. Scaled counts therefore never change
+    once written, so sketches merge by adding cells. Memory is depth x width
+    floats whatever the number of keys; estimates only ever overcount.
+    """
+
+    def __init__(self, width, depth, half_life, landmark=None, cells=None):
+        self.width = width
+        self.depth = depth
+        self.half_life = half_life
+        self.landmark = time.time() if landmark is None else landmark
+        self.cells = np.zeros((depth, width)) if cells is None else cells
+        self._rows = np.arange(depth)
+
+    def _columns(self, key):
+        # Stable across processes (unlike hash()); double hashing gives one column per row
+        digest = hashlib.blake2b(key.encode(), digest_size=16).digest()
+        first, second = int.from_bytes(digest[:8], 'little'), int.from_bytes(digest[8:], 'little') | 1
+        return [(first + row * second) % self.width for row in range(self.depth)]
+
+    def _weight(self, now):
+        return 2.0 ** ((now - self.landmark) / self.half_life)
+
+    def rescale(self, now):
+        """Moves the landmark to now; returns the factor every scaled count was multiplied by"""
+        factor = 1.0 / self._weight(now)
+        self.cells *= factor
+        self.landmark = now
+        return factor
+
+    def add(self, key, amount, now):
+        """Counts amount for key at time now and returns the key's scaled estimate"""
+        columns = self._columns(key)
+        self.cells[self._rows, columns] += amount * self._weight(now)
+        return float(self.cells[self._rows, columns].min())
+
+    def scaled_estimate(self, key):
+        return float(self.cells[self._rows, self._columns(key)].min())
+
+    def estimate(self, key, now):
+        """Decayed count of key as of now"""
+        return self.scaled_estimate(key) / self._weight(now)
+
+    def merge(self, other):
+        self.cells += other.cells * 2.0 ** ((other.landmark - self.landmark) / self.half_life)
+
+    def to_bytes(self):
+        return self.cells.astype('<f8').tobytes()
+
+    @classmethod
+    def from_bytes(cls, data, width, depth, half_life, landmark):
+        """The sketch saved as data, or None when it was saved with another width or depth"""
+        data = bytes(data)
+        if len(data) != width * depth * 8:
+            return None
+        cells = np.frombuffer(data, dtype='<f8').reshape(depth, width).copy()
+        return cls(width, depth, half_life, landmark=landmark, cells=cells)
+
+class TrendingTracker:
+    """
+    A process's sketch plus its heavy hitters: the capacity keys with the
+    highest estimates, kept in a min-heap so a newcomer only has to beat the
+    weakest candidate. Heap entries go stale when a candidate's estimate
+    grows; stale entries are skipped when popped and the heap is rebuilt
+    before it outgrows a few times the capacity.
+    """
+
+    def __init__(self, width, depth, half_life, capacity):
+        self.sketch = DecayedCountMinSketch(width, depth, half_life)
+        self.capacity = capacity
+        self.candidates = {}
+        self._heap = []
+
+    def _rebuild_heap(self):
+        self._heap = [(estimate, key) for key, estimate in self.candidates.items()]
+        heapq.heapify(self._heap)
+
+    def add(self, key, amount, now):
+        if (now - self.sketch.landmark) / self.sketch.half_life > RESCALE_HALF_LIVES:
+            factor = self.sketch.rescale(now)
+            self.candidates = {candidate: estimate * factor for candidate, estimate in self.candidates.items()}
+            self._rebuild_heap()
+
+        estimate = self.sketch.add(key, amount, now)
+        if key not in self.candidates and len(self.candidates) >= self.capacity:
+            while self._heap and self.candidates.get(self._heap[0][1]) != self._heap[0][0]:
+                heapq.heappop(self._heap)
+            if estimate <= self._heap[0][0]:
+                return
+            _, weakest = heapq.heappop(self._heap)
+            del self.candidates[weakest]
+        self.candidates[key] = estimate
+        heapq.heappush(self._heap, (estimate, key))
+        if len(self._heap) > 4 * self.capacity:
+            self._rebuild_heap()
+
+def _sketch_settings():
+    return (
+        getattr(settings, 'TRENDING_SKETCH_WIDTH', 2048),
+        getattr(settings, 'TRENDING_SKETCH_DEPTH', 4),
+        getattr(settings, 'TRENDING_HALF_LIFE_SECONDS', 1800),
+    )
+
+# This process's shard; recreated after a fork so workers never share one
+_shard = {'pid': None, 'tracker': None, 'flushed_at': 0.0}
+_shard_lock = threading.Lock()
+
+# Per-process copy of the merged shards, refreshed every TRENDING_CACHE_SECONDS
+_merged_cache = {}
+_merged_cache_lock = threading.Lock()
+
+def _shard_name():
+    return f'{socket.gethostname()}:{os.getpid()}'[:100]
+
+def _tracker():
+    if _shard['pid'] != os.getpid():
+        width, depth, half_life = _sketch_settings()
+        _shard.update(
+            pid=os.getpid(),
+            tracker=TrendingTracker(width, depth, half_life, getattr(settings, 'TRENDING_CANDIDATES', 200)),
+            flushed_at=time.monotonic(),
+        )
+    return _shard['tracker']
+
+def _record(quantities, kind):
+    weights = getattr(settings, 'TRENDING_EVENT_WEIGHTS', DEFAULT_EVENT_WEIGHTS)
+    now = time.time()
+    with _shard_lock:
+        tracker = _tracker()
+        for product_pk, quantity in quantities.items():
+            tracker.add(str(product_pk), weights.get(kind, 1) * quantity, now)
+        due = time.monotonic() - _shard['flushed_at'] >= getattr(settings, 'TRENDING_FLUSH_SECONDS', 30)
+    if due:
+        flush_shard()
+
+def record_product_events(quantities, kind):
+    """
+    Feeds {product_pk: quantity} events of a kind ('view', 'cart' or 'order',
+    weighted by TRENDING_EVENT_WEIGHTS) into this process's sketch once the
+    current transaction commits. The shard is saved at most every
+    TRENDING_FLUSH_SECONDS, piggybacking on the request that finds it due.
+    """
+    if quantities and getattr(settings, 'TRENDING_ENABLED', True):
+        transaction.on_commit(lambda: _record(quantities, kind))
+
+def flush_shard():
+    """Saves this process's shard so merges see it; a failed save is retried on the next flush"""
+    from ..models import TrendingShard
+
+    with _shard_lock:
+        tracker = _tracker()
+        _shard['flushed_at'] = time.monotonic()
+        landmark, cells = tracker.sketch.landmark, tracker.sketch.to_bytes()
+        candidates = list(tracker.candidates)
+    try:
+        TrendingShard.objects.update_or_create(
+            shard=_shard_name(),
+            defaults={'landmark': landmark, 'cells': cells, 'candidates': candidates}
+        )
+    except DatabaseError as error:
+        logger.warning(f"Could not save trending shard {_shard_name()}: {error}")
+
+def _merged_sketch():
+    """
+    Merges every live shard into one sketch and returns (sketch, time of the
+    merge, {product_pk: decayed score} for the union of the shards'
+    heavy-hitter candidates). Shards idle for six half-lives (under 2% of
+    their weight left) are deleted; shards saved with another sketch width or
+    depth (before a settings change) are skipped until their process saves
+    again. The result is cached per process for TRENDING_CACHE_SECONDS.
+    """
+    from ..models import TrendingShard
+
+    now = time.monotonic()
+    with _merged_cache_lock:
+        cached = _merged_cache.get('merged')
+    if cached and now - cached[0] < getattr(settings, 'TRENDING_CACHE_SECONDS', 30):
+        return cached[1]
+
+    width, depth, half_life = _sketch_settings()
+    TrendingShard.objects.filter(updated_at__lt=timezone.now() - timedelta(seconds=6 * half_life)).delete()
+    at = time.time()
+    merged = DecayedCountMinSketch(width, depth, half_life, landmark=at)
+    candidates = set()
+    for shard in TrendingShard.objects.all():
+        sketch = DecayedCountMinSketch.from_bytes(shard.cells, width, depth, half_life, shard.landmark)
+        if sketch is None:
+            logger.warning(f"Skipping trending shard {shard.shard}: saved with another sketch width or depth")
+            continue
+        merged.merge(sketch)
+        candidates.update(shard.candidates)
+    result = (merged, at, {product_pk: merged.estimate(product_pk, at) for product_pk in candidates})
+
+    with _merged_cache_lock:
+        _merged_cache['merged'] = (now, result)
+    return result
+
+def merged_trending():
+    """{product_pk: decayed score} for the heavy-hitter candidates of every live shard"""
+    return _merged_sketch()[2]
+
+def trending_products(k, category_id=None, sub_category_id=None):
+    """
+    The k live products with the highest decayed activity, optionally within
+    a category or subcategory, as (product, score) pairs. Only the bounded
+    candidate set is looked up, by primary key. When the global candidates
+    hold fewer than k products of the requested category or subcategory,
+    every active product id in it is scored against the merged sketch
+    instead (one indexed id scan of the scope plus a hash per product).
+    """
+    from ..models import Product
+
+    sketch, at, scores = _merged_sketch()
+    products = Product.objects.filter(is_active=True)
+    if sub_category_id:
+        products = products.filter(sub_category_id=sub_category_id)
+    elif category_id:
+        products = products.filter(sub_category_id__category_id=category_id)
+
+    in_scope = products.filter(pk__in=list(scores))
+    if (sub_category_id or category_id) and in_scope.count() < k:
+        scope_scores = {}
+        for product_pk in products.values_list('pk', flat=True).iterator(chunk_size=2000):
+            score = scores[product_pk] if product_pk in scores else sketch.estimate(product_pk, at)
+            if score > 0:
+                scope_scores[product_pk] = score
+        scores = dict(heapq.nlargest(k, scope_scores.items(), key=lambda item: item[1]))
+        in_scope = products.filter(pk__in=list(scores))
+
+    in_scope = in_scope.select_related('seller_id__user_id', 'sub_category_id')
+    ranked = sorted(in_scope, key=lambda product: (-scores[product.pk], product.pk))
+    return [(product, scores[product.pk]) for product in ranked[:k]]
@@ -1,3 +1,936 @@
-from django.test import TestCase
+import csv
+import io
+import json
+import tempfile
+import time
+import uuid
+from datetime import timedelta
+from decimal import Decimal
+from unittest import mock
+from django.contrib.auth.models import Group
+from django.core import signing
+from django.db import OperationalError, transaction
+from django.db.models import F
+from django.db.models.signals import pre_delete
+from django.db import connection
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+from .models import ArchivedOrder, ArchivedOrderItem, ArchivedPayment, Category, CheckoutTicket, InventoryHold, InventoryMovement, Job, KpiSnapshot, Order, Payment, Product, Promo, PromoProduct, Ranking, Reviews, SellerDailySales, SellerOrder, Seller, StockShard, SubCategory, TrendingShard, User
+from .services.archive_services import archive_orders
+from .services.cart_services import add_to_cart
+from .services.counter_services import increment
+from .services.job_services import claim_jobs, run_job, run_pending_jobs, task_path
+from .services.inventory_services import current_stock, fold_movements, reconcile_inventory, release_expired_holds, reshard_product_stock
+from .services.pricing_services import simulate_promo_pricing
+from .services.settlement_services import reconcile_settlement
+from .services.seller_services import sync_order_sales, update_seller_total_orders
+from .services.rollup_services import rebuild_daily_sales
+from .services.review_services import apply_review_delta, rebuild_review_stats, recompute_product_ratings
+from .services.promo_services import bulk_delete_promos
+from .models.promo import _promo_signals, muted_promo_signals
+from .services.order_services import create_order_from_cart, handle_order_status_change, submit_checkout
+from .services import sequence_services, trending_services
 
 
+def failing_task(**kwargs):
+    raise RuntimeError('boom')
+
+
+def make_user(role='customer'):
+    user = User.objects.create_user(
+        user_email=f'{uuid.uuid4().hex[:8]}@example.com',
+        password='password',
+        user_name='tester',
+        first_name='Test',
+        last_name='User',
+        user_phone='09170000000',
+        role=role,
+        phone_verified=True,
+        email_verified=True,
+    )
+    group, _ = Group.objects.get_or_create(name=role.capitalize())
+    user.groups.add(group)
+    return user
+
+
+def make_product(seller, quantity=10, price='100.00'):
+    category = Category.objects.create(category_name=uuid.uuid4().hex[:8])
+    sub_category = SubCategory.objects.create(category_id=category, sub_category_name=uuid.uuid4().hex[:8], sub_category_description='Fruits')
+    return Product.objects.create(
+        seller_id=seller,
+        sub_category_id=sub_category,
+        product_name='Mango',
+        product_price=Decimal(price),
+        product_brief_description='Sweet',
+        product_full_description='Sweet mangoes',
+        quantity=quantity,
+        weight=1,
+    )
+
+
+class InventoryLedgerTests(TestCase):
+    def setUp(self):
+        self.seller = Seller.objects.create(user_id=make_user('seller'), business_name='Farm', business_phone=123)
+        self.customer = make_user()
+        self.product = make_product(self.seller, quantity=10)
+        self.sharded = make_product(self.seller, quantity=12)
+        reshard_product_stock(self.sharded.pk, 4)
+
+    def checkout(self, quantities):
+        for product, quantity in quantities:
+            add_to_cart(self.customer, product.pk, quantity)
+        order, _ = create_order_from_cart(self.customer, payment_method='COD')
+        return order
+
+    def test_checkout_leaves_no_drift(self):
+        self.checkout([(self.product, 3), (self.sharded, 5)])
+
+        self.assertEqual(current_stock(self.product.pk), 7)
+        self.assertEqual(current_stock(self.sharded.pk), 7)
+        self.assertEqual(reconcile_inventory(), [])
+
+    def test_cancel_then_fold_restores_stock(self):
+        order = self.checkout([(self.product, 3), (self.sharded, 5)])
+
+        order.order_status = 'CANCELLED'
+        order.save(update_fields=['order_status', 'updated_at'])
+        handle_order_status_change(order, 'PENDING', 'CANCELLED')
+        self.assertEqual(SellerOrder.objects.get(order_id=order.pk).order_status, 'CANCELLED')
+        self.assertEqual(InventoryMovement.objects.filter(order=order, kind='CANCEL', applied=False).count(), 2)
+
+        self.assertEqual(fold_movements(), 2)
+        self.assertEqual(Product.all_objects.get(pk=self.product.pk).quantity, 10)
+        self.assertEqual(Product.all_objects.get(pk=self.sharded.pk).quantity, 12)
+        self.assertEqual(reconcile_inventory(), [])
+
+    def test_reconcile_fix_spreads_drift_across_shards(self):
+        StockShard.objects.filter(product_id=self.sharded.pk).update(quantity=0)
+
+        report = reconcile_inventory(fix=True)
+
+        self.assertEqual(report, [(str(self.sharded.pk), 12, 0, 0)])
+        self.assertEqual(
+            list(StockShard.objects.filter(product_id=self.sharded.pk).order_by('shard_no').values_list('quantity', flat=True)),
+            [3, 3, 3, 3]
+        )
+        self.assertEqual(Product.all_objects.get(pk=self.sharded.pk).quantity, 12)
+        self.assertEqual(reconcile_inventory(), [])
+
+
+@override_settings(INVENTORY_HOLD_ON_ADD_TO_CART=True)
+class InventoryHoldTests(TestCase):
+    def setUp(self):
+        self.seller = Seller.objects.create(user_id=make_user('seller'), business_name='Farm', business_phone=123)
+        self.customer = make_user()
+        self.product = make_product(self.seller, quantity=10)
+        self.sharded = make_product(self.seller, quantity=12)
+        reshard_product_stock(self.sharded.pk, 4)
+
+    def test_expired_holds_return_their_stock(self):
+        add_to_cart(self.customer, self.product.pk, 8)
+        add_to_cart(self.customer, self.sharded.pk, 12)
+        self.assertEqual((current_stock(self.product.pk), current_stock(self.sharded.pk)), (2, 0))
+        with self.assertRaises(ValueError):
+            add_to_cart(make_user(), self.product.pk, 3)
+
+        self.assertEqual(release_expired_holds(), 0)
+        InventoryHold.objects.update(expires_at=timezone.now() - timedelta(seconds=1))
+        self.assertEqual(release_expired_holds(), 2)
+
+        self.assertEqual(set(InventoryHold.objects.values_list('status', flat=True)), {'EXPIRED'})
+        self.assertEqual((current_stock(self.product.pk), current_stock(self.sharded.pk)), (10, 12))
+        add_to_cart(make_user(), self.product.pk, 3)
+        self.assertEqual(reconcile_inventory(), [])
+
+    def test_checkout_converts_holds_without_taking_stock_twice(self):
+        add_to_cart(self.customer, self.product.pk, 4)
+        add_to_cart(self.customer, self.sharded.pk, 5)
+
+        order, _ = create_order_from_cart(self.customer, payment_method='COD')
+
+        self.assertEqual(
+            set(InventoryHold.objects.values_list('status', 'order_id')),
+            {('CONVERTED', order.pk)}
+        )
+        self.assertEqual((current_stock(self.product.pk), current_stock(self.sharded.pk)), (6, 7))
+        self.assertEqual(release_expired_holds(), 0)
+        self.assertEqual(reconcile_inventory(), [])
+
+
+class ProductSaveTests(TestCase):
+    def test_saving_a_stale_instance_keeps_concurrent_counter_deltas(self):
+        seller = Seller.objects.create(user_id=make_user('seller'), business_name='Farm', business_phone=123)
+        stale = make_product(seller)
+        Product.objects.filter(pk=stale.pk).update(sell_count=F('sell_count') + 3, view_count=F('view_count') + 5, review_count=F('review_count') + 1)
+
+        stale.product_name = 'Carabao Mango'
+        stale.save()
+        stale.delete()
+
+        product = Product.all_objects.get(pk=stale.pk)
+        self.assertEqual((product.product_name, product.is_deleted), ('Carabao Mango', True))
+        self.assertEqual((product.sell_count, product.view_count, product.review_count), (3, 5, 1))
+
+
+class CheckoutQueryCountTests(TestCase):
+    def setUp(self):
+        seller = Seller.objects.create(user_id=make_user('seller'), business_name='Farm', business_phone=123)
+        self.customer = make_user()
+        self.products = [make_product(seller, quantity=100) for _ in range(6)]
+
+    def checkout(self, products):
+        for product in products:
+            add_to_cart(self.customer, product.pk, 2)
+        with CaptureQueriesContext(connection) as queries:
+            order, _ = create_order_from_cart(self.customer, payment_method='COD')
+        return order, len(queries)
+
+    def test_query_count_does_not_depend_on_the_number_of_lines(self):
+        # The first checkout also creates the sequence rows
+        self.checkout(self.products[:1])
+        _, one_line = self.checkout(self.products[:1])
+
+        for product in self.products[1:]:
+            add_to_cart(self.customer, product.pk, 2)
+        with self.assertNumQueries(one_line):
+            order, _ = create_order_from_cart(self.customer, payment_method='COD')
+
+        self.assertEqual(order.order_items.count(), 5)
+        self.assertEqual(current_stock(self.products[-1].pk), 98)
+        self.assertEqual(current_stock(self.products[0].pk), 96)
+
+
+class IdempotentCheckoutTests(TestCase):
+    def setUp(self):
+        seller = Seller.objects.create(user_id=make_user('seller'), business_name='Farm', business_phone=123)
+        self.customer = make_user()
+        self.product = make_product(seller, quantity=10)
+        self.client = APIClient()
+        self.client.force_authenticate(self.customer)
+
+    def test_replayed_key_returns_the_first_order(self):
+        add_to_cart(self.customer, self.product.pk, 2)
+        first = self.client.post('/api/orders/checkout/', {'payment_method': 'COD'}, format='json', HTTP_IDEMPOTENCY_KEY='checkout-1')
+        self.assertEqual(first.status_code, 201)
+
+        add_to_cart(self.customer, self.product.pk, 2)
+        replay = self.client.post('/api/orders/checkout/', {'payment_method': 'COD'}, format='json', HTTP_IDEMPOTENCY_KEY='checkout-1')
+
+        self.assertEqual(replay.status_code, 201)
+        self.assertEqual(replay['Idempotent-Replayed'], 'true')
+        self.assertEqual(replay.data['order']['order_id'], first.data['order']['order_id'])
+        self.assertEqual(Order.objects.filter(user_id=self.customer).count(), 1)
+        self.assertEqual(current_stock(self.product.pk), 8)
+
+    def test_reused_key_with_another_body_is_rejected(self):
+        add_to_cart(self.customer, self.product.pk, 1)
+        self.client.post('/api/orders/checkout/', {'payment_method': 'COD'}, format='json', HTTP_IDEMPOTENCY_KEY='checkout-2')
+
+        response = self.client.post('/api/orders/checkout/', {'payment_method': 'GCASH'}, format='json', HTTP_IDEMPOTENCY_KEY='checkout-2')
+
+        self.assertEqual(response.status_code, 422)
+
+
+    def test_payment_creation_replays_per_user(self):
+        add_to_cart(self.customer, self.product.pk, 1)
+        order, _ = create_order_from_cart(self.customer, payment_method='COD')
+        body = {'order_id': str(order.pk), 'payment_method': 'GCASH', 'amount': '100.00'}
+
+        first = self.client.post('/api/payments/', body, format='json', HTTP_IDEMPOTENCY_KEY='pay-1')
+        replay = self.client.post('/api/payments/', body, format='json', HTTP_IDEMPOTENCY_KEY='pay-1')
+        other = APIClient()
+        other.force_authenticate(make_user())
+        elsewhere = other.post('/api/payments/', body, format='json', HTTP_IDEMPOTENCY_KEY='pay-1')
+
+        self.assertEqual((first.status_code, replay.status_code, elsewhere.status_code), (201, 201, 201))
+        self.assertEqual(replay.data['payment_id'], first.data['payment_id'])
+        self.assertNotEqual(elsewhere.data['payment_id'], first.data['payment_id'])
+        self.assertEqual(Payment.objects.filter(order_id=order, payment_method='GCASH').count(), 2)
+
+
+class OrderAccessTests(TestCase):
+    def setUp(self):
+        self.seller = Seller.objects.create(user_id=make_user('seller'), business_name='Farm', business_phone=123)
+        self.customer = make_user()
+        self.product = make_product(self.seller, quantity=10)
+        add_to_cart(self.customer, self.product.pk, 2)
+        self.order, _ = create_order_from_cart(self.customer, payment_method='COD')
+
+    def client_for(self, user):
+        client = APIClient()
+        client.force_authenticate(user)
+        return client
+
+    def test_orders_are_scoped_to_their_customer_and_sellers(self):
+        stranger = self.client_for(make_user())
+        self.assertEqual(stranger.get('/api/orders/').data['count'], 0)
+        self.assertEqual(stranger.get(f'/api/orders/{self.order.pk}/').status_code, 404)
+        self.assertEqual(self.client_for(self.seller.user_id).get(f'/api/orders/{self.order.pk}/').status_code, 200)
+
+        customer = self.client_for(self.customer)
+        listing = customer.get('/api/orders/', {'status': 'pending,shipped'})
+        self.assertEqual([row['order_id'] for row in listing.data['results']], [str(self.order.pk)])
+        self.assertEqual(customer.get('/api/orders/', {'status': 'DELIVERED'}).data['count'], 0)
+        self.assertEqual(customer.get('/api/orders/', {'status': 'LOST'}).status_code, 400)
+        self.assertEqual(customer.get('/api/orders/', {'date_from': 'yesterday'}).status_code, 400)
+
+    def test_order_detail_is_a_three_query_bundle(self):
+        customer = self.client_for(self.customer)
+        with self.assertNumQueries(3):
+            response = customer.get(f'/api/orders/{self.order.pk}/')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([item['quantity'] for item in response.data['items']], [2])
+        self.assertEqual(len(response.data['payments']), 1)
+
+
+class OrderArchiveTests(TestCase):
+    def setUp(self):
+        self.seller = Seller.objects.create(user_id=make_user('seller'), business_name='Farm', business_phone=123)
+        self.customer = make_user()
+        self.product = make_product(self.seller, quantity=10)
+        self.client = APIClient()
+        self.client.force_authenticate(self.customer)
+
+    def order(self, status, age_days=0):
+        add_to_cart(self.customer, self.product.pk, 1)
+        order, _ = create_order_from_cart(self.customer, payment_method='COD')
+        Order.objects.filter(pk=order.pk).update(order_status=status, updated_at=timezone.now() - timedelta(days=age_days))
+        return order
+
+    def test_old_finished_orders_move_to_cold_storage_and_stay_readable(self):
+        old = self.order('DELIVERED', age_days=400)
+        recent = self.order('DELIVERED')
+        pending = self.order('PENDING', age_days=400)
+        flagged = self.order('CANCELLED')
+        Order.objects.filter(pk=flagged.pk).update(is_archived=True)
+
+        self.assertEqual(archive_orders(), 1)
+
+        self.assertEqual(set(Order.objects.values_list('pk', flat=True)), {recent.pk, pending.pk, flagged.pk})
+        self.assertEqual(list(ArchivedOrder.objects.values_list('pk', flat=True)), [old.pk])
+        self.assertEqual(ArchivedOrderItem.objects.filter(order_id=old.pk).count(), 1)
+        self.assertEqual(ArchivedPayment.objects.filter(order_id=old.pk).count(), 1)
+
+        detail = self.client.get(f'/api/orders/{old.pk}/')
+        self.assertEqual(detail.status_code, 200)
+        self.assertEqual((len(detail.data['items']), len(detail.data['payments'])), (1, 1))
+
+        listing = self.client.get('/api/orders/archived/')
+        self.assertEqual(
+            {(row['order_id'], row['storage']) for row in listing.data['results']},
+            {(str(old.pk), 'cold'), (str(flagged.pk), 'hot')}
+        )
+        streamed = self.client.get('/api/orders/archived/', {'stream': 'true'})
+        self.assertEqual(len(json.loads(b''.join(streamed.streaming_content))), 2)
+
+        stranger = APIClient()
+        stranger.force_authenticate(make_user())
+        self.assertEqual(stranger.get('/api/orders/archived/').data['count'], 0)
+        self.assertEqual(stranger.get(f'/api/orders/{old.pk}/').status_code, 404)
+
+
+class CartTests(TestCase):
+    def setUp(self):
+        self.seller = Seller.objects.create(user_id=make_user('seller'), business_name='Farm', business_phone=123)
+        self.customer = make_user()
+        self.product = make_product(self.seller, quantity=10)
+        self.client = APIClient()
+        self.client.force_authenticate(self.customer)
+
+    def test_unchanged_cart_is_answered_with_304(self):
+        add_to_cart(self.customer, self.product.pk, 2)
+        first = self.client.get('/api/carts/')
+        self.assertEqual(first.status_code, 200)
+        self.assertEqual((first.data['total_items'], Decimal(first.data['total_amount'])), (2, Decimal('200.00')))
+
+        unchanged = self.client.get('/api/carts/', HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(unchanged.status_code, 304)
+        self.assertEqual(unchanged['ETag'], first['ETag'])
+
+        add_to_cart(self.customer, self.product.pk, 1)
+        changed = self.client.get('/api/carts/', HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(changed.status_code, 200)
+        self.assertNotEqual(changed['ETag'], first['ETag'])
+        self.assertEqual(changed.data['total_items'], 3)
+
+    def test_guest_cart_rejects_tampered_tokens_and_merges_on_login(self):
+        guest = APIClient()
+        token = guest.post('/api/carts/guest/', {'product_id': str(self.product.pk), 'quantity': 2}, format='json').data['token']
+        self.assertEqual(guest.get('/api/carts/guest/', HTTP_X_GUEST_CART=token).data['total_items'], 2)
+
+        forged = signing.dumps([[str(self.product.pk), 2, '0.01']], salt='wrong', compress=True)
+        for bad in (token[:-1] + ('A' if token[-1] != 'A' else 'B'), forged):
+            response = guest.get('/api/carts/guest/', HTTP_X_GUEST_CART=bad)
+            self.assertEqual((response.status_code, response.data['error']), (400, 'Invalid guest cart.'))
+
+        add_to_cart(self.customer, self.product.pk, 1)
+        login = guest.post('/api/auth/login/', {
+            'user_email': self.customer.user_email, 'password': 'password', 'guest_cart': token
+        }, format='json')
+        self.assertEqual(login.status_code, 200)
+        self.assertEqual(login.data['guest_cart'], {'merged': 1, 'issues': []})
+        self.assertEqual(self.client.get('/api/carts/').data['total_items'], 3)
+
+    def test_price_changes_reprice_cart_lines_on_the_next_read(self):
+        add_to_cart(self.customer, self.product.pk, 2)
+        etag = self.client.get('/api/carts/')['ETag']
+
+        product = Product.objects.get(pk=self.product.pk)
+        product.product_name = 'Carabao Mango'
+        product.save()
+        self.assertEqual(self.client.get('/api/carts/', HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        product.product_price = Decimal('150.00')
+        product.save()
+        repriced = self.client.get('/api/carts/', HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(repriced.status_code, 200)
+        self.assertEqual(Decimal(repriced.data['items'][0]['unit_price']), Decimal('150.00'))
+        self.assertEqual(Decimal(repriced.data['total_amount']), Decimal('300.00'))
+        self.assertEqual(self.client.get('/api/carts/', HTTP_IF_NONE_MATCH=repriced['ETag']).status_code, 304)
+
+    def test_batch_applies_operations_in_order_and_reports_failures(self):
+        scarce = make_product(self.seller, quantity=2)
+        removed = make_product(self.seller, quantity=5)
+        missing = make_product(self.seller, quantity=5)
+        add_to_cart(self.customer, removed.pk, 1)
+        operations = [
+            {'op': 'add', 'product_id': str(self.product.pk), 'quantity': 3},
+            {'op': 'add', 'product_id': str(self.product.pk), 'quantity': 2},
+            {'op': 'add', 'product_id': str(scarce.pk), 'quantity': 5},
+            {'op': 'update', 'product_id': str(missing.pk), 'quantity': 1},
+            {'op': 'remove', 'product_id': str(removed.pk)},
+        ]
+
+        response = self.client.post('/api/carts/batch/', {'operations': operations}, format='json')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([result['status'] for result in response.data['results']], ['ok', 'ok', 'error', 'error', 'ok'])
+        self.assertEqual(response.data['results'][1]['quantity'], 5)
+        self.assertEqual((response.data['total_items'], response.data['total_amount']), (5, Decimal('500.00')))
+        self.assertEqual(response['ETag'], self.client.get('/api/carts/')['ETag'])
+
+    def test_batch_runs_a_constant_number_of_queries(self):
+        products = [make_product(self.seller) for _ in range(7)]
+
+        def batch(chosen):
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.post('/api/carts/batch/', {'operations': [
+                    {'op': 'add', 'product_id': str(product.pk), 'quantity': 1} for product in chosen
+                ]}, format='json')
+            self.assertEqual(response.status_code, 200)
+            return len(queries)
+
+        batch(products[:1])  # creates the cart
+        self.assertEqual(batch(products[1:2]), batch(products[2:]))
+
+
+class SettlementTests(TestCase):
+    def setUp(self):
+        self.seller = Seller.objects.create(user_id=make_user('seller'), business_name='Farm', business_phone=123)
+        self.customer = make_user()
+        self.product = make_product(self.seller, quantity=20)
+
+    def payment(self, transaction_id, method='GCASH', status='PENDING'):
+        add_to_cart(self.customer, self.product.pk, 1)
+        _, payment = create_order_from_cart(self.customer, payment_method=method)
+        Payment.objects.filter(pk=payment.pk).update(transaction_id=transaction_id, payment_status=status)
+        return payment
+
+    def reconcile(self, rows, **kwargs):
+        lines = ['transaction_id,status,amount,tax,net'] + [','.join(row) for row in rows]
+        report = io.StringIO()
+        stats = reconcile_settlement(lines, provider='GCASH', report=report, **kwargs)
+        return stats, list(csv.DictReader(io.StringIO(report.getvalue())))
+
+    def test_settlement_applies_matches_and_reports_each_mismatch_reason(self):
+        settled = self.payment('T1')
+        self.payment('T2')
+        self.payment('T3', status='FAILED')
+        self.payment('T4', method='PAYMAYA')
+        self.payment('T5')
+        self.payment('T5')
+        rows = [
+            ('T1', 'SUCCESS', '100.00', '12.00', '88.00'),
+            ('T1', 'SUCCESS', '100.00', '12.00', '88.00'),
+            ('T2', 'SUCCESS', '99.00', '0', '99.00'),
+            ('T3', 'SUCCESS', '100.00', '0', '100.00'),
+            ('T4', 'SUCCESS', '100.00', '0', '100.00'),
+            ('T5', 'SUCCESS', '100.00', '0', '100.00'),
+            ('T6', 'SUCCESS', '100.00', '0', '100.00'),
+            ('T7', 'SUCCESS', 'lots', '0', '100.00'),
+            ('T8', 'LOST', '100.00', '0', '100.00'),
+        ]
+
+        stats, report = self.reconcile(rows, dry_run=True)
+        self.assertEqual((stats['matched'], stats['updated']), (1, 1))
+        self.assertEqual(Payment.objects.get(pk=settled.pk).payment_status, 'PENDING')
+
+        stats, report = self.reconcile(rows)
+
+        self.assertEqual((stats['lines'], stats['matched'], stats['updated'], stats['mismatched']), (9, 1, 1, 8))
+        self.assertEqual([(row['line'], row['transaction_id'], row['reason']) for row in report], [
+            ('3', 'T1', 'duplicate'),
+            ('4', 'T2', 'amount_mismatch'),
+            ('5', 'T3', 'status_conflict'),
+            ('6', 'T4', 'method_mismatch'),
+            ('7', 'T5', 'ambiguous_transaction'),
+            ('8', 'T6', 'unknown_transaction'),
+            ('9', 'T7', 'malformed'),
+            ('10', 'T8', 'malformed'),
+        ])
+        payment = Payment.objects.get(pk=settled.pk)
+        self.assertEqual((payment.payment_status, payment.tax, payment.revenue), ('COMPLETED', Decimal('12.00'), Decimal('88.00')))
+        self.assertEqual(Payment.objects.filter(payment_status='COMPLETED').count(), 1)
+
+    def test_missing_columns_are_rejected(self):
+        with self.assertRaises(ValueError):
+            reconcile_settlement(['transaction_id,status,amount', 'T1,SUCCESS,100.00'])
+
+
+@override_settings(JOB_MAX_ATTEMPTS=2)
+class JobRetryTests(TestCase):
+    def claim_and_run(self):
+        Job.objects.filter(status='PENDING').update(run_after=timezone.now())
+        jobs = claim_jobs()
+        self.assertEqual(len(jobs), 1)
+        return run_job(jobs[0])
+
+    def test_failed_job_is_retried_then_kept_as_failed(self):
+        Job.objects.create(task=task_path(failing_task), dedupe_key='retry')
+
+        self.assertFalse(self.claim_and_run())
+        job = Job.objects.get()
+        self.assertEqual((job.status, job.attempts, job.claim_token), ('PENDING', 1, None))
+        self.assertGreater(job.run_after, timezone.now())
+        self.assertIn('boom', job.last_error)
+
+        self.assertFalse(self.claim_and_run())
+        job = Job.objects.get()
+        self.assertEqual((job.status, job.attempts), ('FAILED', 2))
+        self.assertEqual(claim_jobs(), [])
+
+    def test_retry_is_dropped_for_a_pending_twin(self):
+        Job.objects.create(task=task_path(failing_task), dedupe_key='twin')
+        job = claim_jobs()[0]
+        twin = Job.objects.create(task=task_path(failing_task), dedupe_key='twin')
+
+        self.assertFalse(run_job(job))
+
+        self.assertEqual(list(Job.objects.values_list('pk', 'status')), [(twin.pk, 'PENDING')])
+
+
+@override_settings(JOB_MAX_ATTEMPTS=3)
+class CheckoutTicketRetryTests(TestCase):
+    def test_ticket_fails_once_database_errors_exhaust_the_retries(self):
+        seller = Seller.objects.create(user_id=make_user('seller'), business_name='Farm', business_phone=123)
+        customer = make_user()
+        product = make_product(seller, quantity=10)
+        add_to_cart(customer, product.pk, 2)
+        with self.captureOnCommitCallbacks(execute=True):
+            ticket = submit_checkout(customer, payment_method='COD')
+
+        with mock.patch('api.services.order_services.create_order_from_cart', side_effect=OperationalError('database is locked')):
+            for attempt in range(1, 4):
+                Job.objects.filter(status='PENDING').update(run_after=timezone.now())
+                job = claim_jobs(queue='checkout')[0]
+                self.assertFalse(run_job(job))
+                ticket.refresh_from_db()
+                self.assertEqual(ticket.status, 'QUEUED' if attempt < 3 else 'FAILED')
+
+        self.assertIn('database is locked', ticket.error)
+        self.assertEqual(Job.objects.get().status, 'FAILED')
+        self.assertFalse(CheckoutTicket.objects.filter(status__in=['QUEUED', 'PROCESSING']).exists())
+        self.assertEqual(current_stock(product.pk), 10)
+
+
+class CounterFlushTests(TransactionTestCase):
+    def test_idle_process_flushes_in_the_background(self):
+        seller = Seller.objects.create(user_id=make_user('seller'), business_name='Farm', business_phone=123)
+        with tempfile.TemporaryDirectory() as journal_dir, override_settings(
+            COUNTER_JOURNAL_DIR=journal_dir, COUNTER_FLUSH_SECONDS=0.2, COUNTER_FLUSH_THRESHOLD=1000
+        ):
+            increment(Seller, seller.pk, 'total_likes', 2)
+            deadline = time.monotonic() + 5
+            while Seller.objects.get(pk=seller.pk).total_likes != 2 and time.monotonic() < deadline:
+                time.sleep(0.05)
+
+            self.assertEqual(Seller.objects.get(pk=seller.pk).total_likes, 2)
+
+
+@override_settings(TRENDING_CANDIDATES=1, TRENDING_CACHE_SECONDS=0)
+class TrendingTests(TestCase):
+    def setUp(self):
+        # Each test starts with a fresh shard for this process
+        trending_services._shard['pid'] = None
+        trending_services._merged_cache.clear()
+        self.seller = Seller.objects.create(user_id=make_user('seller'), business_name='Farm', business_phone=123)
+
+    def record(self, quantities):
+        trending_services._record({product.pk: quantity for product, quantity in quantities}, 'view')
+        trending_services.flush_shard()
+
+    def test_category_without_a_global_candidate_still_ranks_its_products(self):
+        hot, quiet, quieter = make_product(self.seller), make_product(self.seller), make_product(self.seller)
+        Product.objects.filter(pk=quieter.pk).update(sub_category_id=quiet.sub_category_id)
+        self.record([(hot, 50), (quiet, 3), (quieter, 1)])
+
+        ranked = trending_services.trending_products(5, category_id=quiet.sub_category_id.category_id_id)
+
+        self.assertEqual([product.pk for product, _ in ranked], [str(quiet.pk), str(quieter.pk)])
+        self.assertEqual([product.pk for product, _ in trending_services.trending_products(5)], [str(hot.pk)])
+
+    def test_shards_saved_with_another_sketch_size_are_skipped(self):
+        product = make_product(self.seller)
+        TrendingShard.objects.create(shard='elsewhere:1', landmark=time.time(), cells=b'\0' * 64, candidates=[str(product.pk)])
+        self.record([(product, 2)])
+
+        ranked = trending_services.trending_products(5)
+
+        self.assertEqual([ranked_product.pk for ranked_product, _ in ranked], [str(product.pk)])
+        self.assertAlmostEqual(ranked[0][1], 2, places=2)
+
+
+class RankingScopeTests(TestCase):
+    def setUp(self):
+        self.seller = Seller.objects.create(user_id=make_user('seller'), business_name='Farm', business_phone=123)
+        self.product = make_product(self.seller)
+        self.client = APIClient()
+        self.client.force_authenticate(make_user())
+
+    def test_malformed_and_unknown_scopes_are_rejected(self):
+        self.assertEqual(self.client.get('/api/rankings/products/', {'category_id': 'fruit'}).status_code, 400)
+        self.assertEqual(self.client.get('/api/rankings/products/', {'seller_id': 'not-a-uuid'}).status_code, 400)
+        self.assertEqual(self.client.get('/api/rankings/products/', {'category_id': 999999}).status_code, 404)
+        self.assertEqual(self.client.get('/api/rankings/products/', {'sub_category_id': 'missing'}).status_code, 404)
+        self.assertEqual(self.client.get('/api/rankings/trending/', {'category_id': 'fruit'}).status_code, 400)
+        self.assertFalse(Ranking.objects.exists())
+
+    def test_missing_ranking_is_built_by_a_job_not_the_read(self):
+        Product.objects.filter(pk=self.product.pk).update(sell_count=4)
+        category_id = self.product.sub_category_id.category_id_id
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.get('/api/rankings/products/', {'category_id': category_id})
+        self.assertEqual((response.status_code, response.data), (200, []))
+        self.assertFalse(Ranking.objects.exists())
+
+        run_pending_jobs()
+        ranking = Ranking.objects.get()
+        self.assertEqual((ranking.scope, ranking.entries), (f'products:category:{category_id}', {str(self.product.pk): 4.0}))
+
+
+class PromoSimulationTests(TestCase):
+    def setUp(self):
+        self.seller_user = make_user('seller')
+        self.seller = Seller.objects.create(user_id=self.seller_user, business_name='Farm', business_phone=123)
+
+    def test_simulation_reports_prices_and_revenue_without_writing(self):
+        cheap, dear = make_product(self.seller, price='100.00'), make_product(self.seller, price='200.00')
+        Product.objects.filter(pk=cheap.pk).update(sell_count=1)
+        Product.objects.filter(pk=dear.pk).update(sell_count=2)
+
+        result = simulate_promo_pricing(self.seller, [{'discount_type': 'PERCENTAGE', 'discount_percentage': 10}])
+
+        self.assertEqual((result['affected_products'], result['average_discount_percentage']), (2, 10.0))
+        self.assertEqual((result['current_revenue'], result['projected_revenue'], result['revenue_delta']), (500.0, 450.0, -50.0))
+        self.assertEqual(sorted(line['simulated_price'] for line in result['products']), [90.0, 180.0])
+        self.assertEqual(Product.objects.get(pk=cheap.pk).product_discountedPrice, None)
+
+    def test_simulation_over_50k_products_stays_under_100ms(self):
+        template = make_product(self.seller)
+        Product.objects.bulk_create([
+            Product(
+                seller_id=self.seller, sub_category_id=template.sub_category_id, product_name='Mango',
+                product_price=Decimal(10 + i % 90), product_brief_description='Sweet',
+                product_full_description='Sweet mangoes', weight=1, sell_count=i % 7
+            )
+            for i in range(50000)
+        ], batch_size=5000)
+        rules = [{'discount_type': 'FIXED', 'discount_amount': 5}, {'discount_type': 'PERCENTAGE', 'discount_percentage': 15}]
+        simulate_promo_pricing(self.seller, rules)
+
+        started = time.perf_counter()
+        result = simulate_promo_pricing(self.seller, rules)
+        elapsed = time.perf_counter() - started
+
+        self.assertEqual(result['total_products'], 50001)
+        self.assertLess(elapsed, 0.1)
+
+    def test_malformed_seller_id_is_rejected(self):
+        client = APIClient()
+        client.force_authenticate(self.seller_user)
+        response = client.post('/api/promos/simulate/', {
+            'seller_id': 'not-a-uuid',
+            'rules': [{'discount_type': 'PERCENTAGE', 'discount_percentage': 10}]
+        }, format='json')
+
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('seller_id', response.data)
+
+
+class BulkPromoDeleteTests(TestCase):
+    def setUp(self):
+        self.seller = Seller.objects.create(user_id=make_user('seller'), business_name='Farm', business_phone=123)
+        self.product = make_product(self.seller)
+
+    def make_promos(self, count):
+        promos = Promo.objects.bulk_create([Promo(seller_id=self.seller, promo_name=f'Sale {i}', discount_amount=5) for i in range(count)])
+        PromoProduct.objects.bulk_create([PromoProduct(promo=promo, product=self.product) for promo in promos])
+        return Promo.objects.filter(pk__in=[promo.pk for promo in promos])
+
+    def test_promos_are_deleted_set_based(self):
+        signalled = []
+        receiver = lambda sender, instance, **kwargs: signalled.append(instance.pk)
+        pre_delete.connect(receiver, sender=Promo)
+        self.addCleanup(pre_delete.disconnect, receiver, sender=Promo)
+        counts = []
+        for count in (3, 30):
+            promos = self.make_promos(count)
+            with CaptureQueriesContext(connection) as queries:
+                self.assertEqual(bulk_delete_promos(promos), count)
+            counts.append(len(queries))
+
+        self.assertEqual(counts[0], counts[1])
+        self.assertEqual(signalled, [])
+        self.assertFalse(Promo.objects.exists())
+        self.assertFalse(PromoProduct.objects.exists())
+        self.assertFalse(Job.objects.exists())
+
+    def test_nested_mute_restores_the_outer_state(self):
+        with muted_promo_signals():
+            with muted_promo_signals():
+                pass
+            self.assertTrue(_promo_signals.muted)
+        self.assertFalse(_promo_signals.muted)
+
+
+class SellerOrderCountTests(TestCase):
+    def setUp(self):
+        self.seller = Seller.objects.create(user_id=make_user('seller'), business_name='Farm', business_phone=123)
+        self.customer = make_user()
+        self.product = make_product(self.seller, quantity=20)
+
+    def order(self, status):
+        add_to_cart(self.customer, self.product.pk, 1)
+        order, _ = create_order_from_cart(self.customer, payment_method='COD')
+        with self.captureOnCommitCallbacks(execute=True):
+            order.order_status = status
+            order.save(update_fields=['order_status', 'updated_at'])
+            handle_order_status_change(order, 'PENDING', status)
+        return order
+
+    def test_recount_matches_the_delivered_delta_path(self):
+        self.order('DELIVERED')
+        self.order('DELIVERED')
+        self.order('CANCELLED')
+        self.order('PENDING')
+        run_pending_jobs()
+        self.seller.refresh_from_db()
+        self.assertEqual(self.seller.total_orders, 2)
+
+        Seller.objects.filter(pk=self.seller.pk).update(total_orders=7)
+        update_seller_total_orders(self.seller)
+
+        self.assertEqual(Seller.objects.get(pk=self.seller.pk).total_orders, 2)
+
+    def test_delivery_adds_sales_once_and_refund_takes_them_back(self):
+        add_to_cart(self.customer, self.product.pk, 3)
+        order, _ = create_order_from_cart(self.customer, payment_method='COD')
+        with self.captureOnCommitCallbacks(execute=True):
+            order.order_status = 'DELIVERED'
+            order.save(update_fields=['order_status', 'updated_at'])
+            handle_order_status_change(order, 'PENDING', 'DELIVERED')
+        run_pending_jobs()
+        sync_order_sales(order.pk)
+
+        def counters():
+            seller = Seller.objects.get(pk=self.seller.pk)
+            product = Product.all_objects.get(pk=self.product.pk)
+            return seller.total_orders, seller.total_products_sold, seller.total_earnings, product.sell_count
+
+        self.assertEqual(counters(), (1, 3, Decimal('300.00'), 3))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            order.order_status = 'REFUNDED'
+            order.save(update_fields=['order_status', 'updated_at'])
+            handle_order_status_change(order, 'DELIVERED', 'REFUNDED')
+        run_pending_jobs()
+        sync_order_sales(order.pk)
+
+        self.assertEqual(counters(), (0, 0, Decimal('0.00'), 0))
+
+
+class SellerDailySalesTests(TestCase):
+    def setUp(self):
+        self.seller = Seller.objects.create(user_id=make_user('seller'), business_name='Farm', business_phone=123)
+        self.customer = make_user()
+        self.product = make_product(self.seller, quantity=20)
+
+    def rollups(self):
+        return list(SellerDailySales.objects.order_by('seller_id', 'day').values('seller_id', 'day', 'orders', 'units', 'gross', 'cancellations', 'cancelled_amount'))
+
+    def test_incremental_rollups_match_a_rebuild_and_feed_the_dashboard(self):
+        for quantity in (3, 1):
+            add_to_cart(self.customer, self.product.pk, quantity)
+            order, _ = create_order_from_cart(self.customer, payment_method='COD')
+        with self.captureOnCommitCallbacks(execute=True):
+            order.order_status = 'CANCELLED'
+            order.save(update_fields=['order_status', 'updated_at'])
+            handle_order_status_change(order, 'PENDING', 'CANCELLED')
+
+        incremental = self.rollups()
+        self.assertEqual(rebuild_daily_sales(), 1)
+        self.assertEqual(self.rollups(), incremental)
+
+        client = APIClient()
+        client.force_authenticate(self.seller.user_id)
+        response = client.get('/api/store/dashboard/', {'days': 7})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data['series']), 7)
+        week = response.data['totals']['7']
+        self.assertEqual(
+            (week['orders'], week['units'], week['gross'], week['cancellations'], week['net']),
+            (2, 4, Decimal('400.00'), 1, Decimal('300.00'))
+        )
+        self.assertEqual(response.data['series'][-1]['orders'], 2)
+        self.assertEqual(client.get('/api/store/dashboard/', {'days': 5}).status_code, 400)
+
+
+class KpiSnapshotTests(TestCase):
+    def setUp(self):
+        self.seller = Seller.objects.create(user_id=make_user('seller'), business_name='Farm', business_phone=123)
+        self.customer = make_user()
+        self.product = make_product(self.seller, quantity=20)
+        self.client = APIClient()
+        self.client.force_authenticate(make_user('admin'))
+
+    def place_order(self, quantity):
+        add_to_cart(self.customer, self.product.pk, quantity)
+        return create_order_from_cart(self.customer, payment_method='COD')[0]
+
+    def test_dashboard_reads_snapshots_and_refreshes_through_one_job(self):
+        self.place_order(2)
+        Order.objects.filter(pk=self.place_order(1).pk).update(order_status='CANCELLED')
+
+        first = self.client.get('/api/admin/dashboard/')
+        self.assertEqual(first.status_code, 200)
+        metrics = first.data['metrics']
+        self.assertEqual((metrics['orders']['total'], metrics['orders']['by_status']['CANCELLED']), (2, 1))
+        self.assertEqual(Decimal(str(metrics['gmv']['total'])), Decimal('200.00'))
+
+        self.place_order(3)
+        self.assertEqual(self.client.get('/api/admin/dashboard/').data['snapshot_id'], first.data['snapshot_id'])
+        throttled = self.client.post('/api/admin/dashboard/')
+        self.assertEqual(throttled.status_code, 429)
+        self.assertTrue(int(throttled['Retry-After']) > 0)
+
+        KpiSnapshot.objects.update(created_at=timezone.now() - timedelta(minutes=5))
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(self.client.post('/api/admin/dashboard/').status_code, 202)
+            self.assertEqual(self.client.post('/api/admin/dashboard/').status_code, 202)
+        self.assertEqual(Job.objects.filter(dedupe_key='kpi-refresh', status='PENDING').count(), 1)
+        run_pending_jobs()
+
+        refreshed = self.client.get('/api/admin/dashboard/').data
+        self.assertNotEqual(refreshed['snapshot_id'], first.data['snapshot_id'])
+        self.assertEqual(refreshed['metrics']['orders']['total'], 3)
+        self.assertEqual(KpiSnapshot.objects.count(), 2)
+
+
+@override_settings(RATING_MIN_REVIEWS=1, RATING_TOP_PERCENTILE=0.5)
+class RatingRecomputeTests(TestCase):
+    def setUp(self):
+        seller = Seller.objects.create(user_id=make_user('seller'), business_name='Farm', business_phone=123)
+        self.good = make_product(seller)
+        self.poor = make_product(seller)
+        Product.objects.filter(pk=self.poor.pk).update(sub_category_id=self.good.sub_category_id)
+        apply_review_delta(self.good.pk, added_rating=5)
+        apply_review_delta(self.poor.pk, added_rating=1)
+
+    def test_recompute_scores_partitions_and_clears_flags(self):
+        self.assertEqual(recompute_product_ratings(), 2)
+
+        good, poor = Product.objects.get(pk=self.good.pk), Product.objects.get(pk=self.poor.pk)
+        self.assertEqual((good.top_rated, poor.top_rated), (True, False))
+        self.assertGreater(good.rating_score, poor.rating_score)
+        self.assertFalse(Product.objects.filter(rating_dirty=True).exists())
+        self.assertEqual(recompute_product_ratings(), 0)
+
+    def test_review_landing_after_the_scoring_read_keeps_its_flag(self):
+        bulk_update = Product.all_objects.bulk_update
+        started = timezone.now()
+
+        def review_then_write(*args, **kwargs):
+            # A review stamped before the run began but committed only after the
+            # scoring read (its transaction was still open)
+            apply_review_delta(self.poor.pk, added_rating=2)
+            Product.all_objects.filter(pk=self.poor.pk).update(updated_at=started - timedelta(seconds=1))
+            return bulk_update(*args, **kwargs)
+
+        with mock.patch.object(Product.all_objects, 'bulk_update', side_effect=review_then_write):
+            recompute_product_ratings()
+
+        self.assertEqual(list(Product.objects.filter(rating_dirty=True).values_list('pk', flat=True)), [str(self.poor.pk)])
+
+
+class ReviewAggregateTests(TestCase):
+    def setUp(self):
+        self.seller = Seller.objects.create(user_id=make_user('seller'), business_name='Farm', business_phone=123)
+        self.product = make_product(self.seller)
+        self.customer = make_user()
+
+    def review(self, rating):
+        with self.captureOnCommitCallbacks(execute=True):
+            review = Reviews.objects.create(user_id=self.customer, product_id=self.product, review_rating=rating, review_comment='Fresh')
+        return review
+
+    def aggregates(self):
+        product = Product.objects.get(pk=self.product.pk)
+        seller = Seller.objects.get(pk=self.seller.pk)
+        return (
+            (product.review_count, product.review_rating_sum, [getattr(product, f'review_rating_{r}') for r in range(1, 6)]),
+            (seller.total_reviews, seller.review_rating_sum, seller.average_rating),
+        )
+
+    def test_creates_edits_and_deletes_move_the_aggregates(self):
+        self.review(5)
+        edited = self.review(4)
+        deleted = self.review(1)
+        with self.captureOnCommitCallbacks(execute=True):
+            edited.review_rating = 2
+            edited.save()
+        with self.captureOnCommitCallbacks(execute=True):
+            deleted.delete()
+        run_pending_jobs()
+
+        self.assertEqual(self.aggregates(), ((2, 7, [0, 1, 0, 0, 1]), (2, 7, Decimal('3.50'))))
+        self.assertTrue(Product.objects.get(pk=self.product.pk).rating_dirty)
+
+        incremental = self.aggregates()
+        rebuild_review_stats()
+        self.assertEqual(self.aggregates(), incremental)
+
+
+@override_settings(SEQUENCE_BLOCK_SIZE=5)
+class SequenceTests(TransactionTestCase):
+    def setUp(self):
+        sequence_services._blocks.clear()
+
+    def test_blocks_are_reserved_once_and_handed_out_from_memory(self):
+        self.assertEqual(sequence_services.next_values('test', 2), [1, 2])
+        with self.assertNumQueries(0):
+            self.assertEqual(sequence_services.next_values('test', 3), [3, 4, 5])
+        self.assertEqual(sequence_services.next_value('test'), 6)
+        # Another process sees the counter past this process's block
+        sequence_services._blocks.clear()
+        self.assertEqual(sequence_services.next_values('test', 7), [11, 12, 13, 14, 15, 16, 17])
+
+    def test_sqlite_reserves_exactly_what_a_transaction_needs(self):
+        with transaction.atomic():
+            self.assertEqual(sequence_services.next_values('test', 2), [1, 2])
+        self.assertNotIn('test', sequence_services._blocks)
+        self.assertEqual(sequence_services.next_value('test'), 3)
@@ -16,6 +16,7 @@ router.register(r'promos', views.PromoViewSet, basename='promo')
 router.register(r'categories', views.CategoryViewSet, basename='category')
 router.register(r'subcategories', views.SubCategoryViewSet, basename='subcategory')
 router.register(r'payments', views.PaymentViewSet, basename='payment')
+router.register(r'rankings', views.RankingViewSet, basename='ranking')
 
 urlpatterns = [
     # ========================================
@@ -11,3 +11,4 @@ from .promo import PromoViewSet
 from .category import CategoryViewSet
 from .subcategory import SubCategoryViewSet
 from .payment import PaymentViewSet
+from .ranking import RankingViewSet
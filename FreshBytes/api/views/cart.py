@@ -1,25 +1,63 @@
 from rest_framework import viewsets, status
 from rest_framework.response import Response
-from rest_framework.permissions import IsAuthenticated
+from rest_framework.permissions import IsAuthenticated, AllowAny
 from rest_framework.decorators import action
+from django.conf import settings
 from django.core.exceptions import ValidationError
 from django.shortcuts import get_object_or_404
 from ..models import Cart, CartItem, Product
-from ..serializers import CartSerializer, CartItemSerializer
-from ..services.cart_services import get_or_create_cart, add_to_cart, update_cart_item, remove_from_cart, clear_cart
-from drf_spectacular.utils import extend_schema, extend_schema_view
+from ..serializers import CartSerializer, CartItemSerializer, CartBatchSerializer, GuestCartSerializer, InventoryHoldSerializer
+from ..services.cart_services import (
+    add_to_cart, update_cart_item, remove_from_cart, clear_cart, reserve_cart, apply_cart_operations,
+    cart_snapshot, cart_version, cart_etag, etag_matches,
+    load_guest_cart, dump_guest_cart, update_guest_cart, guest_cart_summary,
+)
+from drf_spectacular.utils import extend_schema, extend_schema_view, OpenApiParameter
 from ..permissions import IsCustomerGroup
 
+GUEST_CART_HEADER = 'X-Guest-Cart'
+
+def guest_cart_token(request):
+    """The guest cart token sent with a request: the guest_cart field, the X-Guest-Cart header or the cookie"""
+    return (
+        request.data.get('guest_cart')
+        or request.headers.get(GUEST_CART_HEADER)
+        or request.COOKIES.get(getattr(settings, 'GUEST_CART_COOKIE', 'guest_cart'))
+    )
+
+def set_guest_cart_cookie(response, token):
+    name = getattr(settings, 'GUEST_CART_COOKIE', 'guest_cart')
+    if token:
+        response.set_cookie(
+            name, token,
+            max_age=getattr(settings, 'GUEST_CART_MAX_AGE_SECONDS', 30 * 24 * 3600),
+            httponly=True,
+            samesite='Lax'
+        )
+    else:
+        response.delete_cookie(name, samesite='Lax')
+    return response
+
 @extend_schema(tags=['Cart'])
 
 class CartViewSet(viewsets.ViewSet):
     permission_classes = [IsAuthenticated, IsCustomerGroup]
     serializer_class = CartSerializer
 
+    @extend_schema(
+        parameters=[OpenApiParameter('If-None-Match', str, OpenApiParameter.HEADER, description='ETag of a cart already held; answered with 304 while unchanged')],
+        responses={200: CartSerializer, 304: None}
+    )
     def list(self, request):
-        cart = get_or_create_cart(request.user)
-        serializer = self.serializer_class(cart)
-        return Response(serializer.data)
+        # Unchanged carts are answered from the version column alone
+        state = cart_version(request.user)
+        if state and etag_matches(request.headers.get('If-None-Match'), cart_etag(*state)):
+            return Response(status=status.HTTP_304_NOT_MODIFIED, headers={'ETag': cart_etag(*state)})
+        try:
+            cart = cart_snapshot(request.user)
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(self.serializer_class(cart).data, headers={'ETag': cart_etag(cart.pk, cart.version)})
 
     def create(self, request):
         product_id = request.data.get('product_id')
@@ -35,7 +73,7 @@ class CartViewSet(viewsets.ViewSet):
                 {'error': 'Product not found'},
                 status=status.HTTP_404_NOT_FOUND
             )
-        except ValidationError as e:
+        except (ValidationError, ValueError) as e:
             return Response(
                 {'error': str(e)},
                 status=status.HTTP_400_BAD_REQUEST
@@ -56,6 +94,32 @@ class CartViewSet(viewsets.ViewSet):
                 {'error': 'Cart item not found'},
                 status=status.HTTP_404_NOT_FOUND
             )
+        except ValueError as e:
+            return Response(
+                {'error': str(e)},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+    @extend_schema(request=CartBatchSerializer)
+    @action(detail=False, methods=['post'])
+    def batch(self, request):
+        """
+        Apply several add/update/remove operations at once (e.g. adding a
+        recipe's ingredients). Failed operations are reported per line and
+        do not stop the others.
+        """
+        serializer = CartBatchSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        try:
+            cart, results = apply_cart_operations(request.user, serializer.validated_data['operations'])
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response({
+            'results': results,
+            'total_items': cart.total_items,
+            'total_amount': cart.total_amount,
+            'version': cart.version,
+        }, headers={'ETag': cart_etag(cart.pk, cart.version)})
 
     @action(detail=False, methods=['delete'])
     def remove_item(self, request):
@@ -69,3 +133,49 @@ class CartViewSet(viewsets.ViewSet):
         """Clear all items from the cart (POST is acceptable for this custom action)."""
         clear_cart(request.user)
         return Response(status=status.HTTP_204_NO_CONTENT)
+
+    @action(detail=False, methods=['post'])
+    def reserve(self, request):
+        """Hold stock for the cart (or the given cart_item_ids) while the customer checks out."""
+        cart_item_ids = request.data.get('cart_item_ids', None)
+        try:
+            holds = reserve_cart(request.user, cart_item_ids)
+        except ValueError as e:
+            return Response(
+                {'error': str(e)},
+                status=status.HTTP_409_CONFLICT
+            )
+        return Response({
+            'holds': InventoryHoldSerializer(holds, many=True).data,
+            'expires_at': min(hold.expires_at for hold in holds),
+        })
+
+    @extend_schema(
+        parameters=[OpenApiParameter(GUEST_CART_HEADER, str, OpenApiParameter.HEADER, description='Guest cart token (also read from the guest_cart field or cookie)')],
+        responses=GuestCartSerializer
+    )
+    @action(detail=False, methods=['get', 'post', 'patch', 'delete'], permission_classes=[AllowAny])
+    def guest(self, request):
+        """
+        Cart kept client-side in a signed token, open to anonymous visitors.
+        GET reads it without touching the database; POST adds quantity of
+        product_id, PATCH sets it (0 removes) and DELETE removes product_id or
+        empties the cart, each answering with the re-signed token (also set
+        as a cookie). The cart is merged into the account's cart on login.
+        """
+        try:
+            lines = load_guest_cart(guest_cart_token(request))
+            product_id = request.data.get('product_id')
+            if request.method == 'DELETE':
+                lines = update_guest_cart(lines, product_id, 0) if product_id else {}
+            elif request.method in ('POST', 'PATCH'):
+                if not product_id:
+                    return Response({'error': 'product_id is required.'}, status=status.HTTP_400_BAD_REQUEST)
+                quantity = int(request.data.get('quantity', 1 if request.method == 'POST' else 0))
+                lines = update_guest_cart(lines, product_id, quantity, add=request.method == 'POST')
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        token = dump_guest_cart(lines) if lines else ''
+        response = Response(GuestCartSerializer({'token': token, **guest_cart_summary(lines)}).data)
+        return set_guest_cart_cookie(response, token)
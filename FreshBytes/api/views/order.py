@@ -1,14 +1,28 @@
+import json
+import time
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import StreamingHttpResponse
 from rest_framework import viewsets, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
+from datetime import datetime, timedelta
+from django.db import transaction
+from django.db.models import Prefetch, Q
 from django.shortcuts import get_object_or_404
-from ..models import Order, OrderItem
-from ..serializers import OrderSerializer, OrderItemSerializer, PaymentSerializer
-from ..services.order_services import create_order_from_cart
-from ..services.seller_services import update_seller_stats_on_order_delivered
-from drf_spectacular.utils import extend_schema, extend_schema_view
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+from rest_framework.exceptions import ValidationError
+from ..models import Order, OrderItem, CheckoutTicket
+from ..serializers import OrderSerializer, OrderDetailSerializer, OrderItemSerializer, PaymentSerializer, CheckoutTicketSerializer, ArchivedOrderRowSerializer
+from ..services.cart_services import load_guest_cart, merge_guest_cart
+from ..services.archive_services import archived_order_bundle, archived_orders_listing
+from ..services.order_services import create_order_from_cart, handle_order_status_change, submit_checkout, CheckoutQueueFull
+from ..services.idempotency_services import idempotent, IDEMPOTENCY_HEADER
+from drf_spectacular.utils import extend_schema, extend_schema_view, OpenApiParameter
 from ..permissions import IsSellerGroup, IsAdminGroup
+from .cart import guest_cart_token, set_guest_cart_cookie
 
 @extend_schema(tags=['Order'])
 
@@ -18,31 +32,173 @@ class OrderViewSet(viewsets.ModelViewSet):
     permission_classes = [IsAuthenticated]
     lookup_field = 'order_id'
 
+    def _is_admin(self):
+        if not hasattr(self.request, '_is_admin'):
+            self.request._is_admin = self.request.user.groups.filter(name='Admin').exists()
+        return self.request._is_admin
+
+    def get_queryset(self):
+        user = self.request.user
+        if self.action == 'list':
+            # "My Orders": the orders this user placed (admins see everyone's)
+            orders = Order.objects.all() if self._is_admin() else Order.objects.filter(user_id=user)
+            return self._filter_orders(orders).order_by('-order_date')
+        if self._is_admin():
+            return Order.objects.all()
+        # Customers see their own orders, sellers also the orders containing their products
+        sold = OrderItem.objects.filter(product_id__seller_id__user_id=user).values('order_id')
+        return Order.objects.filter(Q(user_id=user) | Q(pk__in=sold))
+
+    def _filter_orders(self, orders):
+        """Applies ?status=A,B&date_from=YYYY-MM-DD&date_to=YYYY-MM-DD (inclusive) to the listing"""
+        params = self.request.query_params
+        statuses = [value for value in params.get('status', '').upper().split(',') if value]
+        if statuses:
+            allowed = [choice for choice, _ in Order._meta.get_field('order_status').choices]
+            unknown = set(statuses) - set(allowed)
+            if unknown:
+                raise ValidationError({'status': f'Unknown status {sorted(unknown)}. Allowed: {allowed}'})
+            orders = orders.filter(order_status__in=statuses)
+        # Date bounds become a plain range on order_date so the (user, status, date) index applies
+        for param, lookup, offset in (('date_from', 'order_date__gte', 0), ('date_to', 'order_date__lt', 1)):
+            if params.get(param):
+                day = parse_date(params[param])
+                if day is None:
+                    raise ValidationError({param: 'Use the YYYY-MM-DD format.'})
+                bound = timezone.make_aware(datetime.combine(day + timedelta(days=offset), datetime.min.time()))
+                orders = orders.filter(**{lookup: bound})
+        return orders
+
     def get_object(self):
         order_number = self.kwargs.get('order_number')
         if order_number:
-            return get_object_or_404(Order, order_number=order_number)
+            return get_object_or_404(self.get_queryset(), order_number=order_number)
         return super().get_object()
 
+    @extend_schema(parameters=[
+        OpenApiParameter('status', str, OpenApiParameter.QUERY, description='Comma-separated order statuses, e.g. PENDING,SHIPPED'),
+        OpenApiParameter('date_from', str, OpenApiParameter.QUERY, description='Orders placed on or after this day (YYYY-MM-DD)'),
+        OpenApiParameter('date_to', str, OpenApiParameter.QUERY, description='Orders placed on or before this day (YYYY-MM-DD)'),
+    ])
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
+
+    @extend_schema(responses=OrderDetailSerializer)
+    def retrieve(self, request, *args, **kwargs):
+        """
+        The order with its items (product, price, seller) and payments in three
+        queries. Access is checked on the loaded rows, so owners and sellers
+        need no extra lookups; only other users cost one group check.
+        Orders moved to cold storage are served from there in the same shape.
+        """
+        orders = Order.objects.select_related('user_id').prefetch_related(
+            Prefetch('order_items', queryset=OrderItem.objects.select_related('product_id__seller_id').order_by('created_at')),
+            'payments',
+        )
+        lookup = {'order_number': kwargs['order_number']} if kwargs.get('order_number') else {'pk': kwargs[self.lookup_field]}
+        order = orders.filter(**lookup).first() or archived_order_bundle().filter(**lookup).first()
+        if order is None:
+            return Response({'detail': 'No Order matches the given query.'}, status=status.HTTP_404_NOT_FOUND)
+        user = request.user
+        is_seller = any(
+            item.product_id and item.product_id.seller_id and item.product_id.seller_id.user_id_id == user.pk
+            for item in order.order_items.all()
+        )
+        if not (order.user_id_id == user.pk or is_seller or self._is_admin()):
+            return Response({'detail': 'No Order matches the given query.'}, status=status.HTTP_404_NOT_FOUND)
+        return Response(OrderDetailSerializer(order).data)
+
+    @extend_schema(parameters=[
+        OpenApiParameter(IDEMPOTENCY_HEADER, str, OpenApiParameter.HEADER, description='Retries with the same key return the original response'),
+        OpenApiParameter('Prefer', str, OpenApiParameter.HEADER, description="'respond-async' queues the checkout and answers 202 with a ticket to poll")
+    ])
     @action(detail=False, methods=['post'])
+    @idempotent('orders.checkout')
     def checkout(self, request):
         cart_item_ids = request.data.get('cart_item_ids', None)
         payment_method = request.data.get('payment_method', None)
+        token = guest_cart_token(request)
+        if token:
+            # A guest cart still held client-side joins the account's cart first; any line that
+            # could not be merged in full stops the checkout so the customer can review the cart
+            try:
+                _, issues = merge_guest_cart(request.user, load_guest_cart(token))
+            except ValueError as e:
+                issues = [{'error': str(e)}]
+            if issues:
+                response = Response({
+                    'error': 'Some guest cart items could not be added to your cart.',
+                    'issues': issues
+                }, status=status.HTTP_409_CONFLICT)
+                return set_guest_cart_cookie(response, '')
+        if getattr(settings, 'CHECKOUT_ASYNC', False) or 'respond-async' in request.headers.get('Prefer', ''):
+            response = self._submit_checkout(request, cart_item_ids, payment_method)
+        else:
+            try:
+                order, payment = create_order_from_cart(request.user, cart_item_ids, payment_method)
+                response = Response({
+                    "order": OrderSerializer(order).data,
+                    "payment": PaymentSerializer(payment).data
+                }, status=status.HTTP_201_CREATED)
+            except Exception as e:
+                response = Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        return set_guest_cart_cookie(response, '') if token else response
+
+    def _submit_checkout(self, request, cart_item_ids, payment_method):
         try:
-            order, payment = create_order_from_cart(request.user, cart_item_ids, payment_method)
-            return Response({
-                "order": OrderSerializer(order).data,
-                "payment": PaymentSerializer(payment).data
-            }, status=status.HTTP_201_CREATED)
-        except Exception as e:
+            ticket = submit_checkout(request.user, cart_item_ids, payment_method)
+        except CheckoutQueueFull as e:
+            response = Response({'error': str(e)}, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+            response['Retry-After'] = '5'
+            return response
+        except ValueError as e:
             return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        status_url = request.build_absolute_uri(f'{request.path.rstrip("/")}/{ticket.ticket_id}/')
+        response = Response({
+            "ticket_id": ticket.ticket_id,
+            "status": ticket.status,
+            "status_url": status_url
+        }, status=status.HTTP_202_ACCEPTED)
+        response['Location'] = status_url
+        return response
+
+    @extend_schema(
+        parameters=[OpenApiParameter('wait', float, OpenApiParameter.QUERY, description='Seconds to long-poll for the result (capped by CHECKOUT_LONG_POLL_SECONDS)')],
+        responses=CheckoutTicketSerializer
+    )
+    @action(
+        detail=False,
+        methods=['get'],
+        url_path=r'checkout/(?P<ticket_id>[0-9a-f]{8}-?[0-9a-f]{4}-?[0-9a-f]{4}-?[0-9a-f]{4}-?[0-9a-f]{12})'
+    )
+    def checkout_status(self, request, ticket_id=None):
+        """Result of an asynchronous checkout: 202 while it is queued, 200 once it completed or failed."""
+        try:
+            wait = min(max(float(request.query_params.get('wait', 0)), 0), getattr(settings, 'CHECKOUT_LONG_POLL_SECONDS', 25))
+        except ValueError:
+            return Response({'error': 'wait must be a number of seconds.'}, status=status.HTTP_400_BAD_REQUEST)
+        deadline = time.monotonic() + wait
+        tickets = CheckoutTicket.objects.filter(pk=ticket_id, user=request.user)
+        while True:
+            ticket = tickets.select_related('order').first()
+            if ticket is None:
+                return Response({'error': 'Checkout ticket not found.'}, status=status.HTTP_404_NOT_FOUND)
+            if ticket.status in ('COMPLETED', 'FAILED'):
+                return Response(CheckoutTicketSerializer(ticket).data, status=status.HTTP_200_OK)
+            if time.monotonic() >= deadline:
+                break
+            time.sleep(getattr(settings, 'CHECKOUT_POLL_INTERVAL', 0.25))
+        response = Response(CheckoutTicketSerializer(ticket).data, status=status.HTTP_202_ACCEPTED)
+        response['Retry-After'] = '1'
+        return response
 
     ALLOWED_TRANSITIONS = {
         'PENDING': ['CONFIRMED', 'CANCELLED'],
         'CONFIRMED': ['SHIPPED', 'CANCELLED'],
         'SHIPPED': ['DELIVERED'],
-        'DELIVERED': [],
+        'DELIVERED': ['REFUNDED'],
         'CANCELLED': [],
+        'REFUNDED': [],
     }
 
     @action(detail=True, methods=['patch'], permission_classes=[IsAuthenticated, IsSellerGroup, IsAdminGroup])
@@ -65,17 +221,19 @@ class OrderViewSet(viewsets.ModelViewSet):
             return Response({'error': f'Cannot change status from {old_status} to {new_status}.'}, status=status.HTTP_400_BAD_REQUEST)
         if is_order_owner and new_status == 'CANCELLED':
             if order.order_status == 'PENDING':
-                order.order_status = 'CANCELLED'
-                order.save(update_fields=['order_status', 'updated_at'])
+                with transaction.atomic():
+                    order.order_status = 'CANCELLED'
+                    order.save(update_fields=['order_status', 'updated_at'])
+                    handle_order_status_change(order, old_status, 'CANCELLED')
                 return Response(OrderSerializer(order).data, status=status.HTTP_200_OK)
             else:
                 return Response({'error': 'You can only cancel orders that are still PENDING.'}, status=status.HTTP_403_FORBIDDEN)
         if not (is_admin or is_seller):
             return Response({'error': 'Permission denied.'}, status=status.HTTP_403_FORBIDDEN)
-        order.order_status = new_status
-        order.save(update_fields=['order_status', 'updated_at'])
-        if old_status != 'DELIVERED' and new_status == 'DELIVERED':
-            update_seller_stats_on_order_delivered(order)
+        with transaction.atomic():
+            order.order_status = new_status
+            order.save(update_fields=['order_status', 'updated_at'])
+            handle_order_status_change(order, old_status, new_status)
         return Response(OrderSerializer(order).data, status=status.HTTP_200_OK)
 
     @action(detail=True, methods=['patch'], permission_classes=[IsAuthenticated, IsSellerGroup, IsAdminGroup])
@@ -93,11 +251,26 @@ class OrderViewSet(viewsets.ModelViewSet):
         order.save(update_fields=['is_archived', 'updated_at'])
         return Response(OrderSerializer(order).data, status=status.HTTP_200_OK)
 
+    @extend_schema(
+        parameters=[OpenApiParameter('stream', bool, OpenApiParameter.QUERY, description='Stream every row as one JSON array instead of a page')],
+        responses=ArchivedOrderRowSerializer(many=True)
+    )
     @action(detail=False, methods=['get'], url_path='archived')
     def archived_orders(self, request):
-        archived = Order.objects.filter(is_archived=True)
-        serializer = self.get_serializer(archived, many=True)
-        return Response(serializer.data)
+        """Orders flagged as archived plus those moved to cold storage, newest first."""
+        rows = archived_orders_listing(None if self._is_admin() else request.user)
+        if request.query_params.get('stream', '').lower() in ('1', 'true'):
+            return StreamingHttpResponse(self._stream_rows(rows), content_type='application/json')
+        page = self.paginate_queryset(rows)
+        return self.get_paginated_response(ArchivedOrderRowSerializer(page, many=True).data)
+
+    @staticmethod
+    def _stream_rows(rows):
+        # The database cursor is read in chunks, so memory stays flat however many rows there are
+        yield '['
+        for index, row in enumerate(rows.iterator(chunk_size=500)):
+            yield (',' if index else '') + json.dumps(ArchivedOrderRowSerializer(row).data, cls=DjangoJSONEncoder)
+        yield ']'
 
     def destroy(self, request, *args, **kwargs):
         return Response({'detail': 'Order deletion is not allowed.'}, status=status.HTTP_405_METHOD_NOT_ALLOWED)
@@ -106,7 +279,8 @@ class OrderViewSet(viewsets.ModelViewSet):
 @extend_schema(tags=['OrderItem'])
 
 class OrderItemViewSet(viewsets.ModelViewSet):
-    queryset = OrderItem.objects.all()
+    # OrderItemSerializer reads the product, seller, order and customer of every item
+    queryset = OrderItem.objects.select_related('product_id__seller_id', 'order_id__user_id')
     serializer_class = OrderItemSerializer
     permission_classes = [IsAuthenticated]
 
@@ -2,11 +2,13 @@ from rest_framework import viewsets
 from rest_framework.permissions import IsAuthenticated
 from ..models import Payment
 from ..serializers import PaymentSerializer
-from drf_spectacular.utils import extend_schema, extend_schema_view
+from drf_spectacular.utils import extend_schema, extend_schema_view, OpenApiParameter
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework import status
 from rest_framework.permissions import IsAdminUser
+from ..services.idempotency_services import idempotent, IDEMPOTENCY_HEADER
+from ..services.payment_services import PAYMENT_TRANSITIONS
 
 @extend_schema(tags=['Payment'])
 class PaymentViewSet(viewsets.ModelViewSet):
@@ -15,6 +17,13 @@ class PaymentViewSet(viewsets.ModelViewSet):
     permission_classes = [IsAuthenticated]
     lookup_field = 'payment_id'
 
+    @extend_schema(parameters=[
+        OpenApiParameter(IDEMPOTENCY_HEADER, str, OpenApiParameter.HEADER, description='Retries with the same key return the original response')
+    ])
+    @idempotent('payments.create')
+    def create(self, request, *args, **kwargs):
+        return super().create(request, *args, **kwargs)
+
     @action(detail=True, methods=['patch'], url_path='update_status', permission_classes=[IsAdminUser])
     def update_status(self, request, payment_id=None):
         payment = self.get_object()
@@ -22,14 +31,7 @@ class PaymentViewSet(viewsets.ModelViewSet):
         allowed_statuses = [choice[0] for choice in payment.PAYMENT_STATUS]
         if new_status not in allowed_statuses:
             return Response({'error': f'Invalid status. Allowed: {allowed_statuses}'}, status=status.HTTP_400_BAD_REQUEST)
-        # Optionally: Only allow certain transitions (e.g., PENDING -> COMPLETED/FAILED, COMPLETED -> REFUNDED)
-        valid_transitions = {
-            'PENDING': ['COMPLETED', 'FAILED'],
-            'COMPLETED': ['REFUNDED'],
-            'FAILED': [],
-            'REFUNDED': [],
-        }
-        if new_status not in valid_transitions.get(payment.payment_status, []):
+        if new_status not in PAYMENT_TRANSITIONS.get(payment.payment_status, []):
             return Response({'error': f'Cannot change status from {payment.payment_status} to {new_status}.'}, status=status.HTTP_400_BAD_REQUEST)
         payment.payment_status = new_status
         payment.save(update_fields=['payment_status', 'updated_at'])
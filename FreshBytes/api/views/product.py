@@ -6,6 +6,8 @@ from ..serializers import ProductSerializer
 from drf_spectacular.utils import extend_schema
 from rest_framework.permissions import IsAuthenticated
 from ..permissions import IsSellerGroup
+from ..services.counter_services import increment
+from ..services.trending_services import record_product_events
 
 @extend_schema(tags=['Product'])
 
@@ -16,12 +18,19 @@ class ProductViewSet(viewsets.ModelViewSet):
     # Industry-standard query parameter support:
     # Filtering: product_price, seller_id, is_deleted, is_active, product_name
     # Searching: product_name
-    # Ordering: product_price, created_at
+    # Ordering: product_price, created_at, rating_score
     filterset_fields = ['product_price', 'seller_id', 'is_deleted', 'is_active', 'product_name']
     search_fields = ['product_name']
-    ordering_fields = ['product_price', 'created_at']
+    ordering_fields = ['product_price', 'created_at', 'rating_score']
     ordering = ['-created_at']  # Default ordering: newest first
 
+    def retrieve(self, request, *args, **kwargs):
+        response = super().retrieve(request, *args, **kwargs)
+        # Product page views feed the trending rail and the buffered view counter
+        record_product_events({kwargs['pk']: 1}, 'view')
+        increment(Product, kwargs['pk'], 'view_count')
+        return response
+
     @action(detail=True, methods=['patch'], permission_classes=[IsAuthenticated, IsSellerGroup])
     def soft_delete(self, request, pk=None):
         product = self.get_object()
@@ -3,8 +3,9 @@ from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 from ..models import Promo, Product, Seller
-from ..serializers import PromoSerializer, ProductSerializer
+from ..serializers import PromoSerializer, ProductSerializer, PromoSimulationSerializer
 from drf_spectacular.utils import extend_schema, extend_schema_view
+from ..services.pricing_services import simulate_promo_pricing
 from ..permissions import IsSellerGroup, IsAdminGroup
 
 @extend_schema(tags=['Promo'])
@@ -81,15 +82,9 @@ class PromoViewSet(viewsets.ModelViewSet):
         return promo
 
     def perform_destroy(self, instance):
-        from django.db import transaction
+        from ..services.promo_services import bulk_delete_promos
         try:
-            with transaction.atomic():
-                affected_products = list(instance.product_id.all())
-                instance.delete()
-                from ..services.promo_services import update_product_discounted_price
-                for product in affected_products:
-                    update_product_discounted_price(product)
-                    product.refresh_from_db()
+            bulk_delete_promos(Promo.objects.filter(promo_id=instance.promo_id))
         except Exception as e:
             from rest_framework import serializers
             raise serializers.ValidationError({"error": f"Error deleting promo: {str(e)}"})
@@ -97,18 +92,44 @@ class PromoViewSet(viewsets.ModelViewSet):
     @action(detail=False, methods=['delete'])
     def delete_all(self, request):
         user = request.user
-        from ..services.promo_services import update_product_discounted_price
+        from ..services.promo_services import bulk_delete_promos
         if user.groups.filter(name='Admin').exists():
             promos_qs = Promo.objects.all()
         elif user.groups.filter(name='Seller').exists():
             promos_qs = Promo.objects.filter(seller_id__user_id=user)
         else:
             return Response({"error": "Only sellers can delete their own promos or admins can delete all promos."}, status=status.HTTP_403_FORBIDDEN)
-        from django.db.models import Prefetch
-        products_to_update = set()
-        for promo in promos_qs.prefetch_related('product_id'):
-            products_to_update.update(list(promo.product_id.all()))
-        promos_qs.delete()
-        for product in products_to_update:
-            update_product_discounted_price(product)
+        bulk_delete_promos(promos_qs)
         return Response(status=status.HTTP_204_NO_CONTENT)
+
+    @action(detail=False, methods=['delete'])
+    def delete_expired(self, request):
+        user = request.user
+        from ..services.promo_services import delete_expired_promos
+        if user.groups.filter(name='Admin').exists():
+            deleted = delete_expired_promos()
+        elif user.groups.filter(name='Seller').exists():
+            seller = Seller.objects.filter(user_id=user).first()
+            if seller is None:
+                return Response({"error": "No seller profile found for this user."}, status=status.HTTP_404_NOT_FOUND)
+            deleted = delete_expired_promos(seller=seller)
+        else:
+            return Response({"error": "Only sellers can delete their own promos or admins can delete all promos."}, status=status.HTTP_403_FORBIDDEN)
+        return Response({"deleted": deleted}, status=status.HTTP_200_OK)
+
+    @extend_schema(request=PromoSimulationSerializer)
+    @action(detail=False, methods=['post'])
+    def simulate(self, request):
+        """Preview prices, average discount and revenue impact of candidate promos without saving anything."""
+        user = request.user
+        serializer = PromoSimulationSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        seller_id = serializer.validated_data.pop('seller_id', None)
+        if user.groups.filter(name='Admin').exists() and seller_id:
+            seller = Seller.objects.filter(pk=seller_id).first()
+        else:
+            seller = Seller.objects.filter(user_id=user).first()
+        if seller is None:
+            return Response({"error": "No seller profile found for this user."}, status=status.HTTP_404_NOT_FOUND)
+        result = simulate_promo_pricing(seller, **serializer.validated_data)
+        return Response(result, status=status.HTTP_200_OK)
@@ -0,0 +1,108 @@
+import uuid
+from django.conf import settings
+from rest_framework import viewsets, status
+from rest_framework.decorators import action
+from rest_framework.response import Response
+from rest_framework.permissions import IsAuthenticated
+from ..models import Category, Seller, SubCategory
+from ..serializers import ProductSerializer, SellerSerializer
+from ..services.ranking_services import top_products, top_sellers
+from ..services.trending_services import trending_products
+from drf_spectacular.utils import extend_schema, OpenApiParameter
+
+LIMIT_PARAMETER = OpenApiParameter('limit', int, OpenApiParameter.QUERY, description='Number of entries (default and maximum: RANKING_TOP_K)')
+
+@extend_schema(tags=['Ranking'])
+
+class RankingViewSet(viewsets.ViewSet):
+    """Best-seller and top-seller rails, served from the maintained top-K lists"""
+    permission_classes = [IsAuthenticated]
+
+    def _limit(self, request):
+        top_k = getattr(settings, 'RANKING_TOP_K', 20)
+        try:
+            limit = int(request.query_params.get('limit', top_k))
+        except ValueError:
+            return None
+        return limit if 1 <= limit <= top_k else None
+
+    # Query parameter -> (parser, queryset of the scopes that exist)
+    SCOPE_PARAMETERS = {
+        'category_id': (int, Category.objects.all()),
+        'sub_category_id': (str, SubCategory.objects.all()),
+        'seller_id': (uuid.UUID, Seller.objects.filter(is_deleted=False)),
+    }
+
+    def _scope(self, request, names):
+        """
+        Returns (scope kwargs, None), or (None, error response) when a scope
+        parameter is malformed (400) or names nothing that exists (404), so
+        arbitrary ids never reach the ranking lookups
+        """
+        scope = {}
+        for name in names:
+            value = request.query_params.get(name)
+            if not value:
+                continue
+            parse, existing = self.SCOPE_PARAMETERS[name]
+            try:
+                value = parse(value)
+            except ValueError:
+                return None, Response({'error': f'{name} is not a valid id.'}, status=status.HTTP_400_BAD_REQUEST)
+            if not existing.filter(pk=value).exists():
+                return None, Response({'error': f'No {name[:-3].replace("_", " ")} matches {name}.'}, status=status.HTTP_404_NOT_FOUND)
+            scope[name] = value
+        return scope, None
+
+    @extend_schema(
+        parameters=[
+            OpenApiParameter('category_id', str, OpenApiParameter.QUERY, description='Best sellers within a category'),
+            OpenApiParameter('sub_category_id', str, OpenApiParameter.QUERY, description='Best sellers within a subcategory'),
+            OpenApiParameter('seller_id', str, OpenApiParameter.QUERY, description="Best sellers of one seller's store"),
+            LIMIT_PARAMETER,
+        ],
+        responses=ProductSerializer(many=True)
+    )
+    @action(detail=False, methods=['get'])
+    def products(self, request):
+        """Best-selling products platform-wide, or within one category, subcategory or seller"""
+        limit = self._limit(request)
+        if limit is None:
+            return Response({'error': f"limit must be between 1 and {getattr(settings, 'RANKING_TOP_K', 20)}"}, status=status.HTTP_400_BAD_REQUEST)
+        scope, error = self._scope(request, ['category_id', 'sub_category_id', 'seller_id'])
+        if error is not None:
+            return error
+        products = top_products(limit, **scope)
+        return Response(ProductSerializer(products, many=True).data)
+
+    @extend_schema(parameters=[LIMIT_PARAMETER], responses=SellerSerializer(many=True))
+    @action(detail=False, methods=['get'])
+    def sellers(self, request):
+        """Highest-earning sellers platform-wide"""
+        limit = self._limit(request)
+        if limit is None:
+            return Response({'error': f"limit must be between 1 and {getattr(settings, 'RANKING_TOP_K', 20)}"}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(SellerSerializer(top_sellers(limit), many=True).data)
+
+    @extend_schema(
+        parameters=[
+            OpenApiParameter('category_id', str, OpenApiParameter.QUERY, description='Trending within a category'),
+            OpenApiParameter('sub_category_id', str, OpenApiParameter.QUERY, description='Trending within a subcategory'),
+            LIMIT_PARAMETER,
+        ],
+        responses=ProductSerializer(many=True)
+    )
+    @action(detail=False, methods=['get'])
+    def trending(self, request):
+        """Products with the most recent views, cart adds and orders (decayed over TRENDING_HALF_LIFE_SECONDS)"""
+        limit = self._limit(request)
+        if limit is None:
+            return Response({'error': f"limit must be between 1 and {getattr(settings, 'RANKING_TOP_K', 20)}"}, status=status.HTTP_400_BAD_REQUEST)
+        scope, error = self._scope(request, ['category_id', 'sub_category_id'])
+        if error is not None:
+            return error
+        ranked = trending_products(limit, **scope)
+        return Response([
+            {**ProductSerializer(product).data, 'trending_score': round(score, 2)}
+            for product, score in ranked
+        ])
@@ -4,9 +4,10 @@ from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 from django.shortcuts import get_object_or_404
 from ..models import Seller, Product, User
-from ..serializers import SellerSerializer, ProductSerializer, UserSerializer, OrderSerializer
-from drf_spectacular.utils import extend_schema, extend_schema_view
+from ..serializers import SellerSerializer, SellerOrderSerializer, ProductSerializer, UserSerializer
+from drf_spectacular.utils import extend_schema, extend_schema_view, OpenApiParameter
 from ..permissions import IsSellerGroup
+from ..services.seller_services import set_seller_reaction
 
 
 @extend_schema(tags=['Seller'])
@@ -72,17 +73,35 @@ class SellerViewSet(viewsets.ModelViewSet):
 
     @action(detail=True, methods=['get'])
     def customers(self, request, pk=None):
+        """Paginated customers with delivered orders, most recent first, with their order count and spend."""
         seller = self.get_object()
-        customers = seller.get_customers()
-        data = UserSerializer(customers, many=True).data
-        return Response(data)
+        page = self.paginate_queryset(seller.get_customers())
+        users = User.objects.in_bulk([row['customer'] for row in page if row['customer']])
+        data = [
+            {
+                **UserSerializer(users[row['customer']]).data,
+                'orders': row['orders'],
+                'total_spent': row['total_spent'],
+                'last_order_date': row['last_order_date'],
+            }
+            for row in page if row['customer'] in users
+        ]
+        return self.get_paginated_response(data)
 
+    @extend_schema(
+        parameters=[OpenApiParameter('status', str, OpenApiParameter.QUERY, description='Only orders in this status')],
+        responses=SellerOrderSerializer(many=True)
+    )
     @action(detail=True, methods=['get'])
     def transactions(self, request, pk=None):
+        """Paginated orders involving this seller, newest first, with the seller's share of each."""
         seller = self.get_object()
         transactions = seller.get_transactions()
-        data = OrderSerializer(transactions, many=True).data
-        return Response(data)
+        order_status = request.query_params.get('status')
+        if order_status:
+            transactions = transactions.filter(order_status=order_status.upper())
+        page = self.paginate_queryset(transactions)
+        return self.get_paginated_response(SellerOrderSerializer(page, many=True).data)
 
     @action(detail=True, methods=['get'], url_path='customers/(?P<customer_id>[^/.]+)/products')
     def products_bought_by_customer(self, request, pk=None, customer_id=None):
@@ -90,3 +109,21 @@ class SellerViewSet(viewsets.ModelViewSet):
         products = seller.get_products_bought_by_customer(customer_id)
         data = ProductSerializer(products, many=True).data
         return Response(data)
+
+    def _react(self, request, pk, kind):
+        seller = get_object_or_404(Seller, pk=pk, is_deleted=False)
+        active = request.method == 'POST'
+        set_seller_reaction(request.user, seller, kind, active)
+        return Response({'seller_id': seller.pk, kind.lower(): active})
+
+    @extend_schema(request=None)
+    @action(detail=True, methods=['post', 'delete'], permission_classes=[IsAuthenticated])
+    def like(self, request, pk=None):
+        """Like (POST) or unlike (DELETE) a seller. total_likes catches up within COUNTER_FLUSH_SECONDS."""
+        return self._react(request, pk, 'LIKE')
+
+    @extend_schema(request=None)
+    @action(detail=True, methods=['post', 'delete'], permission_classes=[IsAuthenticated])
+    def follow(self, request, pk=None):
+        """Follow (POST) or unfollow (DELETE) a seller. total_followers catches up within COUNTER_FLUSH_SECONDS."""
+        return self._react(request, pk, 'FOLLOW')
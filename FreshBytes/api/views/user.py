@@ -5,35 +5,95 @@ from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated, AllowAny, BasePermission
 from rest_framework_simplejwt.views import TokenObtainPairView
 from rest_framework_simplejwt.tokens import RefreshToken
+from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
 from django.shortcuts import get_object_or_404
 from django.utils import timezone
-from ..models import User
+from ..models import User, Seller
 from ..serializers import UserSerializer, UserListSerializer, CustomTokenObtainPairSerializer
 from ..permissions import IsAdminGroup, IsSellerGroup, IsCustomerGroup
-from drf_spectacular.utils import extend_schema, extend_schema_view
+from drf_spectacular.utils import extend_schema, extend_schema_view, OpenApiParameter
+from ..services.cart_services import load_guest_cart, merge_guest_cart
+from ..services.kpi_services import latest_snapshot, request_refresh
+from ..services.rollup_services import DASHBOARD_WINDOWS, seller_dashboard
 from rest_framework import serializers
+from .cart import guest_cart_token, set_guest_cart_cookie
 
 
 class CustomTokenObtainPairView(TokenObtainPairView):
     permission_classes = [AllowAny]
     serializer_class = CustomTokenObtainPairSerializer
 
+    def post(self, request, *args, **kwargs):
+        """Issues the token pair and moves a guest cart sent along (see CartViewSet.guest) into the customer's cart"""
+        serializer = self.get_serializer(data=request.data)
+        try:
+            serializer.is_valid(raise_exception=True)
+        except TokenError as e:
+            raise InvalidToken(e.args[0]) from e
+
+        data = dict(serializer.validated_data)
+        token = guest_cart_token(request)
+        if not token or not serializer.user.is_customer():
+            return Response(data, status=status.HTTP_200_OK)
+        try:
+            merged, issues = merge_guest_cart(serializer.user, load_guest_cart(token))
+            data['guest_cart'] = {'merged': merged, 'issues': issues}
+        except ValueError as e:
+            data['guest_cart'] = {'merged': 0, 'error': str(e)}
+        return set_guest_cart_cookie(Response(data, status=status.HTTP_200_OK), '')
+
+def _snapshot_data(snapshot):
+    return {
+        "snapshot_id": snapshot.pk,
+        "generated_at": snapshot.created_at.isoformat(),
+        "age_seconds": int((timezone.now() - snapshot.created_at).total_seconds()),
+        "metrics": snapshot.metrics,
+    }
+
 @extend_schema(tags=['AdminDashboard'])
 class AdminDashboardView(APIView):
     permission_classes = [IsAuthenticated, IsAdminGroup]
     
     def get(self, request):
-        data = {
-            "message": "Welcome, admin!",
-        }
-        return Response(data)
+        # Platform KPIs from the latest snapshot; stale snapshots are refreshed in the background
+        return Response(_snapshot_data(latest_snapshot()))
+
+    def post(self, request):
+        """Queue a KPI refresh (at most one per KPI_REFRESH_MIN_SECONDS)"""
+        wait = request_refresh()
+        if wait:
+            response = Response(
+                {"error": "KPIs were refreshed recently, try again later", "retry_after": wait},
+                status=status.HTTP_429_TOO_MANY_REQUESTS
+            )
+            response['Retry-After'] = str(wait)
+            return response
+        return Response({"detail": "KPI refresh queued"}, status=status.HTTP_202_ACCEPTED)
     
+@extend_schema(
+    tags=['StoreDashboard'],
+    parameters=[
+        OpenApiParameter('days', int, OpenApiParameter.QUERY, description='Length of the daily series: 7, 30 (default) or 90'),
+    ],
+)
 class StoreDashboardView(APIView):
     permission_classes = [IsAuthenticated, IsSellerGroup]
 
     def get(self, request):
-        # Return store dashboard data
-        return Response({"message": "Welcome, store user!"})
+        # Served from the per-day rollups, so the cost does not grow with order history
+        try:
+            days = int(request.query_params.get('days', 30))
+        except ValueError:
+            days = None
+        if days not in DASHBOARD_WINDOWS:
+            return Response(
+                {'error': f"days must be one of {', '.join(str(window) for window in DASHBOARD_WINDOWS)}"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        seller = Seller.objects.filter(user_id=request.user).first()
+        if seller is None:
+            return Response({'error': 'No seller profile found for this user'}, status=status.HTTP_404_NOT_FOUND)
+        return Response({'seller_id': seller.pk, **seller_dashboard(seller, days)})
 
 
 @extend_schema(tags=['UserRegister'])
@@ -145,28 +205,17 @@ class UserViewSet(viewsets.ModelViewSet):
         if not request.user.role == 'admin':
             return Response({"error": "Admin access required"}, status=status.HTTP_403_FORBIDDEN)
         
-        total_users = User.objects.count()
-        active_users = User.objects.filter(is_active=True, is_deleted=False).count()
-        inactive_users = User.objects.filter(is_active=False, is_deleted=False).count()
-        deleted_users = User.objects.filter(is_deleted=True).count()
-        
-        role_stats = {}
-        for role in ['admin', 'seller', 'customer']:
-            role_stats[role] = User.objects.filter(role=role, is_deleted=False).count()
-        
-        recent_users = User.objects.filter(
-            created_at__gte=timezone.now() - timezone.timedelta(days=30),
-            is_deleted=False
-        ).count()
-        
+        # Served from the KPI snapshot instead of counting users on every call
+        snapshot = latest_snapshot()
+        users = snapshot.metrics['users']
         return Response({
-            "total_users": total_users,
-            "active_users": active_users,
-            "inactive_users": inactive_users,
-            "deleted_users": deleted_users,
-            "role_distribution": role_stats,
-            "recent_users_30_days": recent_users,
-            "generated_at": timezone.now().isoformat()
+            "total_users": users['total'],
+            "active_users": users['active'],
+            "inactive_users": users['inactive'],
+            "deleted_users": users['deleted'],
+            "role_distribution": users['role_distribution'],
+            "recent_users_30_days": users['recent_30_days'],
+            "generated_at": snapshot.created_at.isoformat()
         })
 
     @action(detail=False, methods=['get'])